@@ -0,0 +1,180 @@
+import logging
+
+from . import namespaces
+from .helper import AccessConfig
+from .patterns import compile_patterns
+
+# Pseudo repositories Artifactory permissions may refer to
+ANY_REPOS = {'ANY': None, 'ANY LOCAL': 'localRepositories', 'ANY REMOTE': 'remoteRepositories'}
+PERMISSION_SECTIONS = ['repo', 'build']
+
+
+def query_access(config: AccessConfig, local_config: dict):
+    access_index = build_index(local_config, config)
+
+    if config.group or config.user:
+        principal_type, principal = ('groups', config.group) if config.group else ('users', config.user)
+        for grant in access_index.grants_for(principal_type, principal):
+            print(format_grant(grant))
+        return
+
+    if config.paths_file:
+        with open(config.paths_file) as paths_file:
+            for line in paths_file:
+                path = line.strip()
+                if path:
+                    __print_access(access_index, *split_path(path, config.repo))
+    else:
+        __print_access(access_index, *split_path(config.path, config.repo))
+
+
+def __print_access(access_index, repo: str, path: str):
+    access = access_index.query(repo, path)
+    principals = [f"{principal_type[:-1]} '{name}' [{', '.join(sorted(actions))}]"
+                  for principal_type in ['users', 'groups']
+                  for name, actions in sorted(access[principal_type].items())]
+    print(f"{repo}/{path}: {'; '.join(principals) if principals else 'no access'}")
+
+
+def build_index(local_config: dict, config: AccessConfig = None):
+    """Build an access index from all permissions in the local config and - if a namespaces file is configured -
+    from the permission targets generated for the namespaces (permissions of config files take precedence)
+    :param local_config: the dict with all config objects
+    :param config: the config class holding config settings
+    :return: the AccessIndex
+    """
+    permissions = dict(local_config.get('permissions', {}))
+
+    if config is not None and config.namespaces_file:
+        namespace_list = namespaces.read_namespace_definitions(config)
+        permissions = {**namespaces.generated_permissions(config, namespace_list), **permissions}
+
+    repo_types = {key: repo_type for repo_type in ANY_REPOS.values() if repo_type
+                  for key in local_config.get(repo_type, {})}
+    access_index = AccessIndex(repo_types)
+
+    for permission in permissions.values():
+        access_index.add_permission(permission)
+
+    logging.info(f"Indexed {len(permissions)} permissions for {len(access_index.repos)} repositories")
+    return access_index
+
+
+def split_path(path: str, repo: str = None) -> tuple:
+    """Split a path in repo and path within the repo, the first folder is used as repo if no repo is given"""
+    path = path.strip('/')
+    if repo:
+        return repo, path
+
+    repo, _, path = path.partition('/')
+    return repo, path
+
+
+def format_grant(grant) -> str:
+    excludes = f" excluding {', '.join(grant.exclude_patterns)}" if grant.exclude_patterns else ""
+    return (f"{grant.permission} ({grant.section}) {grant.repo}: {', '.join(grant.include_patterns)}{excludes} "
+            f"[{', '.join(sorted(grant.actions))}]")
+
+
+class CompiledPermission:
+    """A single section (repo, build) of a permission with compiled include and exclude patterns"""
+    __slots__ = ['name', 'section', 'include_patterns', 'exclude_patterns', 'include', 'exclude', 'users', 'groups']
+
+    def __init__(self, name: str, section: str, permission_section: dict):
+        self.name = name
+        self.section = section
+        # Artifactory treats missing or empty include patterns as '**'
+        self.include_patterns = [p for p in permission_section.get('include-patterns') or [] if p] or ['**']
+        self.exclude_patterns = [p for p in permission_section.get('exclude-patterns') or [] if p]
+        self.include = compile_patterns(self.include_patterns)
+        self.exclude = compile_patterns(self.exclude_patterns)
+        actions = permission_section.get('actions') or {}
+        self.users = {name: frozenset(a) for name, a in (actions.get('users') or {}).items()}
+        self.groups = {name: frozenset(a) for name, a in (actions.get('groups') or {}).items()}
+
+    def matches(self, path: str) -> bool:
+        return self.include.fullmatch(path) is not None and (self.exclude is None or
+                                                            self.exclude.fullmatch(path) is None)
+
+
+class Grant:
+    __slots__ = ['permission', 'section', 'repo', 'include_patterns', 'exclude_patterns', 'actions']
+
+    def __init__(self, compiled: CompiledPermission, repo: str, actions):
+        self.permission = compiled.name
+        self.section = compiled.section
+        self.repo = repo
+        self.include_patterns = compiled.include_patterns
+        self.exclude_patterns = compiled.exclude_patterns
+        self.actions = actions
+
+
+class AccessIndex:
+    """Index of compiled permissions by repository answering which principals may access a path"""
+
+    def __init__(self, repo_types: dict = None):
+        self.repo_types = repo_types or {}
+        self.repos = {}
+        self.any_repos = {key: [] for key in ANY_REPOS}
+        self._resolved = {}
+
+    def add_permission(self, permission: dict):
+        self._resolved = {}
+
+        for section in PERMISSION_SECTIONS:
+            if not permission.get(section):
+                continue
+
+            compiled = CompiledPermission(permission.get('name'), section, permission[section])
+            for repo in permission[section].get('repositories') or []:
+                if repo in self.any_repos:
+                    self.any_repos[repo].append(compiled)
+                else:
+                    self.repos.setdefault(repo, []).append(compiled)
+
+    def permissions_for(self, repo: str) -> list:
+        if repo in self._resolved:
+            return self._resolved[repo]
+
+        permissions = self.repos.get(repo, []) + self.any_repos['ANY']
+        repo_type = self.repo_types.get(repo)
+
+        for any_repo, any_repo_type in ANY_REPOS.items():
+            if any_repo_type and any_repo_type == repo_type:
+                permissions = permissions + self.any_repos[any_repo]
+
+        self._resolved[repo] = permissions
+        return permissions
+
+    def query(self, repo: str, path: str) -> dict:
+        """Return users and groups with their effective actions on a path in a repo
+        :return: dict with keys 'users' and 'groups' mapping principal names to sets of actions
+        """
+        access = {'users': {}, 'groups': {}}
+
+        for compiled in self.permissions_for(repo):
+            if not compiled.matches(path):
+                continue
+            for name, actions in compiled.users.items():
+                access['users'][name] = access['users'].get(name, frozenset()) | actions
+            for name, actions in compiled.groups.items():
+                access['groups'][name] = access['groups'].get(name, frozenset()) | actions
+
+        return access
+
+    def grants_for(self, principal_type: str, principal: str) -> list:
+        """Return all grants (repo and path patterns with actions) of a user or group
+        :param principal_type: 'users' or 'groups'
+        :param principal: name of the user or group
+        :return: list of Grant objects sorted by repo and permission name
+        """
+        grants = []
+        all_repos = list(self.repos.items()) + list(self.any_repos.items())
+
+        for repo, permissions in all_repos:
+            for compiled in permissions:
+                actions = getattr(compiled, principal_type).get(principal)
+                if actions:
+                    grants.append(Grant(compiled, repo, actions))
+
+        return sorted(grants, key=lambda g: (g.repo, g.permission, g.section))
@@ -1,16 +1,50 @@
 import logging
-import re
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from xml.etree.ElementTree import ParseError
 
 import requests
 
 from pyartifactory import Artifactory
+from pyartifactory.exception import ArtifactoryException, UserNotFoundException, GroupNotFoundException, \
+    PermissionNotFoundException, RepositoryNotFoundException
 from pyartifactory.models import NewUser, User, Group, LocalRepository, RemoteRepository, PermissionV2, \
     VirtualRepository
 
+from . import descriptor
+from . import output
+from . import sharding
 from .helper import DeployConfig
-
-art: Artifactory
-app_config: DeployConfig
+from .journal import Journal
+from .limiter import AdaptiveLimiter, LimitedAdapter
+from .model import SnapshotEntry, config_hash
+from .output import object_log, Progress
+from .patterns import IgnoreMatcher
+from .profiling import profiled
+from .report import RunReport
+
+# item type (for logging), key in config objects and key in server configuration
+OBJECT_TYPES = [('local repo', 'localRepositories', 'localRepos'),
+                ('remote repo', 'remoteRepositories', 'remoteRepos'),
+                ('virtual repo', 'virtualRepositories', 'virtualRepos'),
+                ('user', 'users', 'users'),
+                ('group', 'groups', 'groups'),
+                ('permission', 'permissions', 'permissions')]
+REPO_TYPES = ['localRepositories', 'remoteRepositories', 'virtualRepositories']
+MODEL_CLASSES = {'groups': Group,
+                 'permissions': PermissionV2,
+                 'localRepositories': LocalRepository,
+                 'remoteRepositories': RemoteRepository,
+                 'virtualRepositories': VirtualRepository}
+# raised by pyartifactory if an object doesn't exist (anymore)
+NOT_FOUND_ERRORS = (UserNotFoundException, GroupNotFoundException, PermissionNotFoundException,
+                    RepositoryNotFoundException)
+# endpoints listing (and deleting) the objects of the server configuration, relative to the api url
+LIST_ENDPOINTS = {'users': 'security/users',
+                  'groups': 'security/groups',
+                  'permissions': 'v2/security/permissions',
+                  'repos': 'repositories'}
 
 # Debug requests
 # requests_log = logging.getLogger("requests.packages.urllib3")
@@ -18,8 +52,254 @@ app_config: DeployConfig
 # requests_log.propagate = True
 
 
-def init_connection(url: str, username: str, token: str):
-    global art
+class Session:
+    """
+    Connection to one Artifactory instance, owning the client with its connection pool and adaptive limiter and
+    the cached snapshot (indexed server configuration)
+    A session can be shared by concurrent callers and reused for many applies, so a long running process pays
+    connection setup and snapshot fetching only once. The state of a single apply lives in a Reconciler.
+    """
+
+    def __init__(self, config: DeployConfig):
+        self.config = config
+        self.limiter = AdaptiveLimiter(config.max_requests, config.max_rps)
+        self.ignores = IgnoreMatcher(config.unmanaged_ignores)
+        http = pooled_session(self.limiter, config.max_requests)
+        self.art = connect(config.artifactory_url, config.artifactory_user, config.artifactory_token, http)
+        self.api = ApiClient(config.artifactory_url, config.artifactory_user, config.artifactory_token, http)
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def get_configuration(self) -> dict:
+        """Fetch the lists of users, groups, permissions and repos from Artifactory (see get_configuration)"""
+        return get_configuration(self.api)
+
+    def snapshot(self, refresh: bool = False) -> dict:
+        """Return the indexed server configuration, fetched on first use and kept up to date by the applies of
+        this session
+        :param refresh: fetch the server configuration again, i.e. if it was changed by someone else
+        :return: a copy of the snapshot, which the caller may modify
+        """
+        with self._lock:
+            if self._snapshot is None or refresh:
+                self._snapshot = fetch_snapshot(self.api)
+            return {snapshot_type: dict(items) for snapshot_type, items in self._snapshot.items()}
+
+    def reset_snapshot(self):
+        """Fetch the server configuration again on next use, i.e. after a failed apply"""
+        with self._lock:
+            self._snapshot = None
+
+    def update_snapshot(self, snapshot: dict):
+        """Add the objects created by an apply (present in its copy of the snapshot) to the cached snapshot"""
+        with self._lock:
+            for snapshot_type, items in snapshot.items():
+                cached = self._snapshot[snapshot_type]
+                for key, item in items.items():
+                    cached.setdefault(key, item)
+
+    def apply(self, config_objects: dict, dry_run: bool = None, log_unmanaged: bool = True) -> RunReport:
+        """Apply config objects to Artifactory
+        :param config_objects: dict with the config objects to apply
+        :param dry_run: make no changes, defaults to the dry run setting of the config
+        :param log_unmanaged: log server objects which are not part of config_objects
+        :return: the report of this apply
+        """
+        config = self.config
+        dry_run = config.dry_run if dry_run is None else dry_run
+        snapshot = self.snapshot()
+
+        if dry_run:
+            logging.info("Dry run enabled - no changes will be deployed")
+
+        if config.shard:
+            index, count = config.get_shard()
+            sharded_objects = sharding.shard_config(config_objects, index, count)
+            snapshot = sharding.shard_snapshot(snapshot, config_objects, sharded_objects, index, count, OBJECT_TYPES)
+            config_objects = sharded_objects
+
+        journal = Journal()
+        if config.journal_dir and not dry_run:
+            journal = Journal.open(config.journal_dir, config.artifactory_url, config_hash(config_objects),
+                                   config.resume)
+
+        try:
+            run_report = Reconciler(self, dry_run, journal).apply(config_objects, snapshot, log_unmanaged)
+        finally:
+            journal.close()
+
+        self.update_snapshot(snapshot)
+        run_report.concurrency[run_report.target] = self.limiter.stats()
+        return run_report
+
+    def fetch_object(self, config_type: str, key: str):
+        """Fetch the full definition of an object from Artifactory
+        :param config_type: type of the config object (key in config objects, i.e. 'users')
+        :param key: name or key of the object
+        :return: the pyartifactory response model
+        """
+        if config_type in REPO_TYPES:
+            return self.art.repositories.get_repo(key)
+
+        return getattr(self.art, config_type).get(key)
+
+    @profiled("fetch")
+    def fetch_objects(self, keys: list, errors: dict = None) -> dict:
+        """Fetch the full definitions of many objects - repos with a single request from the system configuration
+        descriptor if possible, the other objects with concurrent requests passing the adaptive limiter
+        Objects which can't be fetched (i.e. deleted since they were listed) are left out
+        :param keys: list of (config type, name or key)
+        :param errors: optional dict collecting the error per object which couldn't be fetched
+        :return: dict of (config type, name or key) -> pyartifactory response model
+        """
+        fetched = {}
+        if any(config_type in REPO_TYPES for config_type, _ in keys):
+            repos = self.fetch_repository_definitions()
+            fetched = {(config_type, key): repos[key] for config_type, key in keys
+                       if config_type in REPO_TYPES and key in repos}
+
+        remaining = [item for item in keys if item not in fetched]
+        logging.info(f"Fetching {len(remaining)} object definitions")
+        with ThreadPoolExecutor(max_workers=self.config.max_requests) as executor:
+            for item, model, error in executor.map(self._try_fetch_object, remaining):
+                if error is None:
+                    fetched[item] = model
+                    continue
+
+                logging.warning(f"Failed to fetch {item[0]} '{item[1]}': {error}")
+                if errors is not None:
+                    errors[item] = error
+
+        return fetched
+
+    def _try_fetch_object(self, item: tuple) -> tuple:
+        try:
+            return item, self.fetch_object(*item), None
+        except (ArtifactoryException, requests.exceptions.RequestException) as e:
+            return item, None, e
+
+    @profiled("fetch")
+    def fetch_repository_definitions(self) -> dict:
+        """Fetch the full definitions of all repos with a single request from the system configuration descriptor
+        Needs admin permissions - if the descriptor can't be fetched or parsed an empty dict is returned and repos
+        have to be fetched one by one with fetch_object
+        :return: dict of repo key -> pyartifactory repo response model
+        """
+        try:
+            with self.api.get("system/configuration", stream=True) as response:
+                response.raw.decode_content = True
+                repos = descriptor.parse_repositories(response.raw)
+        except (requests.exceptions.RequestException, ParseError) as e:
+            logging.info(f"System configuration not available, fetching repos one by one ({e})")
+            return {}
+
+        logging.info(f"Fetched {len(repos)} repo definitions from system configuration")
+        return repos
+
+    def execute_operation(self, config_type: str, action: str, model):
+        """Create or update an object in Artifactory
+        :param config_type: type of the config object (key in config objects, i.e. 'users')
+        :param action: 'create' or 'update'
+        :param model: the pyartifactory model to send
+        """
+        if config_type in REPO_TYPES:
+            getattr(self.art.repositories, f"{action}_repo")(model)
+            return
+
+        client = getattr(self.art, config_type)
+        getattr(client, action)(model)
+
+        if config_type == 'groups' and action == 'create':
+            client.update(model)
+
+    def delete_object(self, config_type: str, key: str) -> bool:
+        """Delete an object from Artifactory with a single request
+        :param config_type: type of the config object (key in config objects, i.e. 'users')
+        :param key: name or key of the object
+        :return: False if the object didn't exist (anymore)
+        """
+        deleted = True
+        try:
+            self.api.delete(f"{LIST_ENDPOINTS['repos' if config_type in REPO_TYPES else config_type]}/{key}")
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code != 404:
+                raise
+            deleted = False
+
+        snapshot_type = next(snapshot_type for _, item_type, snapshot_type in OBJECT_TYPES if item_type == config_type)
+        with self._lock:
+            if self._snapshot is not None:
+                self._snapshot[snapshot_type].pop(key, None)
+
+        return deleted
+
+
+class Reconciler:
+    """
+    A single apply of config objects, holding the state of the run (report, progress, journal)
+    Concurrent applies of one session each use their own reconciler and copy of the snapshot.
+    """
+
+    def __init__(self, session: Session, dry_run: bool, journal: Journal = None):
+        self.session = session
+        self.art = session.art
+        self.dry_run = dry_run
+        self.journal = journal or Journal()
+        self.report = RunReport(session.config.artifactory_url)
+        self.progress = Progress(0, "")
+
+    def apply(self, config_objects: dict, snapshot: dict, log_unmanaged: bool = True) -> RunReport:
+        """Apply config objects against an indexed snapshot of the server configuration
+        Created objects are added to the snapshot so it stays valid for subsequent calls
+        :param config_objects: dict with the config objects to apply
+        :param snapshot: the indexed server configuration (see index_configuration)
+        :param log_unmanaged: log server objects which are not part of config_objects
+        :return: the report of this apply
+        """
+        apply_objects(self, config_objects, snapshot, log_unmanaged)
+        return self.report
+
+
+class ApiClient:
+    """
+    Plain client for the requests without a public pyartifactory method (raw list responses, system configuration)
+    and for deletes, which pyartifactory precedes with a get of the object
+    It shares the connection pool of the pyartifactory clients, so its requests pass the adaptive limiter as well
+    """
+
+    def __init__(self, url: str, username: str, token: str, session: requests.Session):
+        self.url = f"{url.rstrip('/')}/api"
+        self.auth = (username, token) if token is not None and username is not None else None
+        self.session = session
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self._request('get', path, **kwargs)
+
+    def delete(self, path: str) -> requests.Response:
+        return self._request('delete', path)
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        response = getattr(self.session, method)(f"{self.url}/{path}", auth=self.auth, **kwargs)
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError:
+            # release the connection of streamed responses
+            response.close()
+            raise
+        return response
+
+
+def pooled_session(limiter: AdaptiveLimiter, max_requests: int = 64) -> requests.Session:
+    """Create the requests session with the connection pool passing the adaptive limiter"""
+    session = requests.Session()
+    adapter = LimitedAdapter(limiter, pool_maxsize=max_requests)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def connect(url: str, username: str, token: str, session: requests.Session) -> Artifactory:
+    """Create the Artifactory client, all its clients share the connection pool of the given session"""
     api_version = 2
 
     if token is not None and username is not None:
@@ -29,26 +309,100 @@ def init_connection(url: str, username: str, token: str):
         logging.info(f"Initialising connection to '{url}' without auth")
         art = Artifactory(url=url, api_version=api_version)
 
+    for client in [art.users, art.groups, art.permissions, art.repositories]:
+        client.session = session
+
     # Try to list repos to force an exception on invalid connect configuration
     # art.repositories.list()
+    return art
 
 
-def get_configuration() -> dict:
-    global art
+def get_configuration(api: ApiClient) -> dict:
+    """Fetch the lists of users, groups, permissions and repos from Artifactory
+    The listed objects are kept as compact SnapshotEntry objects instead of pydantic models
+    :return: dict with lists of SnapshotEntry objects
+    """
     logging.info("#####   Fetching current configuration from artifactory   #####")
-    current_config = {'users': art.users.list(),
-                      'groups': art.groups.list(),
-                      'permissions': art.permissions.list(),
-                      'localRepos': [repo for repo in art.repositories.list() if repo.type == 'LOCAL'],
-                      'remoteRepos': [repo for repo in art.repositories.list() if repo.type == 'REMOTE'],
-                      'virtualRepos': [repo for repo in art.repositories.list() if repo.type == 'VIRTUAL']
+    repos = __list_entries(api, 'repos', 'key')
+    current_config = {'users': __list_entries(api, 'users'),
+                      'groups': __list_entries(api, 'groups'),
+                      'permissions': __list_entries(api, 'permissions'),
+                      'localRepos': [repo for repo in repos if repo.type == 'LOCAL'],
+                      'remoteRepos': [repo for repo in repos if repo.type == 'REMOTE'],
+                      'virtualRepos': [repo for repo in repos if repo.type == 'VIRTUAL']
                       }
 
-    logging.debug(f"Current configuration {current_config}")
+    logging.debug("Current configuration %s", current_config)
 
     return current_config
 
 
+@profiled("fetch")
+def fetch_snapshot(api: ApiClient) -> dict:
+    """Fetch and check the server configuration and index it (see index_configuration)"""
+    current_config = get_configuration(api)
+    __check_group_config(current_config)
+    return index_configuration(current_config)
+
+
+def __list_entries(api: ApiClient, list_type: str, key_field: str = 'name') -> list:
+    # Use the raw json of the list endpoint, building a pydantic model for each item is slow and memory hungry
+    response = api.get(LIST_ENDPOINTS[list_type])
+    return [SnapshotEntry.from_dict(item, key_field) for item in response.json()]
+
+
+def apply_to_targets(config_objects: dict, config: DeployConfig) -> RunReport:
+    """Apply the configuration to all configured targets (Artifactory instances) in parallel
+    Each target is processed in its own process with its own connection and server configuration
+    :param config_objects: dict with all config objects
+    :param config: the config class holding config settings
+    :return: the merged report of all targets, targets which failed completely are reported as failed 'target'
+    """
+    targets = config.get_targets()
+    logging.info(f"Deploying configuration to {len(targets)} Artifactory instances")
+    overall = RunReport("overall")
+
+    with ProcessPoolExecutor(max_workers=min(len(targets), config.max_parallel_targets)) as executor:
+        futures = {executor.submit(_apply_to_target, config_objects, config.for_target(target), target['name']): target
+                   for target in targets}
+
+        for future in as_completed(futures):
+            target = futures[future]
+            try:
+                target_report = future.result()
+            except Exception as e:
+                logging.error(f"[{target['name']}] Deploy failed: {e!r}")
+                overall.add_failure('target', target['name'])
+                continue
+
+            target_report.log_summary()
+            overall.merge(target_report)
+
+    overall.log_summary()
+    return overall
+
+
+def _apply_to_target(config_objects: dict, config: DeployConfig, name: str) -> RunReport:
+    # runs in a worker process, which only logs for this target
+    output.set_log_target(name)
+
+    target_report = Session(config).apply(config_objects)
+    target_report.target = name
+    return target_report
+
+
+def index_configuration(current_config: dict) -> dict:
+    """Index the lists of the current configuration by name (users, groups, permissions) or key (repos)
+    :param current_config: the configuration as returned by get_configuration
+    :return: dict with the same keys holding dicts of name -> object
+    """
+    return {item_type: {__item_key(item): item for item in items} for item_type, items in current_config.items()}
+
+
+def __item_key(item):
+    return item.key if hasattr(item, 'key') else item.name
+
+
 def __check_group_config(current_config):
     logging.info("#####   Checking group configs in Artifactory   #####")
     all_groups = {}
@@ -63,200 +417,265 @@ def __check_group_config(current_config):
             logging.info(f"Group '{item.name}' has uppercase characters")
 
 
-def apply_configuration(config_objects: dict, config: DeployConfig):
-    global art
-    global app_config
-    current_config = get_configuration()
-    app_config = config
+def apply_objects(run: Reconciler, config_objects: dict, snapshot: dict, log_unmanaged: bool = True):
+    """Apply config objects against an indexed snapshot of the server configuration (see Reconciler.apply)
+    :param run: the reconciler holding connection, report and journal of the apply
+    """
+    run.progress = Progress(sum(len(config_objects[config_type]) for _, config_type, _ in OBJECT_TYPES),
+                            "Processing config objects")
 
-    __check_group_config(current_config)
+    __apply_local_repo_config(run, config_objects['localRepositories'], snapshot['localRepos'])
+    __apply_remote_repo_config(run, config_objects['remoteRepositories'], snapshot['remoteRepos'])
+    __apply_virtual_repo_config(run, config_objects['virtualRepositories'], snapshot['virtualRepos'])
+    __apply_user_config(run, config_objects, snapshot)
+    __apply_group_config(run, config_objects, snapshot)
+    __apply_permission_config(run, config_objects, snapshot)
 
-    if config.dry_run:
-        logging.info("Dry run enabled - no changes will be deployed")
+    if not log_unmanaged:
+        return
 
-    __apply_local_repo_config(config_objects['localRepositories'], current_config['localRepos'], config.dry_run)
-    __apply_remote_repo_config(config_objects['remoteRepositories'], current_config['remoteRepos'], config.dry_run)
-    __apply_virtual_repo_config(config_objects['virtualRepositories'], current_config['virtualRepos'],
-                                config.dry_run)
-    __apply_user_config(config_objects, current_config, config.dry_run)
-    __apply_group_config(config_objects, current_config, config.dry_run)
-    __apply_permission_config(config_objects, current_config, config.dry_run)
+    for item_type, config_type, snapshot_type in OBJECT_TYPES:
+        __log_unmanaged_items(item_type, [key for key in snapshot[snapshot_type]
+                                          if key not in config_objects[config_type]],
+                              run.session.ignores, run.report)
 
 
-def __apply_user_config(config_objects, current_config, dry_run: bool):
-    global art
+@profiled("apply users")
+def __apply_user_config(run: Reconciler, config_objects, current_config):
     logging.info("#####   Applying user configs   #####")
 
     for key, value in config_objects['users'].items():
-        logging.info(f"Processing user '{key}'")
+        object_log.info("Processing user '%s'", key)
+        run.progress.advance()
+        if __is_journaled(run, 'users', 'user', key):
+            continue
+        run.journal.begin('users', key)
         # value = map_fields(value, {'disableUIAccess': 'disable_ui',
         #                            'profileUpdatable': 'profile_updatable'})
         try:
-            if any(x.name == key for x in current_config['users']):
-                user = User(**value)
+            if key in current_config['users']:
+                user = build_model('users', key, value)
 
-                if not dry_run:
-                    art.users.update(user)
+                if not run.dry_run:
+                    run.art.users.update(user)
                 action = 'updated'
-                current_config['users'].remove(next((x for x in current_config['users'] if x.name == key), None))
             else:
-                # TODO password via template or generated
-                if 'password' not in value:
-                    value['password'] = 'dfiököjwie394rkK'
-                user = NewUser(**value)
-                if not dry_run:
-                    art.users.create(user)
+                user = build_model('users', key, value, exists=False)
+                if not run.dry_run:
+                    run.art.users.create(user)
+                    current_config['users'][key] = SnapshotEntry(key)
                 action = 'created'
 
-            logging.info(f"User '{key}' successfully {action}")
+            run.journal.done('users', key, action)
+            object_log.info("User '%s' successfully %s", key, action)
+            run.report.add('user', action)
         except requests.exceptions.HTTPError as e:
-            __log_api_error(e)
-
-    __log_unmanaged_items("user", [item.name for item in current_config['users']])
+            log_api_error(e)
+            run.report.add_failure('user', key)
 
 
-def __apply_group_config(config_objects, current_config, dry_run: bool):
-    global art
+@profiled("apply groups")
+def __apply_group_config(run: Reconciler, config_objects, current_config):
     logging.info("#####   Applying group configs   #####")
 
     for key, value in config_objects['groups'].items():
-        logging.info(f"Processing group '{key}'")
-        group = Group(**value)
+        object_log.info("Processing group '%s'", key)
+        run.progress.advance()
+        if __is_journaled(run, 'groups', 'group', key):
+            continue
+        run.journal.begin('groups', key)
+        group = build_model('groups', key, value)
 
         try:
-            if any(x.name == key for x in current_config['groups']):
-                if not dry_run:
-                    art.groups.update(group)
+            if key in current_config['groups']:
+                if not run.dry_run:
+                    run.art.groups.update(group)
                 action = 'updated'
-                current_config['groups'].remove(next((x for x in current_config['groups'] if x.name == key), None))
             else:
-                if not dry_run:
-                    art.groups.create(group)
-                    art.groups.update(group)
+                if not run.dry_run:
+                    run.art.groups.create(group)
+                    run.art.groups.update(group)
+                    current_config['groups'][key] = SnapshotEntry(key)
                 action = 'created'
 
-            logging.info(f"Group '{key}' successfully {action}")
+            run.journal.done('groups', key, action)
+            object_log.info("Group '%s' successfully %s", key, action)
+            run.report.add('group', action)
         except requests.exceptions.HTTPError as e:
-            __log_api_error(e)
+            log_api_error(e)
+            run.report.add_failure('group', key)
 
-    __log_unmanaged_items("group", [item.name for item in current_config['groups']])
 
-
-def __apply_permission_config(config_objects, current_config, dry_run: bool):
-    global art
+@profiled("apply permissions")
+def __apply_permission_config(run: Reconciler, config_objects, current_config):
     logging.info("#####   Applying permission configs   #####")
 
     for key, value in config_objects['permissions'].items():
-        logging.info(f"Processing permission '{key}'")
-        permission = PermissionV2(**value)
+        object_log.info("Processing permission '%s'", key)
+        run.progress.advance()
+        if __is_journaled(run, 'permissions', 'permission', key):
+            continue
+        run.journal.begin('permissions', key)
+        permission = build_model('permissions', key, value)
 
         try:
-            if any(x.name == key for x in current_config['permissions']):
-                if not dry_run:
-                    art.permissions.update(permission)
+            if key in current_config['permissions']:
+                if not run.dry_run:
+                    run.art.permissions.update(permission)
                 action = 'updated'
-                current_config['permissions'].remove(
-                    next((x for x in current_config['permissions'] if x.name == key), None))
             else:
-                if not dry_run:
-                    art.permissions.create(permission)
+                if not run.dry_run:
+                    run.art.permissions.create(permission)
+                    current_config['permissions'][key] = SnapshotEntry(key)
                 action = 'created'
-            logging.info(f"Permission '{key}' successfully {action}")
+            run.journal.done('permissions', key, action)
+            object_log.info("Permission '%s' successfully %s", key, action)
+            run.report.add('permission', action)
         except requests.exceptions.HTTPError as e:
-            __log_api_error(e)
-
-    __log_unmanaged_items("permission", [item.name for item in current_config['permissions']])
+            log_api_error(e)
+            run.report.add_failure('permission', key)
 
 
-def __apply_local_repo_config(config_objects, current_config, dry_run: bool):
-    global art
+@profiled("apply local repos")
+def __apply_local_repo_config(run: Reconciler, config_objects, current_config):
     logging.info("#####   Applying local repo configs   #####")
 
     for key, value in config_objects.items():
-        logging.info(f"Processing local repo '{key}'")
-        value['key'] = key
-        value['packageType'] = value['type']
-        value['repoLayoutRef'] = value['repoLayout']
-        local_repo = LocalRepository(**value)
+        object_log.info("Processing local repo '%s'", key)
+        run.progress.advance()
+        if __is_journaled(run, 'localRepositories', 'local repo', key):
+            continue
+        run.journal.begin('localRepositories', key)
+        local_repo = build_model('localRepositories', key, value)
 
         try:
-            if any(x.key == key for x in current_config):
-                if not dry_run:
-                    art.repositories.update_repo(local_repo)
+            if key in current_config:
+                if not run.dry_run:
+                    run.art.repositories.update_repo(local_repo)
                 action = 'updated'
-                current_config.remove(
-                    next((x for x in current_config if x.key == key), None))
             else:
-                if not dry_run:
-                    art.repositories.create_repo(local_repo)
+                if not run.dry_run:
+                    run.art.repositories.create_repo(local_repo)
+                    current_config[key] = SnapshotEntry(key, 'LOCAL')
                 action = 'created'
-            logging.info(f"Local repo '{key}' successfully {action}")
+            run.journal.done('localRepositories', key, action)
+            object_log.info("Local repo '%s' successfully %s", key, action)
+            run.report.add('local repo', action)
         except requests.exceptions.HTTPError as e:
-            __log_api_error(e)
-
-    __log_unmanaged_items("local repo", [item.key for item in current_config])
+            log_api_error(e)
+            run.report.add_failure('local repo', key)
 
 
-def __apply_remote_repo_config(config_objects, current_config, dry_run: bool):
-    global art
+@profiled("apply remote repos")
+def __apply_remote_repo_config(run: Reconciler, config_objects, current_config):
     logging.info("#####   Applying remote repo configs   #####")
 
     for key, value in config_objects.items():
-        logging.info(f"Processing remote repo '{key}'")
-        value['key'] = key
-        value['packageType'] = value['type']
-        value['repoLayoutRef'] = value['repoLayout']
-        value['bypassHeadRequest'] = value['bypassHeadRequests']
-        remote_repo = RemoteRepository(**value)
+        object_log.info("Processing remote repo '%s'", key)
+        run.progress.advance()
+        if __is_journaled(run, 'remoteRepositories', 'remote repo', key):
+            continue
+        run.journal.begin('remoteRepositories', key)
+        remote_repo = build_model('remoteRepositories', key, value)
 
         try:
-            if any(x.key == key for x in current_config):
-                if not dry_run:
-                    art.repositories.update_repo(remote_repo)
+            if key in current_config:
+                if not run.dry_run:
+                    run.art.repositories.update_repo(remote_repo)
                 action = 'updated'
-                current_config.remove(
-                    next((x for x in current_config if x.key == key), None))
             else:
-                if not dry_run:
-                    art.repositories.create_repo(remote_repo)
+                if not run.dry_run:
+                    run.art.repositories.create_repo(remote_repo)
+                    current_config[key] = SnapshotEntry(key, 'REMOTE')
                 action = 'created'
-            logging.info(f"Remote repo '{key}' successfully {action}")
+            run.journal.done('remoteRepositories', key, action)
+            object_log.info("Remote repo '%s' successfully %s", key, action)
+            run.report.add('remote repo', action)
         except requests.exceptions.HTTPError as e:
-            __log_api_error(e)
-
-    __log_unmanaged_items("remote repo", [item.key for item in current_config])
+            log_api_error(e)
+            run.report.add_failure('remote repo', key)
 
 
-def __apply_virtual_repo_config(config_objects, current_config, dry_run: bool):
-    global art
+@profiled("apply virtual repos")
+def __apply_virtual_repo_config(run: Reconciler, config_objects, current_config):
     logging.info("#####   Applying virtual repo configs   #####")
 
     for key, value in config_objects.items():
-        logging.info(f"Processing virtual repo '{key}'")
-        value['key'] = key
-        value['packageType'] = value['type']
-        value['repoLayoutRef'] = value['repoLayout']
-        repo = VirtualRepository(**value)
+        object_log.info("Processing virtual repo '%s'", key)
+        run.progress.advance()
+        if __is_journaled(run, 'virtualRepositories', 'virtual repo', key):
+            continue
+        run.journal.begin('virtualRepositories', key)
+        repo = build_model('virtualRepositories', key, value)
 
         try:
-            if any(x.key == key for x in current_config):
-                if not dry_run:
-                    art.repositories.update_repo(repo)
+            if key in current_config:
+                if not run.dry_run:
+                    run.art.repositories.update_repo(repo)
                 action = 'updated'
-                current_config.remove(
-                    next((x for x in current_config if x.key == key), None))
             else:
-                if not dry_run:
-                    art.repositories.create_repo(repo)
+                if not run.dry_run:
+                    run.art.repositories.create_repo(repo)
+                    current_config[key] = SnapshotEntry(key, 'VIRTUAL')
                 action = 'created'
-            logging.info(f"Virtual repo '{key}' successfully {action}")
+            run.journal.done('virtualRepositories', key, action)
+            object_log.info("Virtual repo '%s' successfully %s", key, action)
+            run.report.add('virtual repo', action)
         except requests.exceptions.HTTPError as e:
-            __log_api_error(e)
+            log_api_error(e)
+            run.report.add_failure('virtual repo', key)
+
+
+def __is_journaled(run: Reconciler, config_type: str, item_type: str, key: str) -> bool:
+    # object already applied by an interrupted deploy which is resumed
+    if not run.journal.is_done(config_type, key):
+        return False
+
+    object_log.info("%s '%s' already applied (journal)", item_type.capitalize(), key)
+    run.report.add(item_type, 'skipped')
+    return True
+
+
+def build_model(config_type: str, key: str, value: dict, exists: bool = True):
+    """Build the pyartifactory model for a config object
+    :param config_type: type of the config object (key in config objects, i.e. 'users')
+    :param key: name or key of the object
+    :param value: the config object
+    :param exists: whether the object already exists in Artifactory (new users need a password)
+    :return: the pyartifactory model
+    """
+    if config_type == 'users':
+        if exists:
+            return User(**value)
+        # users without password (i.e. logging in via LDAP/SSO) get a random one, nobody knows it
+        return NewUser(**{'password': secrets.token_urlsafe(24), **value})
+    elif config_type == 'groups':
+        return Group(**value)
+    elif config_type == 'permissions':
+        return PermissionV2(**value)
+
+    value = {**value, 'key': key, 'packageType': value['type'], 'repoLayoutRef': value['repoLayout']}
+
+    if config_type == 'localRepositories':
+        return LocalRepository(**value)
+    elif config_type == 'remoteRepositories':
+        value['bypassHeadRequest'] = value['bypassHeadRequests']
+        return RemoteRepository(**value)
+    elif config_type == 'virtualRepositories':
+        return VirtualRepository(**value)
 
-    __log_unmanaged_items("virtual repo", [item.key for item in current_config])
+    raise ValueError(f"Unknown config type '{config_type}'")
 
 
-def __log_api_error(e):
+def build_model_from_payload(config_type: str, action: str, payload: dict):
+    """Build the pyartifactory model from a serialized model (see build_model)"""
+    if config_type == 'users':
+        return NewUser(**payload) if action == 'create' else User(**payload)
+
+    return MODEL_CLASSES[config_type](**payload)
+
+
+def log_api_error(e):
     logging.error(f"Request to {e.response.url} failed with status {e.response}")
     logging.error(f"Request body: {e.request.body}")
     logging.error(f"Response: {e.response.text}")
@@ -275,12 +694,7 @@ def __map_fields(obj, mapping):
     return new_obj
 
 
-def __log_unmanaged_items(item_type: str, items: list):
-    global app_config
-
-    # Make a regex that matches if any of our regexes match.
-    ignore_regex = "(" + ")|(".join(app_config.unmanaged_ignores) + ")"
-
-    for item in items:
-        if not re.match(ignore_regex, item):
-            logging.info(f"Unmanaged {item_type} '{item}' found")
+def __log_unmanaged_items(item_type: str, items: list, ignores: IgnoreMatcher, run_report: RunReport):
+    for item in ignores.unmanaged(items):
+        object_log.info("Unmanaged %s '%s' found", item_type, item)
+        run_report.add_unmanaged(item_type, item)
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Union
+
+from pydantic import parse_obj_as
+from pyartifactory.models import Group, PermissionV2, UserResponse, LocalRepositoryResponse, \
+    RemoteRepositoryResponse, VirtualRepositoryResponse
+from pyartifactory.utils import custom_encoder
+
+try:
+    import httpx
+except ImportError:  # optional dependency, only needed for async requests
+    httpx = None
+
+from .helper import DeployConfig
+from .limiter import AdaptiveLimiter, parse_retry_after
+
+ENDPOINTS = {'users': 'security/users',
+             'groups': 'security/groups',
+             'permissions': 'v2/security/permissions',
+             'localRepositories': 'repositories',
+             'remoteRepositories': 'repositories',
+             'virtualRepositories': 'repositories'}
+REPO_RESPONSE = Union[LocalRepositoryResponse, VirtualRepositoryResponse, RemoteRepositoryResponse]
+
+
+class AsyncArtifactory:
+    """
+    Asyncio client for the Artifactory endpoints used for deploying (list, get, create and update of users, groups,
+    permissions and repos). Requests and responses use the pyartifactory models. In contrast to pyartifactory no
+    additional requests are made to check if an object exists before creating or updating it.
+    """
+
+    def __init__(self, url: str, username: str = None, token: str = None, max_requests: int = 64,
+                 max_rps: float = 0, transport=None):
+        if httpx is None:
+            raise RuntimeError("Async requests need the package 'httpx' (pip install httpx)")
+
+        self.limiter = AdaptiveLimiter(max_requests, max_rps)
+        self.client = httpx.AsyncClient(base_url=f"{url.rstrip('/')}/api/",
+                                        auth=(username, token) if username and token else None,
+                                        limits=httpx.Limits(max_connections=max_requests),
+                                        timeout=httpx.Timeout(60, pool=None),
+                                        transport=transport)
+
+    @classmethod
+    def from_config(cls, config: DeployConfig, transport=None):
+        return cls(config.artifactory_url, config.artifactory_user, config.artifactory_token,
+                   config.max_requests, config.max_rps, transport)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.client.aclose()
+
+    async def list(self, config_type: str) -> list:
+        """List all objects of a type as raw json (repos of all types are returned for repo types)"""
+        return (await self._request('GET', ENDPOINTS[config_type])).json()
+
+    async def get(self, config_type: str, key: str):
+        """Get the full definition of an object as pyartifactory response model"""
+        params = {'includeUsers': True} if config_type == 'groups' else None
+        data = (await self._request('GET', f"{ENDPOINTS[config_type]}/{key}", params=params)).json()
+
+        if config_type == 'users':
+            return UserResponse(**data)
+        elif config_type == 'groups':
+            return Group(**data)
+        elif config_type == 'permissions':
+            return PermissionV2(**data)
+
+        return parse_obj_as(REPO_RESPONSE, data)
+
+    async def create(self, config_type: str, model):
+        await self._request('PUT', f"{ENDPOINTS[config_type]}/{self._key(config_type, model)}",
+                            self._payload(config_type, model, exclude_unset=False))
+
+        if config_type == 'groups':
+            # like in artifactory.Session.execute_operation, some group fields are only set by an update
+            await self.update(config_type, model)
+
+    async def update(self, config_type: str, model):
+        # permissions are replaced with PUT, all other objects are updated with POST
+        method = 'PUT' if config_type == 'permissions' else 'POST'
+        await self._request(method, f"{ENDPOINTS[config_type]}/{self._key(config_type, model)}",
+                            self._payload(config_type, model, exclude_unset=True, update=True))
+
+    async def execute(self, config_type: str, action: str, model):
+        await getattr(self, action)(config_type, model)
+
+    async def _request(self, method: str, route: str, data=None, params=None):
+        content = json.dumps(data, default=custom_encoder).encode() if data is not None else None
+
+        await self.limiter.acquire_async()
+        start = time.monotonic()
+        status = 0
+        retry_after = 0
+
+        try:
+            response = await self.client.request(method, route, content=content, params=params,
+                                                 headers={'Content-Type': 'application/json'} if content else None)
+            status = response.status_code
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        finally:
+            self.limiter.release(time.monotonic() - start, status, retry_after)
+
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _key(config_type: str, model) -> str:
+        return model.name if config_type in ['users', 'groups', 'permissions'] else model.key
+
+    @staticmethod
+    def _payload(config_type: str, model, exclude_unset: bool, update: bool = False):
+        # same payloads as sent by pyartifactory (secrets like the password of new users are revealed on encoding)
+        if config_type == 'users' and update:
+            # read only fields of a user, not sent by pyartifactory's update either
+            return model.dict(exclude={'lastLoggedIn', 'realm'})
+        elif config_type in ['users', 'groups']:
+            return model.dict()
+        elif config_type == 'permissions':
+            return model.dict(by_alias=True)
+
+        return model.dict(exclude_unset=exclude_unset)
+
+
+def fetch_objects(config: DeployConfig, keys: list, transport=None) -> dict:
+    """Fetch the full definitions of many objects concurrently
+    Objects which fail to be fetched are logged and left out, so the caller can fetch them again one by one
+    :param config: the config class holding config settings
+    :param keys: list of (config type, key) tuples
+    :return: dict of (config type, key) -> pyartifactory response model
+    """
+    async def fetch_all():
+        async with AsyncArtifactory.from_config(config, transport) as client:
+            fetched = await asyncio.gather(*(client.get(config_type, key) for config_type, key in keys),
+                                           return_exceptions=True)
+            log_limiter_stats(client.limiter)
+            return fetched
+
+    logging.info(f"Fetching {len(keys)} objects with up to {config.max_requests} concurrent requests")
+    fetched = {}
+    for key, result in zip(keys, asyncio.run(fetch_all())):
+        if isinstance(result, Exception):
+            logging.warning(f"Failed to fetch {key[0]} '{key[1]}'")
+            log_api_error(result)
+        else:
+            fetched[key] = result
+
+    return fetched
+
+
+def execute_operations(config: DeployConfig, operations: list, transport=None) -> list:
+    """Execute create and update operations concurrently
+    Operations are executed in stages by object type (in the given order), so i.e. repos exist before virtual repos
+    referencing them are created
+    :param config: the config class holding config settings
+    :param operations: list of (config type, action, model) tuples
+    :return: list of results in the order of the operations, None for successful operations or the exception
+    """
+    async def execute_all():
+        results = []
+        async with AsyncArtifactory.from_config(config, transport) as client:
+            for stage in _stages(operations):
+                results.extend(await asyncio.gather(*(client.execute(*operation) for operation in stage),
+                                                    return_exceptions=True))
+            log_limiter_stats(client.limiter)
+        return results
+
+    return asyncio.run(execute_all())
+
+
+def _stages(operations: list) -> list:
+    stages = []
+
+    for operation in operations:
+        if not stages or stages[-1][-1][0] != operation[0]:
+            stages.append([])
+        stages[-1].append(operation)
+
+    return stages
+
+
+def log_limiter_stats(limiter: AdaptiveLimiter):
+    stats = limiter.stats()
+    logging.info(f"Concurrency limit {stats['limit']} (min {stats['min_limit']}, max {stats['max_limit']}), "
+                 f"{stats['throttled']} of {stats['requests']} requests throttled")
+
+
+def log_api_error(e):
+    if isinstance(e, httpx.HTTPStatusError):
+        logging.error(f"Request to {e.request.url} failed with status {e.response.status_code}")
+        logging.error(f"Request body: {e.request.content.decode()}")
+        logging.error(f"Response: {e.response.text}")
+    else:
+        logging.error(f"Request failed: {e!r}")
@@ -0,0 +1,130 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from . import artifactory
+from .helper import AuditConfig
+from .output import object_log, Progress
+from .patterns import IgnoreMatcher
+from .report import RunReport
+
+# objects are deleted in this order, so no object is deleted while still referenced by another one
+PRUNE_ORDER = ['permissions', 'virtualRepositories', 'localRepositories', 'remoteRepositories', 'groups', 'users']
+
+
+def find_unmanaged(config_objects: dict, snapshot: dict, matcher: IgnoreMatcher) -> dict:
+    """Classify the objects of the server configuration which are neither configured nor ignored
+    :param config_objects: dict with all config objects
+    :param snapshot: the indexed server configuration (see artifactory.index_configuration)
+    :param matcher: the ignore patterns
+    :return: dict of config type -> sorted list of unmanaged names/keys
+    """
+    return {config_type: sorted(matcher.unmanaged(snapshot[snapshot_type].keys() - config_objects[config_type].keys()))
+            for _, config_type, snapshot_type in artifactory.OBJECT_TYPES}
+
+
+def audit_configuration(config_objects: dict, session: artifactory.Session) -> RunReport:
+    """Report all unmanaged objects and delete them if pruning is enabled
+    :param config_objects: dict with all config objects
+    :param session: the session connected to Artifactory
+    :return: report with the unmanaged objects and deleted/failed objects
+    """
+    config: AuditConfig = session.config
+    logging.info("#####   Auditing unmanaged objects   #####")
+    unmanaged = find_unmanaged(config_objects, session.snapshot(), session.ignores)
+    item_types = {config_type: item_type for item_type, config_type, _ in artifactory.OBJECT_TYPES}
+    run_report = RunReport(config.artifactory_url)
+
+    for config_type, keys in unmanaged.items():
+        for key in keys:
+            object_log.info("Unmanaged %s '%s' found", item_types[config_type], key)
+            run_report.add_unmanaged(item_types[config_type], key)
+
+    if config.prune:
+        prunable = check_prune_guards(config_objects, unmanaged, int(config.max_deletes))
+        for config_type, keys in unmanaged.items():
+            for key in sorted(set(keys) - set(prunable.get(config_type, []))):
+                run_report.add_failure(item_types[config_type], key)
+        prune_objects(session, prunable, run_report, config.dry_run)
+
+    run_report.concurrency[run_report.target] = session.limiter.stats()
+    return run_report
+
+
+def check_prune_guards(config_objects: dict, unmanaged: dict, max_deletes: int) -> dict:
+    """Safety guards against deleting everything because of an empty or wrong config folder
+    Types without any configured object aren't pruned, nothing is pruned if more objects than max_deletes would be
+    deleted (0 for no limit)
+    :return: dict of config type -> names/keys which may be deleted
+    """
+    item_types = {config_type: item_type for item_type, config_type, _ in artifactory.OBJECT_TYPES}
+    prunable = {}
+
+    for config_type, keys in unmanaged.items():
+        if keys and not config_objects.get(config_type):
+            logging.error(f"No {item_types[config_type]}s configured - not pruning {len(keys)} "
+                          f"{item_types[config_type]}s (empty or wrong config folder?)")
+            continue
+        prunable[config_type] = keys
+
+    count = sum(len(keys) for keys in prunable.values())
+    if max_deletes and count > max_deletes:
+        logging.error(f"!!! Pruning would delete {count} objects (more than {max_deletes}) - nothing pruned, "
+                      f"raise --max-deletes if intended !!!")
+        return {}
+
+    return prunable
+
+
+def prune_objects(session: artifactory.Session, unmanaged: dict, run_report: RunReport, dry_run: bool):
+    """Delete unmanaged objects, type by type (see PRUNE_ORDER) with concurrent requests
+    Requests pass the adaptive limiter of the session, so the server isn't overloaded
+    :param unmanaged: dict of config type -> names/keys to delete
+    """
+    config = session.config
+    item_types = {config_type: item_type for item_type, config_type, _ in artifactory.OBJECT_TYPES}
+    progress = Progress(sum(len(keys) for keys in unmanaged.values()), "Pruning unmanaged objects")
+
+    if dry_run:
+        logging.info("Dry run enabled - no objects will be deleted")
+
+    for config_type in PRUNE_ORDER:
+        keys = unmanaged.get(config_type, [])
+        if config_type == 'users' and config.artifactory_user in keys:
+            logging.warning(f"Not pruning user '{config.artifactory_user}' used for the connection")
+            keys = [key for key in keys if key != config.artifactory_user]
+        if not keys:
+            continue
+
+        logging.info(f"#####   Pruning {len(keys)} unmanaged {item_types[config_type]}s   #####")
+        if dry_run:
+            for key in keys:
+                object_log.info("%s '%s' would be deleted", item_types[config_type].capitalize(), key)
+                run_report.add(item_types[config_type], 'deleted (dry run)')
+            progress.advance(len(keys))
+            continue
+
+        with ThreadPoolExecutor(max_workers=config.max_requests) as executor:
+            futures = {executor.submit(session.delete_object, config_type, key): key for key in keys}
+
+            for future in as_completed(futures):
+                progress.advance()
+                try:
+                    deleted = future.result()
+                except requests.exceptions.HTTPError as e:
+                    artifactory.log_api_error(e)
+                    run_report.add_failure(item_types[config_type], futures[future])
+                    continue
+                except requests.exceptions.RequestException as e:
+                    logging.error(f"Failed to delete {item_types[config_type]} '{futures[future]}': {e}")
+                    run_report.add_failure(item_types[config_type], futures[future])
+                    continue
+
+                if deleted:
+                    object_log.info("%s '%s' successfully deleted", item_types[config_type].capitalize(),
+                                    futures[future])
+                    run_report.add(item_types[config_type], 'deleted')
+                else:
+                    object_log.info("%s '%s' already deleted", item_types[config_type].capitalize(), futures[future])
+                    run_report.add(item_types[config_type], 'already deleted')
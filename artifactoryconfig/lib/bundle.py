@@ -0,0 +1,176 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import sys
+import tempfile
+import zlib
+
+from jinja2 import UndefinedError
+
+from . import configreader
+from .model import intern_strings
+
+BUNDLE_MAGIC = b"ARTCFGBN"
+BUNDLE_VERSION = 1
+# magic, format version, sha256 of the uncompressed payload
+HEADER = struct.Struct(">8sH32s")
+# references to vault secrets, rendered into the bundle instead of the secret values
+SECRET_REF = "__vault__{}__"
+SECRET_REF_REGEX = re.compile(r"__vault__([\w.]+?)__")
+
+
+def compile_configuration(app_config) -> str:
+    """Read and merge all config files and write them into a bundle file
+    Vault secrets are rendered as references and resolved again when the bundle is loaded for a deploy, so the
+    bundle doesn't contain any secrets
+    :param app_config: the config class holding config settings
+    :return: the content hash of the bundle
+    """
+    secret_refs = _secret_refs(configreader.read_vault_files(app_config))
+    try:
+        config_objects = configreader.read_configuration(app_config, secrets=secret_refs)
+    except UndefinedError as e:
+        logging.error(e.message)
+        sys.exit(1)
+    count = sum(len(objects) for objects in config_objects.values())
+
+    digest = write_bundle(config_objects, find_secret_paths(config_objects), app_config.bundle_file)
+    logging.info(f"Compiled {count} config objects into '{app_config.bundle_file}' (sha256 {digest})")
+    return digest
+
+
+def load_configuration(app_config, resolve_secrets: bool = True) -> dict:
+    """Load the config objects from the bundle file if one is configured, otherwise read the config folders
+    :param app_config: the config class holding config settings
+    :param resolve_secrets: replace secret references with the values from the vault files (needed for deploys)
+    :return: dict of all config objects
+    """
+    if not app_config.bundle_file:
+        return configreader.read_configuration(app_config)
+
+    config_objects, secret_paths, digest = read_bundle(app_config.bundle_file)
+    logging.info(f"Loaded config bundle '{app_config.bundle_file}' (sha256 {digest})")
+
+    if secret_paths and resolve_secrets:
+        try:
+            resolve_secret_refs(config_objects, secret_paths, configreader.read_vault_files(app_config))
+        except KeyError as e:
+            logging.error(f"Secret {e} referenced in config bundle not found in vault files")
+            sys.exit(1)
+
+    return config_objects
+
+
+def write_bundle(config_objects: dict, secret_paths: list, bundle_file: str) -> str:
+    """Write config objects as compressed bundle with a header holding format version and content hash
+    :return: the content hash (sha256 of the uncompressed payload)
+    """
+    payload = json.dumps({'config': config_objects, 'secret_paths': secret_paths},
+                         separators=(',', ':'), sort_keys=True).encode()
+    digest = hashlib.sha256(payload).digest()
+
+    fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(bundle_file)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, digest))
+            f.write(zlib.compress(payload))
+        os.replace(tmp_name, bundle_file)
+    except BaseException:
+        os.remove(tmp_name)
+        raise
+
+    return digest.hex()
+
+
+def read_bundle(bundle_file: str) -> tuple:
+    """Read a bundle with a single read and verify format version and content hash
+    :return: tuple of config objects, paths of values with secret references and the content hash
+    """
+    with open(bundle_file, 'rb') as f:
+        content = f.read()
+
+    try:
+        magic, version, digest = HEADER.unpack_from(content)
+    except struct.error:
+        # empty or shorter than the header
+        magic = version = digest = None
+    if magic != BUNDLE_MAGIC:
+        logging.error(f"'{bundle_file}' is not a config bundle")
+        sys.exit(1)
+    if version != BUNDLE_VERSION:
+        logging.error(f"Unsupported config bundle version '{version}' (expected {BUNDLE_VERSION}) - "
+                      f"compile the configuration again")
+        sys.exit(1)
+
+    try:
+        payload = zlib.decompress(content[HEADER.size:])
+    except zlib.error as e:
+        logging.error(f"Config bundle '{bundle_file}' is corrupt ({e})")
+        sys.exit(1)
+    if hashlib.sha256(payload).digest() != digest:
+        logging.error(f"Config bundle '{bundle_file}' is corrupt (content hash mismatch)")
+        sys.exit(1)
+
+    data = json.loads(payload)
+    return intern_strings(data['config']), data['secret_paths'], digest.hex()
+
+
+def find_secret_paths(value, path: list = None) -> list:
+    """Return the paths (list of keys/indexes) of all strings containing secret references"""
+    path = path or []
+
+    if isinstance(value, dict):
+        return [found for key, item in value.items() for found in find_secret_paths(item, path + [key])]
+    elif isinstance(value, list):
+        return [found for index, item in enumerate(value) for found in find_secret_paths(item, path + [index])]
+    elif isinstance(value, str) and SECRET_REF_REGEX.search(value):
+        return [path]
+
+    return []
+
+
+def resolve_secret_refs(config_objects: dict, secret_paths: list, secrets: dict):
+    """Replace the secret references at the given paths with the secret values (in place)
+    A value consisting of a single reference gets the secret value with its type (i.e. numbers, booleans)
+    """
+    for path in secret_paths:
+        parent = config_objects
+        for key in path[:-1]:
+            parent = parent[key]
+
+        match = SECRET_REF_REGEX.fullmatch(parent[path[-1]])
+        if match:
+            parent[path[-1]] = _lookup(secrets, match.group(1))
+        else:
+            parent[path[-1]] = SECRET_REF_REGEX.sub(lambda m: str(_lookup(secrets, m.group(1))), parent[path[-1]])
+
+
+class SecretRef(configreader.Placeholder):
+    """
+    Reference to a secret rendered into a bundle instead of the secret value
+    Output as text the reference is replaced by the value when the bundle is loaded. Any other use in a template
+    (conditions, filters, comparisons) would be evaluated on the reference instead of the value and fails. The
+    default filter and the defined test see the secret as undefined.
+    """
+    __slots__ = []
+
+    def __init__(self, name: str):
+        super().__init__(SECRET_REF.format(name), name,
+                         hint=f"Secret '{name}' is used in template logic (conditions, filters, comparisons) - only "
+                              f"secrets output as text ({{{{ secret }}}}) can be compiled into a bundle")
+
+
+def _secret_refs(secrets: dict, prefix: str = "") -> dict:
+    # same structure as the secrets with references as values, nested values are referenced by dotted names
+    return {name: _secret_refs(value, f"{prefix}{name}.") if isinstance(value, dict)
+            else SecretRef(f"{prefix}{name}") for name, value in secrets.items()}
+
+
+def _lookup(secrets: dict, name: str):
+    value = secrets
+    for key in name.split('.'):
+        value = value[key]
+    return value
@@ -2,19 +2,55 @@ import json
 import logging
 import os
 import re
+from functools import lru_cache
 from pprint import pformat
 
 import yaml
 from glob import glob
 from json import JSONDecodeError
-from jinja2 import Template
+from jinja2 import StrictUndefined, Template
 from ansible.parsing.vault import VaultLib, VaultSecret
 
 from .helper import DeployConfig
+from .model import intern_strings
+from .output import Lazy
+from .profiling import phase, profiled
 
+# yaml files of at least this size are streamed object by object instead of being rendered and parsed as a whole
+STREAMING_THRESHOLD = 32 * 1024 * 1024
+# libyaml based loader if available, used for streaming
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+# jinja block statements spanning several lines, rendered as one chunk when streaming
+BLOCK_START = re.compile(r'{%-?\s*(for|if|macro|call|filter|raw|block|with|autoescape|set\s+[\w,\s]+?-?%})')
+BLOCK_END = re.compile(r'{%-?\s*end(for|if|macro|call|filter|raw|block|with|autoescape|set)\b')
+EXPRESSION = re.compile(r'{{.*?}}')
 
-def read_configuration(app_config) -> dict:
-    secrets = read_vault_files(app_config)
+
+class Placeholder(StrictUndefined):
+    """
+    Template variable whose value isn't known while rendering, i.e. secrets when compiling a bundle (bundle.SecretRef)
+    Output as text ({{ name }}) it renders its placeholder text, any other use (conditions, filters, operators) fails
+    with an UndefinedError like an undefined variable with jinja's StrictUndefined.
+    """
+    __slots__ = ['text']
+
+    def __init__(self, text: str, name: str, hint: str = None):
+        super().__init__(hint=hint, name=name)
+        self.text = text
+
+
+@profiled("config")
+def read_configuration(app_config, cache=None, secrets: dict = None) -> dict:
+    """Read and merge all config files from the configured config folders
+    :param app_config: the config class holding config settings
+    :param cache: optional ConfigCache, files not modified since the last read are taken from the cache
+    :param secrets: optional variables to render the config files with instead of the decrypted vault files
+    :return: dict of all config objects
+    """
+    if secrets is None and cache is not None:
+        secrets = cache.get_secrets(app_config)
+    elif secrets is None:
+        secrets = read_vault_files(app_config)
 
     config_objects = {
         "users": {},
@@ -26,51 +62,69 @@ def read_configuration(app_config) -> dict:
     }
 
     for folder in app_config.config_folder:
-        config_objects = read_config_folder(folder, app_config, config_objects, secrets)
+        config_objects = read_config_folder(folder, app_config, config_objects, secrets, cache)
 
-    logging.debug(f"Final configuration\n{pformat(config_objects)}")
+    logging.debug("Final configuration\n%s", Lazy(pformat, config_objects))
     return config_objects
 
 
-def read_config_folder(config_folder: str, app_config, config_objects, secrets) -> dict:
+def read_config_folder(config_folder: str, app_config, config_objects, secrets, cache=None) -> dict:
     if not os.path.isdir(config_folder):
         logging.error(f"Config folder '{config_folder}' doesn't exist")
         exit(0)
 
-    config_objects = read_json_configs(config_folder, config_objects, secrets)
-    config_objects = read_yaml_configs(config_folder, app_config, config_objects, secrets)
+    config_objects = read_json_configs(config_folder, config_objects, secrets, cache)
+    config_objects = read_yaml_configs(config_folder, app_config, config_objects, secrets, cache)
     return config_objects
 
 
-def read_json_configs(config_folder: str, config_objects: dict, secrets: dict) -> dict:
+def read_json_configs(config_folder: str, config_objects: dict, secrets: dict, cache=None) -> dict:
     """Read all json based (old) configuration files from folders users, groups and permissions and return
     dict of all found config objects
     For json each config file may contain only one object
     :param config_folder: string pointing to folder with configuration files
     :param config_objects: a dict with pre-initialized config objects
     :param secrets: a dict holding the decrypted secrets
+    :param cache: optional ConfigCache holding already parsed files
     :return: the merged dict with all config object
     """
     types = ["users", "groups", "permissions"]
 
     for config_type in types:
         logging.info(f"Processing json config '{config_type}' in folder '{config_folder}'")
-        for f_name in glob(f"{config_folder}/**/{config_type}/*.json", recursive=True):
-            logging.info(f"Reading config file '{f_name}'")
-            with open(f_name) as json_file:
-                content = json_file.read()
-                template = Template(content)
-                try:
-                    data = json.loads(template.render(secrets))
-                    name = data.get("name")
-                    config_objects[config_type][name] = data
-                except JSONDecodeError as e:
-                    logging.warning(f"Failed to read '{f_name}': {e.msg}")
+        with phase("discovery"):
+            f_names = glob(f"{config_folder}/**/{config_type}/*.json", recursive=True)
+
+        for f_name in f_names:
+            if cache is not None:
+                data = cache.get(f_name, read_json_file, secrets)
+            else:
+                data = read_json_file(f_name, secrets)
+
+            if data is not None:
+                config_objects[config_type][data.get("name")] = data
 
     return config_objects
 
 
-def read_yaml_configs(config_folder: str, config, config_objects: dict, secrets: dict) -> dict:
+def read_json_file(f_name: str, secrets: dict):
+    """Read a single json config file
+    :return: the config object or None if the file couldn't be parsed
+    """
+    logging.info(f"Reading config file '{f_name}'")
+    with open(f_name) as json_file:
+        content = json_file.read()
+        with phase("templating"):
+            content = Template(content, finalize=_finalize).render(secrets)
+        try:
+            with phase("parsing"):
+                return intern_strings(json.loads(content))
+        except JSONDecodeError as e:
+            logging.warning(f"Failed to read '{f_name}': {e.msg}")
+            return None
+
+
+def read_yaml_configs(config_folder: str, config, config_objects: dict, secrets: dict, cache=None) -> dict:
     """
     Read all yaml based configuration files from config folder and subfolders and return
     dict of all found config objects
@@ -78,27 +132,225 @@ def read_yaml_configs(config_folder: str, config, config_objects: dict, secrets:
     :param config: the config class holding config settings
     :param secrets: dict of decoded secret variables
     :param config_objects: a dict with pre-initialized config objects
+    :param cache: optional ConfigCache holding already parsed files
     :return: the merged dict with all config object
     """
     logging.info(f"Processing yaml configs in folder '{config_folder}'")
-    for f_name in glob(f'{config_folder}/**/*.yaml', recursive=True) + glob(f'{config_folder}/*.yaml'):
+    with phase("discovery"):
+        f_names = glob(f'{config_folder}/**/*.yaml', recursive=True) + glob(f'{config_folder}/*.yaml')
+
+    for f_name in f_names:
         # Skip config file and vault files
         if f_name == config.config_file or f_name in config.vault_file_list:
             continue
 
-        logging.info(f"Reading config file '{f_name}'")
-        with open(f_name) as yaml_file:
-            content = yaml_file.read()
-            template = Template(content)
-            yaml_config = yaml.safe_load(template.render(secrets)) or {}
-            combined_keys = config_objects.keys() | yaml_config.keys()
-            # merge dicts with keys on first level
-            config_objects = {key: {**yaml_config.get(key, {}), **config_objects.get(key, {})}
-                              for key in combined_keys}
+        if os.path.getsize(f_name) >= STREAMING_THRESHOLD:
+            if cache is not None:
+                merge_objects(config_objects, cache.get(f_name, read_yaml_objects, secrets))
+            else:
+                merge_objects(config_objects, stream_yaml_objects(f_name, secrets))
+            continue
+
+        if cache is not None:
+            yaml_config = cache.get(f_name, read_yaml_file, secrets)
+        else:
+            yaml_config = read_yaml_file(f_name, secrets)
+
+        combined_keys = config_objects.keys() | yaml_config.keys()
+        # merge dicts with keys on first level
+        config_objects = {key: {**yaml_config.get(key, {}), **config_objects.get(key, {})}
+                          for key in combined_keys}
 
     return config_objects
 
 
+def read_yaml_file(f_name: str, secrets: dict) -> dict:
+    """Read a single yaml config file
+    :return: dict of config objects by type
+    """
+    logging.info(f"Reading config file '{f_name}'")
+    with open(f_name) as yaml_file:
+        content = yaml_file.read()
+        with phase("templating"):
+            content = Template(content, finalize=_finalize).render(secrets)
+        with phase("parsing"):
+            return intern_strings(yaml.safe_load(content) or {})
+
+
+def merge_objects(config_objects: dict, objects):
+    """Merge the config objects of a streamed file one at a time
+    Like for other files objects read before take precedence, within the file the last definition of an object wins
+    :param config_objects: dict of all config objects, updated in place
+    :param objects: iterable of (config type, key, object)
+    """
+    merged = set()
+
+    for config_type, key, value in objects:
+        items = config_objects.setdefault(config_type, {})
+        if key not in items or (config_type, key) in merged:
+            items[key] = value
+            merged.add((config_type, key))
+
+
+def read_yaml_objects(f_name: str, secrets: dict) -> list:
+    """Read all config objects of a large yaml file (see stream_yaml_objects), i.e. to keep them in the ConfigCache"""
+    return list(stream_yaml_objects(f_name, secrets))
+
+
+def stream_yaml_objects(f_name: str, secrets: dict):
+    """Stream the config objects of a large yaml file without loading the whole file
+    The file is rendered in chunks (see RenderingReader) and parsed event by event, only the nodes of a single
+    config object are composed and constructed at a time. Peak memory is the size of the largest object instead of a
+    multiple of the file size.
+    :return: generator of (config type, key, object)
+    """
+    logging.info(f"Streaming config file '{f_name}'")
+    with open(f_name) as yaml_file, phase("streaming"):
+        loader = YAML_LOADER(RenderingReader(yaml_file, secrets))
+        try:
+            loader.get_event()
+            if loader.check_event(yaml.StreamEndEvent):
+                return
+            loader.get_event()
+            if not loader.check_event(yaml.MappingStartEvent):
+                logging.warning(f"Config file '{f_name}' doesn't contain a mapping of config types, ignored")
+                return
+            loader.get_event()
+
+            anchors = {}
+            while not loader.check_event(yaml.MappingEndEvent):
+                config_type = loader.construct_document(_compose_node(loader, anchors))
+                if not loader.check_event(yaml.MappingStartEvent) or loader.peek_event().anchor is not None:
+                    # an anchored section may be referenced later, it is composed as a whole
+                    section = loader.construct_document(_compose_node(loader, anchors))
+                    if isinstance(section, dict):
+                        for key, value in section.items():
+                            yield intern_strings(config_type), intern_strings(key), intern_strings(value)
+                    elif section is not None:
+                        logging.warning(f"Config type '{config_type}' in '{f_name}' isn't a mapping, ignored")
+                    continue
+
+                loader.get_event()
+                while not loader.check_event(yaml.MappingEndEvent):
+                    key = loader.construct_document(_compose_node(loader, anchors))
+                    value = loader.construct_document(_compose_node(loader, anchors))
+                    yield intern_strings(config_type), intern_strings(key), intern_strings(value)
+                loader.get_event()
+        finally:
+            loader.dispose()
+
+
+def _compose_node(loader, anchors: dict):
+    """Compose the node of the next value from the event stream (like yaml.composer.Composer, which isn't available
+    for the libyaml parser)"""
+    event = loader.get_event()
+
+    if isinstance(event, yaml.AliasEvent):
+        return anchors[event.anchor]
+
+    if isinstance(event, yaml.ScalarEvent):
+        tag = event.tag if event.tag not in (None, '!') else loader.resolve(yaml.ScalarNode, event.value,
+                                                                             event.implicit)
+        node = yaml.ScalarNode(tag, event.value, event.start_mark, event.end_mark, style=event.style)
+    elif isinstance(event, yaml.SequenceStartEvent):
+        tag = event.tag if event.tag not in (None, '!') else loader.resolve(yaml.SequenceNode, None, event.implicit)
+        node = yaml.SequenceNode(tag, [], event.start_mark, None, flow_style=event.flow_style)
+        while not loader.check_event(yaml.SequenceEndEvent):
+            node.value.append(_compose_node(loader, anchors))
+        node.end_mark = loader.get_event().end_mark
+    else:
+        tag = event.tag if event.tag not in (None, '!') else loader.resolve(yaml.MappingNode, None, event.implicit)
+        node = yaml.MappingNode(tag, [], event.start_mark, None, flow_style=event.flow_style)
+        while not loader.check_event(yaml.MappingEndEvent):
+            node.value.append((_compose_node(loader, anchors), _compose_node(loader, anchors)))
+        node.end_mark = loader.get_event().end_mark
+
+    if event.anchor is not None:
+        anchors[event.anchor] = node
+    return node
+
+
+class RenderingReader:
+    """
+    File-like object rendering a config file with jinja chunk by chunk while it is read
+    Lines without template syntax are passed through, a line with an expression is rendered on its own and a block
+    statement ({% if %}, {% for %}, ...) together with the lines up to its end. Variables set with {% set %} are
+    available in the following chunks.
+    """
+
+    def __init__(self, lines, secrets: dict):
+        self.lines = iter(lines)
+        self.context = dict(secrets or {})
+        self.buffer = ''
+        self.name = getattr(lines, 'name', '<config>')
+
+    def read(self, size: int = -1) -> str:
+        pieces = [self.buffer]
+        length = len(self.buffer)
+
+        while size < 0 or length < size:
+            chunk = self._next_chunk()
+            if chunk is None:
+                break
+            pieces.append(chunk)
+            length += len(chunk)
+
+        data = ''.join(pieces)
+        if size < 0:
+            self.buffer = ''
+            return data
+
+        self.buffer = data[size:]
+        return data[:size]
+
+    def _next_chunk(self):
+        line = next(self.lines, None)
+        if line is None or not _has_template(line):
+            return line
+
+        if '{%' not in line and '{#' not in line and '{{-' not in line and '-}}' not in line and \
+                not _is_open(line):
+            # expressions are rendered one by one, they repeat (unlike lines) and their templates are cached
+            return EXPRESSION.sub(lambda match: _compile_template(match.group(0)).render(self.context), line)
+
+        chunk = [line]
+        depth = _block_depth(line)
+        while depth > 0 or _is_open(''.join(chunk)):
+            line = next(self.lines, None)
+            if line is None:
+                break
+            chunk.append(line)
+            depth += _block_depth(line)
+
+        module = _compile_template(''.join(chunk)).make_module(self.context)
+        self.context.update({name: value for name, value in vars(module).items() if not name.startswith('_')})
+        return str(module)
+
+
+@lru_cache(maxsize=1024)
+def _compile_template(source: str) -> Template:
+    return Template(source, keep_trailing_newline=True, finalize=_finalize)
+
+
+def _finalize(value):
+    # applied by jinja to the values of output expressions only
+    return value.text if isinstance(value, Placeholder) else value
+
+
+def _has_template(line: str) -> bool:
+    return '{' in line and ('{{' in line or '{%' in line or '{#' in line)
+
+
+def _block_depth(line: str) -> int:
+    return len(BLOCK_START.findall(line)) - len(BLOCK_END.findall(line)) if '{%' in line else 0
+
+
+def _is_open(text: str) -> bool:
+    # an expression, statement or comment continued on the next line
+    return any(text.rfind(start) > text.rfind(end) for start, end in (('{{', '}}'), ('{%', '%}'), ('{#', '#}')))
+
+
+@profiled("vault")
 def read_vault_files(config: DeployConfig) -> dict:
     """
     Read ansible vault encrypted files from a comma separated list of files
@@ -138,3 +390,51 @@ def read_vault_files(config: DeployConfig) -> dict:
             secrets = {**secrets, **new_secrets}
 
     return secrets
+
+
+class ConfigCache:
+    """
+    Keeps parsed config files and decrypted secrets between reads of the configuration
+    Files are only parsed again if their modification time or size changed
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.secrets = None
+        self.secrets_state = None
+        self.parsed_files = []
+
+    def get(self, f_name: str, reader, secrets: dict):
+        state = file_state(f_name)
+        cached = self.files.get(f_name)
+
+        if cached is None or cached[0] != state:
+            cached = (state, reader(f_name, secrets))
+            self.files[f_name] = cached
+            self.parsed_files.append(f_name)
+
+        return cached[1]
+
+    def get_secrets(self, app_config) -> dict:
+        state = [file_state(f_name) for f_name in app_config.vault_file_list]
+
+        if self.secrets is None or state != self.secrets_state:
+            self.secrets = read_vault_files(app_config)
+            self.secrets_state = state
+            # templates may reference secrets - all files have to be rendered again
+            self.files = {}
+
+        return self.secrets
+
+    def pop_parsed_files(self) -> list:
+        """Return and reset the list of files parsed since the last call"""
+        parsed_files, self.parsed_files = self.parsed_files, []
+        return parsed_files
+
+
+def file_state(f_name: str):
+    try:
+        stat = os.stat(f_name)
+        return stat.st_mtime_ns, stat.st_size
+    except FileNotFoundError:
+        return None
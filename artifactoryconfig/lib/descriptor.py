@@ -0,0 +1,76 @@
+import logging
+import xml.etree.ElementTree as ET
+
+from pydantic import ValidationError
+from pyartifactory.models import LocalRepositoryResponse, RemoteRepositoryResponse, VirtualRepositoryResponse
+
+# repo elements of the system configuration descriptor -> rclass and response model
+REPO_ELEMENTS = {'localRepository': ('local', LocalRepositoryResponse),
+                 'remoteRepository': ('remote', RemoteRepositoryResponse),
+                 'virtualRepository': ('virtual', VirtualRepositoryResponse)}
+# elements holding a list of values (i.e. <repositories><repositoryRef>...</repositoryRef></repositories>)
+LIST_ELEMENTS = {'repositories', 'propertySets', 'optionalIndexCompressionFormats', 'patterns'}
+# elements named differently in the REST api
+FIELD_NAMES = {'type': 'packageType', 'localRepoChecksumPolicyType': 'checksumPolicyType'}
+# encrypted in the descriptor
+IGNORED_ELEMENTS = {'password'}
+
+
+def parse_repositories(stream) -> dict:
+    """Stream-parse the repo definitions of the system configuration descriptor (/api/system/configuration)
+    Repo elements are converted to the pyartifactory response models (like returned by the repo api) and removed
+    from the parsed tree right away, so memory doesn't grow with the size of the descriptor
+    :param stream: file like object with the descriptor xml
+    :return: dict of repo key -> repo response model, repos which can't be converted are missing
+    """
+    repos = {}
+
+    for _, element in ET.iterparse(stream):
+        tag = _local_name(element.tag)
+        if tag not in REPO_ELEMENTS:
+            continue
+
+        rclass, model_class = REPO_ELEMENTS[tag]
+        data = repo_definition(element, rclass)
+        element.clear()
+
+        try:
+            repos[data['key']] = model_class(**data)
+        except (KeyError, ValidationError) as e:
+            logging.debug(f"Skipping repo '{data.get('key')}' of system configuration: {e}")
+
+    return repos
+
+
+def repo_definition(element, rclass: str) -> dict:
+    """Convert a repo element of the descriptor to a dict with the field names of the repo api"""
+    data = {'rclass': rclass}
+
+    for child in element:
+        tag = _local_name(child.tag)
+        if tag in IGNORED_ELEMENTS:
+            continue
+        elif tag == 'xray':
+            data['xrayIndex'] = _element_value(child).get('enabled', False)
+        else:
+            data[FIELD_NAMES.get(tag, tag)] = _element_value(child)
+
+    return data
+
+
+def _element_value(element):
+    children = list(element)
+
+    if _local_name(element.tag) in LIST_ELEMENTS:
+        return [child.text or "" for child in children]
+    elif children:
+        return {_local_name(child.tag): _element_value(child) for child in children}
+
+    # values are kept as text, the response models convert them by the type of their fields (booleans, numbers), so
+    # a key or description like "2024" stays a string
+    return (element.text or "").strip()
+
+
+def _local_name(tag: str) -> str:
+    # remove the xml namespace ('{http://artifactory.jfrog.org/xsd/...}key')
+    return tag.rsplit('}', 1)[-1]
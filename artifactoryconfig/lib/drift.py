@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import tempfile
+import time
+
+from . import artifactory
+from . import plan
+from .output import object_log
+
+# exit code of the drift command if the server configuration drifted (1 is used for errors)
+DRIFT_EXIT_CODE = 2
+DRIFT_STATES = ['changed', 'missing', 'unmanaged']
+
+
+def detect_drift(config_objects: dict, session: artifactory.Session) -> dict:
+    """Compare the config objects with the objects in Artifactory
+    Only the fields set in the config are compared (with plan.is_up_to_date, like for plans), so defaults added by
+    the server are no drift. Costs as much as a plan - besides the list endpoints every configured object which
+    exists is fetched, repos with a single request from the system configuration descriptor, users, groups and
+    permissions with one request each. Objects deleted since they were listed are missing,
+    objects which can't be fetched for other reasons are reported as failed.
+    :param config_objects: dict with all config objects
+    :param session: the session connected to Artifactory
+    :return: the drift summary per config type
+    """
+    logging.info("#####   Checking server configuration for drift   #####")
+    started = time.time()
+    snapshot = session.snapshot()
+
+    existing = [(config_type, key) for _, config_type, snapshot_type in artifactory.OBJECT_TYPES
+                for key in config_objects[config_type] if key in snapshot[snapshot_type]]
+    errors = {}
+    fetched = session.fetch_objects(existing, errors)
+    types = {}
+
+    for item_type, config_type, snapshot_type in artifactory.OBJECT_TYPES:
+        summary = {'in_sync': 0, 'changed': [], 'missing': [], 'unmanaged': [], 'failed': []}
+
+        for key, value in config_objects[config_type].items():
+            error = errors.get((config_type, key))
+            if key not in snapshot[snapshot_type] or isinstance(error, artifactory.NOT_FOUND_ERRORS):
+                summary['missing'].append(key)
+                object_log.info("%s '%s' is missing on the server", item_type.capitalize(), key)
+            elif error is not None:
+                summary['failed'].append(key)
+            elif not plan.is_up_to_date(artifactory.build_model(config_type, key, value), fetched[(config_type, key)]):
+                summary['changed'].append(key)
+                object_log.info("%s '%s' was changed on the server", item_type.capitalize(), key)
+            else:
+                summary['in_sync'] += 1
+
+        summary['unmanaged'] = sorted(session.ignores.unmanaged(snapshot[snapshot_type].keys() -
+                                                                config_objects[config_type].keys()))
+        for key in summary['unmanaged']:
+            object_log.info("Unmanaged %s '%s' found", item_type, key)
+
+        logging.info(f"{item_type}: {summary['in_sync']} in sync, " +
+                     ", ".join(f"{len(summary[state])} {state}" for state in DRIFT_STATES + ['failed']))
+        types[config_type] = summary
+
+    drift = any(summary[state] for summary in types.values() for state in DRIFT_STATES)
+    failed = any(summary['failed'] for summary in types.values())
+    if failed:
+        logging.error("!!! Objects couldn't be fetched - drift check incomplete !!!")
+    if drift:
+        logging.warning("!!! Server configuration drifted from the config !!!")
+    elif not failed:
+        logging.info("No drift detected")
+
+    return {'artifactory_url': session.config.artifactory_url,
+            'checked': started,
+            'duration': round(time.time() - started, 3),
+            'drift': drift,
+            'failed': failed,
+            'types': types}
+
+
+def write_summary(summary: dict, output_file: str):
+    with open(output_file, 'w') as f:
+        json.dump(summary, f, indent=2, sort_keys=True)
+
+    logging.info(f"Writing drift summary to '{output_file}'")
+
+
+def write_metrics(summary: dict, metrics_file: str):
+    """Write the drift summary in the Prometheus text format (i.e. for the node exporter textfile collector)
+    The file is replaced atomically, so the collector never reads a partial file
+    """
+    lines = ["# HELP artifactory_config_drift Whether the server configuration drifted from the config",
+             "# TYPE artifactory_config_drift gauge",
+             f"artifactory_config_drift {int(summary['drift'])}",
+             "# HELP artifactory_config_drift_objects Number of objects per type and drift state",
+             "# TYPE artifactory_config_drift_objects gauge"]
+    for config_type, counts in sorted(summary['types'].items()):
+        lines.append(f'artifactory_config_drift_objects{{type="{config_type}",state="in_sync"}} {counts["in_sync"]}')
+        lines.extend(f'artifactory_config_drift_objects{{type="{config_type}",state="{state}"}} {len(counts[state])}'
+                     for state in DRIFT_STATES + ['failed'])
+    lines.extend(["# HELP artifactory_config_drift_last_check_timestamp_seconds Time of the last drift check",
+                  "# TYPE artifactory_config_drift_last_check_timestamp_seconds gauge",
+                  f"artifactory_config_drift_last_check_timestamp_seconds {summary['checked']:.3f}",
+                  "# HELP artifactory_config_drift_check_duration_seconds Duration of the last drift check",
+                  "# TYPE artifactory_config_drift_check_duration_seconds gauge",
+                  f"artifactory_config_drift_check_duration_seconds {summary['duration']}"])
+
+    fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(metrics_file)))
+    with os.fdopen(fd, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+    os.chmod(tmp_name, 0o644)
+    os.replace(tmp_name, metrics_file)
+
+    logging.info(f"Writing drift metrics to '{metrics_file}'")
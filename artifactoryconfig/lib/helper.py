@@ -1,4 +1,5 @@
 import argparse
+import copy
 import logging
 import os
 import sys
@@ -7,6 +8,9 @@ from glob import glob
 
 import yaml
 
+from . import output
+from .sharding import parse_shard
+
 
 def parse_args(args):
     """Parse command line parameters
@@ -37,6 +41,33 @@ def parse_args(args):
         default=logging.INFO,
         const=logging.DEBUG,
         help='verbose logging')
+    global_parser_args.add_argument(
+        "--log-format",
+        dest="log_format",
+        choices=["text", "json"],
+        default=os.getenv("LOG_FORMAT", "text"),
+        help="log as text or as json lines (default: text)",
+    )
+    global_parser_args.add_argument(
+        "--summary",
+        dest="summary",
+        action="store_true",
+        default=os.getenv("SUMMARY", ""),
+        help="only log progress and summaries instead of a message per config object",
+    )
+    global_parser_args.add_argument(
+        "--profile",
+        dest="profile",
+        choices=["cpu", "memory"],
+        default=os.getenv("PROFILE", ""),
+        help="profile cpu or memory usage per phase of the run",
+    )
+    global_parser_args.add_argument(
+        "--profile-dir",
+        dest="profile_dir",
+        default=os.getenv("PROFILE_DIR", ""),
+        help="folder for the profile files (default: profile)",
+    )
     global_parser_args.add_argument(
         "-c",
         "--config-file",
@@ -45,65 +76,288 @@ def parse_args(args):
         help="Path to a yaml file with configuration settings",
     )
 
-    sub_parser = parser.add_subparsers(dest='command', required=True)
-    deploy = sub_parser.add_parser('deploy', parents=[global_parser_args], add_help=False,
-                                   help="Deploy config to Artifactory server")
-    namespaces = sub_parser.add_parser('namespaces', parents=[global_parser_args], add_help=False,
-                                       help="Create permissions for defined namespaces")
-    lint = sub_parser.add_parser('lint', parents=[global_parser_args], add_help=False,
-                                 help="Lint existing configuration")
-
-    # Arguments specific for 'deploy' command
-    deploy.add_argument(
+    # Arguments for commands connecting to an Artifactory server
+    connection_parser_args = argparse.ArgumentParser(add_help=False)
+    connection_parser_args.add_argument(
         "--url",
         dest="artifactory_url",
         default=os.getenv("ARTIFACTORY_URL", ""),
         help="Artifactory base url",
     )
-    deploy.add_argument(
+    connection_parser_args.add_argument(
         "--user",
         dest="artifactory_user",
         default=os.getenv("ARTIFACTORY_USER", ""),
         help="Artifactory user to authenticate with token",
     )
-    deploy.add_argument(
+    connection_parser_args.add_argument(
         "--token",
         dest="artifactory_token",
         default=os.getenv("ARTIFACTORY_TOKEN", ""),
         help="Artifactory access token with admin permissions",
     )
-    deploy.add_argument(
+    connection_parser_args.add_argument(
+        "--max-requests",
+        dest="max_requests",
+        type=int,
+        default=os.getenv("MAX_REQUESTS", 64),
+        help="max number of concurrent requests, the actual limit adapts to the server load (default: 64)",
+    )
+    connection_parser_args.add_argument(
+        "--max-rps",
+        dest="max_rps",
+        type=float,
+        default=os.getenv("MAX_RPS", 0),
+        help="max number of requests per second (default: 0 - unlimited)",
+    )
+
+    # Arguments for commands reading the configuration to deploy
+    source_parser_args = argparse.ArgumentParser(add_help=False)
+    source_parser_args.add_argument(
         "-f",
         "--config-folder",
         dest="config_folder",
         default=os.getenv("CONFIG_FOLDER", ""),
         help="path to folder containing configuration files",
     )
-    deploy.add_argument(
+    source_parser_args.add_argument(
         "--vault-files",
         dest="vault_files",
         default=os.getenv("VAULT_FILES", ""),
         help="(comma-separated) list of paths to file(s) with ansible-vault encrypted secrets",
     )
-    deploy.add_argument(
+    source_parser_args.add_argument(
         "--vault-files-pattern",
         dest="vault_files_pattern",
         default=os.getenv("VAULT_FILES_PATTERN", ""),
         help="pattern to define vault secret files within config folder",
     )
-    deploy.add_argument(
+    source_parser_args.add_argument(
         "--vault-secret",
         dest="vault_secret",
         default=os.getenv("VAULT_SECRET", ""),
         help="secret to decrypt vault files",
     )
-    deploy.add_argument(
+
+    # Arguments for commands which can read a compiled config bundle instead of the config folders
+    bundle_parser_args = argparse.ArgumentParser(add_help=False)
+    bundle_parser_args.add_argument(
+        "--bundle",
+        dest="bundle_file",
+        default=os.getenv("BUNDLE_FILE", ""),
+        help="read the configuration from a bundle created with 'compile' instead of the config folders",
+    )
+
+    # Arguments for commands making changes to an Artifactory server
+    dry_run_parser_args = argparse.ArgumentParser(add_help=False)
+    dry_run_parser_args.add_argument(
         '--dry-run',
         dest='dry_run',
         action='store_true',
         default=os.getenv("DRY_RUN", ""),
         help='dry run - make no changes')
 
+    # Arguments for commands which can be split across several workers
+    shard_parser_args = argparse.ArgumentParser(add_help=False)
+    shard_parser_args.add_argument(
+        "--shard",
+        dest="shard",
+        default=os.getenv("SHARD", ""),
+        help="only process shard i of N ('i/N', i.e. '1/4') of the config objects",
+    )
+
+    # Arguments for commands working with a snapshot of the server configuration
+    snapshot_parser_args = argparse.ArgumentParser(add_help=False)
+    snapshot_parser_args.add_argument(
+        "--snapshot",
+        dest="snapshot_file",
+        default=os.getenv("SNAPSHOT_FILE", ""),
+        help="snapshot file of the server configuration (compressed if ending with '.gz')",
+    )
+
+    # Arguments for commands which can generate the namespace permissions in memory
+    namespaces_file_parser_args = argparse.ArgumentParser(add_help=False)
+    namespaces_file_parser_args.add_argument(
+        "--namespaces-file",
+        dest="namespaces_file",
+        default=os.getenv("NAMESPACES_FILE", ""),
+        help="generate permission targets and groups for the namespaces in this yaml file in memory",
+    )
+
+    # Arguments for commands working with a plan file
+    plan_parser_args = argparse.ArgumentParser(add_help=False)
+    plan_parser_args.add_argument(
+        "--plan-file",
+        dest="plan_file",
+        default=os.getenv("PLAN_FILE", ""),
+        help="path to the plan file (compressed if ending with '.gz')",
+    )
+    plan_parser_args.add_argument(
+        "--async",
+        dest="async_requests",
+        action="store_true",
+        default=os.getenv("ASYNC_REQUESTS", ""),
+        help="send requests concurrently with an asyncio client (needs package 'httpx')",
+    )
+
+    sub_parser = parser.add_subparsers(dest='command', required=True)
+    deploy_parents = [global_parser_args, connection_parser_args, source_parser_args, dry_run_parser_args]
+    deploy = sub_parser.add_parser('deploy', parents=deploy_parents + [shard_parser_args, bundle_parser_args,
+                                                                       namespaces_file_parser_args],
+                                   add_help=False,
+                                   help="Deploy config to Artifactory server")
+    watch = sub_parser.add_parser('watch', parents=deploy_parents + [namespaces_file_parser_args], add_help=False,
+                                  help="Watch config folders and continuously deploy changes to Artifactory server")
+    plan = sub_parser.add_parser('plan', parents=[global_parser_args, connection_parser_args, source_parser_args,
+                                                  plan_parser_args, shard_parser_args, bundle_parser_args,
+                                                  snapshot_parser_args, namespaces_file_parser_args],
+                                 add_help=False,
+                                 help="Create a plan with the operations needed to deploy config to Artifactory server")
+    apply = sub_parser.add_parser('apply', parents=[global_parser_args, connection_parser_args, dry_run_parser_args,
+                                                    plan_parser_args], add_help=False,
+                                  help="Apply a plan to Artifactory server")
+    audit = sub_parser.add_parser('audit', parents=[global_parser_args, connection_parser_args, source_parser_args,
+                                                    dry_run_parser_args, bundle_parser_args,
+                                                    namespaces_file_parser_args], add_help=False,
+                                  help="Report and optionally delete objects in Artifactory which are not configured")
+    drift = sub_parser.add_parser('drift', parents=[global_parser_args, connection_parser_args, source_parser_args,
+                                                    bundle_parser_args, namespaces_file_parser_args], add_help=False,
+                                  help="Check if the configuration in Artifactory drifted from the config "
+                                       "(fetches all configured objects like plan)")
+    provision = sub_parser.add_parser('provision', parents=[global_parser_args, connection_parser_args,
+                                                            dry_run_parser_args], add_help=False,
+                                      help="Create and update users from a large csv or ldif export in batches")
+    snapshot = sub_parser.add_parser('snapshot', parents=[global_parser_args, connection_parser_args,
+                                                          snapshot_parser_args], add_help=False,
+                                     help="Export the server configuration into a snapshot file")
+    namespaces = sub_parser.add_parser('namespaces', parents=[global_parser_args, bundle_parser_args], add_help=False,
+                                       help="Create permissions for defined namespaces")
+    lint = sub_parser.add_parser('lint', parents=[global_parser_args, bundle_parser_args,
+                                                  namespaces_file_parser_args], add_help=False,
+                                 help="Lint existing configuration")
+    access = sub_parser.add_parser('access', parents=[global_parser_args, bundle_parser_args], add_help=False,
+                                   help="Query effective access of users and groups")
+    compile_bundle = sub_parser.add_parser('compile', parents=[global_parser_args, source_parser_args], add_help=False,
+                                           help="Compile the configuration into a bundle file")
+    merge_reports = sub_parser.add_parser('merge-reports', parents=[global_parser_args], add_help=False,
+                                          help="Merge run reports of sharded deploys")
+
+    # Arguments specific for 'deploy' command
+    deploy.add_argument(
+        "--report-file",
+        dest="report_file",
+        default=os.getenv("REPORT_FILE", ""),
+        help="write a json report with the results of the run (i.e. to merge reports of sharded runs)",
+    )
+    deploy.add_argument(
+        "--journal-dir",
+        dest="journal_dir",
+        default=os.getenv("JOURNAL_DIR", ""),
+        help="write a journal of all operations to this folder, so an interrupted deploy can be resumed",
+    )
+    deploy.add_argument(
+        "--resume",
+        dest="resume",
+        action="store_true",
+        default=os.getenv("RESUME", ""),
+        help="resume an interrupted deploy of the same configuration from the journal",
+    )
+
+    # Arguments specific for 'compile' command
+    compile_bundle.add_argument(
+        "-o",
+        "--output-file",
+        dest="bundle_file",
+        default=os.getenv("BUNDLE_FILE", ""),
+        help="bundle file to write (default: config.bundle)",
+    )
+
+    # Arguments specific for 'merge-reports' command
+    merge_reports.add_argument(
+        "report_files",
+        nargs="+",
+        help="run reports to merge",
+    )
+    merge_reports.add_argument(
+        "-o",
+        "--output-file",
+        dest="report_file",
+        default="",
+        help="write the merged report to this file",
+    )
+
+    # Arguments specific for 'audit' command
+    audit.add_argument(
+        "--prune",
+        dest="prune",
+        action="store_true",
+        default=os.getenv("PRUNE", ""),
+        help="delete unmanaged objects (not configured and not matching unmanaged_ignores)",
+    )
+    audit.add_argument(
+        "--max-deletes",
+        dest="max_deletes",
+        type=int,
+        default=os.getenv("MAX_DELETES", 100),
+        help="prune nothing if more objects would be deleted, 0 for no limit (default: 100)",
+    )
+    audit.add_argument(
+        "--report-file",
+        dest="report_file",
+        default=os.getenv("REPORT_FILE", ""),
+        help="write a json report with the unmanaged and deleted objects (default: audit.json)",
+    )
+
+    # Arguments specific for 'drift' command
+    drift.add_argument(
+        "-o",
+        "--output-file",
+        dest="output_file",
+        default=os.getenv("DRIFT_FILE", ""),
+        help="write the drift summary per object type as json",
+    )
+    drift.add_argument(
+        "--metrics-file",
+        dest="metrics_file",
+        default=os.getenv("METRICS_FILE", ""),
+        help="write the drift summary in Prometheus text format (i.e. for the node exporter textfile collector)",
+    )
+
+    # Arguments specific for 'provision' command
+    provision.add_argument(
+        "--users-file",
+        dest="users_file",
+        default=os.getenv("USERS_FILE", ""),
+        help="csv or ldif file with the users to provision (compressed if ending with '.gz')",
+    )
+    provision.add_argument(
+        "--format",
+        dest="users_format",
+        choices=["csv", "ldif"],
+        default=os.getenv("USERS_FORMAT", ""),
+        help="format of the users file (default: by file extension)",
+    )
+    provision.add_argument(
+        "--batch-size",
+        dest="batch_size",
+        type=int,
+        default=os.getenv("BATCH_SIZE", 500),
+        help="number of users read and applied at a time (default: 500)",
+    )
+    provision.add_argument(
+        "--report-file",
+        dest="report_file",
+        default=os.getenv("REPORT_FILE", ""),
+        help="write a json report with the results of the run",
+    )
+
+    # Arguments specific for 'snapshot' command
+    snapshot.add_argument(
+        "action",
+        choices=['export'],
+        help="export the server configuration for offline plans (plan --snapshot)",
+    )
+
     # Arguments specific for 'namespaces' command
     namespaces.add_argument(
         "-n",
@@ -119,6 +373,12 @@ def parse_args(args):
         default=os.getenv("OUTPUT_DIR", ""),
         help="target directory for generated files",
     )
+    namespaces.add_argument(
+        '--incremental',
+        dest='incremental',
+        action='store_true',
+        default=os.getenv("INCREMENTAL", ""),
+        help='only write changed files and remove stale generated files')
 
     lint.add_argument(
         "-f",
@@ -135,19 +395,111 @@ def parse_args(args):
         help="fail linting when rules with at least this level fail (default: 20)",
     )
 
+    # Arguments specific for 'watch' command
+    watch.add_argument(
+        "--interval",
+        dest="watch_interval",
+        type=float,
+        default=os.getenv("WATCH_INTERVAL", 2),
+        help="interval in seconds to check config folders for changes (default: 2)",
+    )
+    watch.add_argument(
+        "--debounce",
+        dest="watch_debounce",
+        type=float,
+        default=os.getenv("WATCH_DEBOUNCE", 1),
+        help="seconds without further changes before changes are applied (default: 1)",
+    )
+
+    # Arguments specific for 'access' command
+    access.add_argument(
+        "-f",
+        "--config-folder",
+        dest="config_folder",
+        default=os.getenv("CONFIG_FOLDER", ""),
+        help="path to folder containing configuration files",
+    )
+    access.add_argument(
+        "-n",
+        "--namespaces-file",
+        dest="namespaces_file",
+        default=os.getenv("NAMESPACES_FILE", ""),
+        help="path to namespaces yaml file, generated permissions are included in the query",
+    )
+    access.add_argument(
+        "--repo",
+        dest="repo",
+        default="",
+        help="repository to query, if missing the first folder of the path is used as repository",
+    )
+    access.add_argument(
+        "--path",
+        dest="path",
+        default="",
+        help="path to query for users and groups with access",
+    )
+    access.add_argument(
+        "--paths-file",
+        dest="paths_file",
+        default="",
+        help="file with one path per line to query (i.e. an artifact listing)",
+    )
+    access.add_argument(
+        "--group",
+        dest="group",
+        default="",
+        help="list all repos and path patterns the group has access to",
+    )
+    access.add_argument(
+        "--user",
+        dest="user",
+        default="",
+        help="list all repos and path patterns the user has access to",
+    )
+
     args = parser.parse_args(args)
 
-    setup_logging(args.log_level)
+    output.setup_logging(args.log_level, args.log_format, bool(args.summary))
 
     if args.command == 'deploy':
         config = DeployConfig()
         active_parser = deploy
+    elif args.command == 'watch':
+        config = WatchConfig()
+        active_parser = watch
+    elif args.command == 'plan':
+        config = PlanConfig()
+        active_parser = plan
+    elif args.command == 'apply':
+        config = ApplyConfig()
+        active_parser = apply
+    elif args.command == 'audit':
+        config = AuditConfig()
+        active_parser = audit
+    elif args.command == 'drift':
+        config = DriftConfig()
+        active_parser = drift
+    elif args.command == 'provision':
+        config = ProvisionConfig()
+        active_parser = provision
+    elif args.command == 'snapshot':
+        config = SnapshotConfig()
+        active_parser = snapshot
     elif args.command == 'namespaces':
         config = NamespacesConfig()
         active_parser = namespaces
     elif args.command == 'lint':
         config = LintingConfig()
         active_parser = lint
+    elif args.command == 'access':
+        config = AccessConfig()
+        active_parser = access
+    elif args.command == 'compile':
+        config = CompileConfig()
+        active_parser = compile_bundle
+    elif args.command == 'merge-reports':
+        config = MergeReportsConfig()
+        active_parser = merge_reports
     else:
         config = Config()
         active_parser = parser
@@ -162,23 +514,11 @@ def parse_args(args):
     if not config.is_valid():
         sys.exit(active_parser.print_usage())
 
-    logging.debug(f"Active config: {config}")
+    logging.debug("Active config: %s", config)
 
     return config
 
 
-def setup_logging(log_level: int):
-    """Setup basic logging
-
-    Args:
-      log_level (int): minimum log level for emitting messages
-    """
-    log_format = "[%(asctime)s] %(levelname)-7s %(name)-7s %(message)s"
-    logging.basicConfig(
-        level=log_level, stream=sys.stdout, format=log_format, datefmt="%Y-%m-%d %H:%M:%S"
-    )
-
-
 @dataclass
 class Config:
     """
@@ -187,11 +527,16 @@ class Config:
     command: str = ""
     config_file: str = ""
     log_level: int = ""
+    log_format: str = "text"
+    summary: bool = False
+    profile: str = ""
+    profile_dir: str = "profile"
     config_folder: list = None
     vault_files: str = ""
     vault_files_pattern: str = ""
     vault_file_list: list = None
     vault_secret: str = ""
+    bundle_file: str = ""
 
     def __init__(self, initial_data=None):
         if initial_data is None:
@@ -249,8 +594,17 @@ class DeployConfig(Config):
     artifactory_url: str = ""
     artifactory_user: str = ""
     artifactory_token: str = ""
+    targets: list = None
+    max_parallel_targets: int = 8
     unmanaged_ignores: list = None
     dry_run: bool = False
+    shard: str = ""
+    report_file: str = ""
+    journal_dir: str = ""
+    resume: bool = False
+    max_requests: int = 64
+    max_rps: float = 0
+    namespaces_file: str = ""
 
     def __init__(self, initial_data=None):
         Config.__init__(self, initial_data)
@@ -258,8 +612,147 @@ class DeployConfig(Config):
         if not self.unmanaged_ignores:
             self.unmanaged_ignores = []
 
+        if not self.targets:
+            self.targets = []
+
+    def is_valid(self) -> bool:
+        if self.shard:
+            try:
+                parse_shard(self.shard)
+            except ValueError as e:
+                print(e)
+                return False
+
+        if self.resume and not self.journal_dir:
+            print("Resuming a deploy needs a journal folder (--journal-dir)")
+            return False
+
+        return self.has_target() and isinstance(self.config_folder, list)
+
+    def has_target(self) -> bool:
+        """Check if an Artifactory instance to work with is configured"""
+        return self.artifactory_url != "" or bool(self.targets)
+
+    def get_shard(self):
+        """Return zero based shard index and shard count or None if sharding is disabled"""
+        return parse_shard(self.shard) if self.shard else None
+
+    def get_targets(self) -> list:
+        """Return the configured targets (Artifactory instances), user and token default to the global settings"""
+        return [{'name': target.get('name', target.get('url')),
+                 'url': target.get('url'),
+                 'user': target.get('user', self.artifactory_user),
+                 'token': target.get('token', self.artifactory_token)} for target in self.targets]
+
+    def for_target(self, target: dict):
+        """Return a copy of this config for a single target"""
+        config = copy.copy(self)
+        config.artifactory_url = target['url']
+        config.artifactory_user = target['user']
+        config.artifactory_token = target['token']
+        config.targets = []
+        return config
+
+
+@dataclass
+class WatchConfig(DeployConfig):
+    """
+    Extends DeployConfig class with specific options for 'watch' command
+    """
+    watch_interval: float = 2
+    watch_debounce: float = 1
+
+    def __init__(self, initial_data=None):
+        DeployConfig.__init__(self, initial_data)
+
+
+@dataclass
+class PlanConfig(DeployConfig):
+    """
+    Extends DeployConfig class with specific options for 'plan' command
+    """
+    plan_file: str = "plan.json"
+    async_requests: bool = False
+    snapshot_file: str = ""
+
+    def __init__(self, initial_data=None):
+        DeployConfig.__init__(self, initial_data)
+
+    def has_target(self) -> bool:
+        # an offline plan takes the url from the snapshot
+        return self.snapshot_file != "" or DeployConfig.has_target(self)
+
+
+@dataclass
+class ApplyConfig(DeployConfig):
+    """
+    Extends DeployConfig class with specific options for 'apply' command
+    """
+    plan_file: str = ""
+    async_requests: bool = False
+
+    def __init__(self, initial_data=None):
+        DeployConfig.__init__(self, initial_data)
+
+    def is_valid(self) -> bool:
+        return self.artifactory_url != "" and self.plan_file != ""
+
+
+@dataclass
+class AuditConfig(DeployConfig):
+    """
+    Extends DeployConfig class with specific options for 'audit' command
+    """
+    prune: bool = False
+    max_deletes: int = 100
+    report_file: str = "audit.json"
+
+    def __init__(self, initial_data=None):
+        DeployConfig.__init__(self, initial_data)
+
+
+@dataclass
+class DriftConfig(DeployConfig):
+    """
+    Extends DeployConfig class with specific options for 'drift' command
+    """
+    output_file: str = ""
+    metrics_file: str = ""
+
+    def __init__(self, initial_data=None):
+        DeployConfig.__init__(self, initial_data)
+
+
+@dataclass
+class ProvisionConfig(DeployConfig):
+    """
+    Extends DeployConfig class with specific options for 'provision' command
+    """
+    users_file: str = ""
+    users_format: str = ""
+    batch_size: int = 500
+    user_mapping: dict = None
+
+    def __init__(self, initial_data=None):
+        DeployConfig.__init__(self, initial_data)
+
     def is_valid(self) -> bool:
-        return self.artifactory_url != "" and isinstance(self.config_folder, list)
+        return self.artifactory_url != "" and self.users_file != "" and int(self.batch_size) > 0
+
+
+@dataclass
+class SnapshotConfig(DeployConfig):
+    """
+    Extends DeployConfig class with specific options for 'snapshot' command
+    """
+    action: str = ""
+    snapshot_file: str = "snapshot.json.gz"
+
+    def __init__(self, initial_data=None):
+        DeployConfig.__init__(self, initial_data)
+
+    def is_valid(self) -> bool:
+        return self.artifactory_url != ""
 
 
 @dataclass
@@ -268,6 +761,7 @@ class LintingConfig(Config):
     Extends Config class with specific options for 'lint' command
     """
     fail_level: int = 20
+    namespaces_file: str = ""
 
     def __init__(self, initial_data=None):
         Config.__init__(self, initial_data)
@@ -295,6 +789,7 @@ class NamespacesConfig(Config):
     output_format: str = "json"
     groups_output_dir: str = ""
     group_template: str = ""
+    incremental: bool = False
 
     def __init__(self, initial_data=None):
         Config.__init__(self, initial_data)
@@ -325,6 +820,53 @@ class NamespacesConfig(Config):
         return self.namespaces_file != ""
 
 
+@dataclass
+class AccessConfig(NamespacesConfig):
+    """
+    Extends NamespacesConfig class with specific options for 'access' command
+    """
+    repo: str = ""
+    path: str = ""
+    paths_file: str = ""
+    group: str = ""
+    user: str = ""
+
+    def __init__(self, initial_data=None):
+        NamespacesConfig.__init__(self, initial_data)
+
+    def is_valid(self) -> bool:
+        return bool(self.path or self.paths_file or self.group or self.user)
+
+
+@dataclass
+class CompileConfig(Config):
+    """
+    Extends Config class with specific options for 'compile' command
+    """
+    bundle_file: str = "config.bundle"
+
+    def __init__(self, initial_data=None):
+        Config.__init__(self, initial_data)
+
+    def is_valid(self) -> bool:
+        return bool(self.config_folder)
+
+
+@dataclass
+class MergeReportsConfig(Config):
+    """
+    Extends Config class with specific options for 'merge-reports' command
+    """
+    report_files: list = None
+    report_file: str = ""
+
+    def __init__(self, initial_data=None):
+        Config.__init__(self, initial_data)
+
+    def is_valid(self) -> bool:
+        return bool(self.report_files)
+
+
 def as_list(value):
     if value is None:
         return []
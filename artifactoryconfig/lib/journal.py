@@ -0,0 +1,80 @@
+import hashlib
+import json
+import logging
+import os
+
+
+class Journal:
+    """
+    Write-ahead journal of the operations of a deploy, so an interrupted deploy can be resumed
+    Before an object is sent to Artifactory a 'begin' entry is written, after it was confirmed a 'done' entry.
+    A journal belongs to one configuration (content hash) and Artifactory instance. A journal without path is
+    disabled and doesn't write anything.
+    """
+
+    def __init__(self, path: str = None, completed: set = None):
+        self.path = path
+        self.completed = completed or set()
+        self.file = None
+
+    @classmethod
+    def open(cls, journal_dir: str, artifactory_url: str, config_hash: str, resume: bool = False):
+        """Open the journal for a configuration and Artifactory instance
+        :param resume: keep the existing journal and skip the operations completed in it, otherwise start a new one
+        """
+        os.makedirs(journal_dir, exist_ok=True)
+        name = hashlib.sha256(f"{artifactory_url.rstrip('/')}\n{config_hash}".encode()).hexdigest()[:16]
+        path = os.path.join(journal_dir, f"{name}.journal")
+        completed = set()
+
+        if resume and os.path.isfile(path):
+            completed = read_completed(path)
+            logging.info(f"Resuming deploy from journal '{path}', {len(completed)} operations already completed")
+        elif resume:
+            logging.warning(f"No journal found for this configuration in '{journal_dir}' - starting a full deploy")
+
+        journal = cls(path, completed)
+        journal.file = open(path, 'a' if resume else 'w')
+        if resume:
+            # terminate a last line truncated by the interrupted deploy
+            journal.file.write("\n")
+        journal._write({'event': 'start', 'url': artifactory_url, 'config_hash': config_hash})
+        return journal
+
+    def is_done(self, config_type: str, key: str) -> bool:
+        return (config_type, key) in self.completed
+
+    def begin(self, config_type: str, key: str):
+        self._write({'event': 'begin', 'type': config_type, 'key': key})
+
+    def done(self, config_type: str, key: str, action: str):
+        self._write({'event': 'done', 'type': config_type, 'key': key, 'action': action})
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def _write(self, entry: dict):
+        if self.file is None:
+            return
+
+        # flushed per entry, so the journal survives the process being killed
+        self.file.write(json.dumps(entry, separators=(',', ':')) + "\n")
+        self.file.flush()
+
+
+def read_completed(path: str) -> set:
+    """Return the (config type, key) of all operations confirmed in a journal, a truncated last line is ignored"""
+    completed = set()
+
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry.get('event') == 'done':
+                completed.add((entry['type'], entry['key']))
+
+    return completed
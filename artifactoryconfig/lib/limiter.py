@@ -0,0 +1,129 @@
+import asyncio
+import threading
+import time
+
+import requests
+
+# seconds to wait before checking again for a free slot
+SLOT_POLL_INTERVAL = 0.005
+# a request is considered slow (congestion) if it takes longer than this factor times the average latency
+LATENCY_TOLERANCE = 2.0
+# weight of a new sample in the moving average of the latency
+LATENCY_SMOOTHING = 0.05
+# factor the limit is reduced by on congestion
+BACKOFF = 0.5
+
+
+class AdaptiveLimiter:
+    """
+    Limits concurrent requests to Artifactory with AIMD (additive increase, multiplicative decrease)
+    The limit grows by one per window of successful requests and is halved on throttling (429), server errors (5xx)
+    or slow responses, at most once per round trip. Independent of the limit the start of requests can be capped
+    to a number of requests per second. Usable from threads and from asyncio tasks.
+    """
+
+    def __init__(self, ceiling: int = 64, max_rps: float = 0, initial: int = 4):
+        self.ceiling = max(1, ceiling)
+        self.max_rps = max_rps
+        self.limit = float(min(initial, self.ceiling))
+        self.min_seen = self.limit
+        self.max_seen = self.limit
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.latency = None
+        self.next_start = 0.0
+        self.backoff_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Wait until a request may be started (blocking)"""
+        while (wait := self._reserve()) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait until a request may be started (asyncio)"""
+        while (wait := self._reserve()) > 0:
+            await asyncio.sleep(wait)
+
+    def release(self, latency: float, status: int, retry_after: float = 0):
+        """Record the result of a finished request and adjust the limit
+        :param latency: duration of the request in seconds
+        :param status: http status code, 0 if the request failed without response
+        :param retry_after: seconds the server asked to wait before sending further requests
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.in_flight -= 1
+            self.requests += 1
+
+            if status == 429 or status == 0 or status >= 500:
+                self.throttled += 1
+                congested = True
+            else:
+                congested = self.latency is not None and latency > LATENCY_TOLERANCE * self.latency
+                self.latency = latency if self.latency is None else \
+                    (1 - LATENCY_SMOOTHING) * self.latency + LATENCY_SMOOTHING * latency
+
+            if retry_after:
+                self.next_start = max(self.next_start, now + retry_after)
+
+            if not congested:
+                self.limit = min(self.ceiling, self.limit + 1 / self.limit)
+            elif now >= self.backoff_until:
+                # requests started before the reduction will report the same congestion, ignore them
+                self.limit = max(1.0, self.limit * BACKOFF)
+                self.backoff_until = now + latency
+
+            self.min_seen = min(self.min_seen, self.limit)
+            self.max_seen = max(self.max_seen, self.limit)
+
+    def stats(self) -> dict:
+        return {'limit': round(self.limit, 1), 'min_limit': round(self.min_seen, 1),
+                'max_limit': round(self.max_seen, 1), 'ceiling': self.ceiling, 'max_rps': self.max_rps,
+                'requests': self.requests, 'throttled': self.throttled}
+
+    def _reserve(self) -> float:
+        # start a request if possible, otherwise return the time to wait before trying again
+        with self.lock:
+            now = time.monotonic()
+
+            if self.in_flight >= int(self.limit):
+                return SLOT_POLL_INTERVAL
+            if now < self.next_start:
+                return self.next_start - now
+
+            self.in_flight += 1
+            if self.max_rps:
+                self.next_start = max(now, self.next_start) + 1 / self.max_rps
+            return 0
+
+
+class LimitedAdapter(requests.adapters.HTTPAdapter):
+    """Transport adapter sending all requests of a requests session through an AdaptiveLimiter"""
+
+    def __init__(self, limiter: AdaptiveLimiter, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+
+    def send(self, request, **kwargs):
+        self.limiter.acquire()
+        start = time.monotonic()
+        status = 0
+        retry_after = 0
+
+        try:
+            response = super().send(request, **kwargs)
+            status = response.status_code
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            return response
+        finally:
+            self.limiter.release(time.monotonic() - start, status, retry_after)
+
+
+def parse_retry_after(value) -> float:
+    """Seconds from a Retry-After header, http dates are not supported and ignored"""
+    try:
+        return max(0.0, float(value)) if value else 0
+    except ValueError:
+        return 0
@@ -2,6 +2,8 @@ import abc
 import logging
 import sys
 
+from . import shadowing, validation
+from .profiling import phase
 from .helper import LintingConfig
 
 
@@ -10,14 +12,16 @@ def lint_config(local_config, config):
 
 
 def lint_rules(local_config, config: LintingConfig):
-    rules: list = [HelmMirrorRule(), UnusedGroupRule()]
+    rules: list = [ModelValidationRule(), HelmMirrorRule(), UnusedGroupRule(), ShadowedPermissionRule()]
     failed: bool = False
 
     for rule in rules:
-        rule.run_checks(local_config)
+        with phase(f"lint {rule.id}"):
+            rule.run_checks(local_config)
 
+        # messages of rules below the fail level are reported without failing
+        rule.print_messages()
         if rule.has_failed(config.fail_level):
-            rule.print_messages()
             failed = True
 
     if failed:
@@ -83,3 +87,33 @@ class UnusedGroupRule(LintingRule):
 
     def has_failed(self, fail_level: int) -> bool:
         return bool(self.messages) and self.severity >= fail_level
+
+
+class ShadowedPermissionRule(LintingRule):
+    """Permissions fully shadowed by other permissions and grants which are redundant for a user or group"""
+
+    def __init__(self):
+        self.id = "sec.002"
+        # informational, below the default fail level
+        self.severity = 10
+        self.messages = []
+
+    def run_checks(self, local_config):
+        shadowed, redundant = shadowing.analyze_permissions(local_config)
+        self.messages.extend(shadowed + redundant)
+
+    def has_failed(self, fail_level: int) -> bool:
+        return bool(self.messages) and self.severity >= fail_level
+
+
+class ModelValidationRule(LintingRule):
+    def __init__(self):
+        self.id = "val.001"
+        self.severity = 30
+        self.messages = []
+
+    def run_checks(self, local_config):
+        self.messages.extend(validation.validate_configuration(local_config))
+
+    def has_failed(self, fail_level: int) -> bool:
+        return bool(self.messages) and self.severity >= fail_level
@@ -0,0 +1,47 @@
+import hashlib
+import json
+import sys
+
+
+def intern_strings(value):
+    """Return a copy of a parsed config object with all strings (keys and values) interned
+    Repeated names (groups of users, repos of permissions, field names) are stored only once this way
+    """
+    if isinstance(value, dict):
+        return {sys.intern(k) if isinstance(k, str) else k: intern_strings(v) for k, v in value.items()}
+    elif isinstance(value, list):
+        return [intern_strings(v) for v in value]
+    elif isinstance(value, str):
+        return sys.intern(value)
+
+    return value
+
+
+def config_hash(config_objects: dict) -> str:
+    """Content hash of the config objects"""
+    return hashlib.sha256(json.dumps(config_objects, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class SnapshotEntry:
+    """
+    Compact representation of an object listed by Artifactory (user, group, permission, repo)
+    Only the name, the type (repos) and a digest of the listed data are kept
+    """
+    __slots__ = ['name', 'type', 'digest']
+
+    def __init__(self, name: str, item_type: str = None, digest: str = None):
+        self.name = sys.intern(name)
+        self.type = sys.intern(item_type) if item_type else None
+        self.digest = digest
+
+    @property
+    def key(self) -> str:
+        return self.name
+
+    @classmethod
+    def from_dict(cls, data: dict, key_field: str = 'name'):
+        digest = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[:16]
+        return cls(data[key_field], data.get('type'), digest)
+
+    def __repr__(self):
+        return f"SnapshotEntry({self.name!r}, {self.type!r})"
@@ -1,5 +1,9 @@
+import hashlib
 import json
 import logging
+import stat
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from json import JSONDecodeError
 
@@ -8,10 +12,26 @@ import os
 
 from jinja2 import Template
 
-from .helper import as_list
-
-
-def write_group(group: str, config):
+from .helper import as_list, NamespacesConfig
+from .patterns import compact_patterns
+from .profiling import profiled
+
+# manifest in the permissions output dir listing the files written by the last incremental run, only these files are
+# removed when they become stale - hand-written files in the output dir are never touched
+MANIFEST_FILE = '.generated.json'
+# libyaml based loader/dumper if available, they create the same documents as the pure python ones many times faster
+YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, 'CDumper', yaml.Dumper)
+# Building and rendering permission targets is CPU bound - the targets of many namespaces are built and rendered in
+# chunks of namespaces in separate processes
+PARALLEL_THRESHOLD = 2000
+CHUNK_SIZE = 500
+# the umask can only be read by setting it, which isn't thread safe - read it once on import for the mode of new files
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+def write_group(group: str, config, template: Template):
     logging.info(f"Creating group '{group}'")
 
     if config.groups_output_dir:
@@ -24,32 +44,80 @@ def write_group(group: str, config):
         logging.debug(f"Group config file for '${group}' already exists")
         return
 
-    group_obj = {'name': group}
+    data = render_group(group, template)
+    if data is None:
+        return
 
     if not os.path.isdir(groups_output_dir):
         os.makedirs(groups_output_dir)
 
     with open(file_name, 'w+') as group_file:
-        with open(config.group_template) as group_template_file:
-            content = group_template_file.read()
-            template = Template(content)
-            try:
-                data = json.loads(template.render(group_obj))
-                json.dump(data, group_file, indent=4, sort_keys=True)
-            except JSONDecodeError as e:
-                logging.warning(f"Failed to read '{config.group_template}': {e.msg}")
+        json.dump(data, group_file, indent=4, sort_keys=True)
 
     logging.info(f"Writing group '{group}' to '{file_name}'")
 
 
-def process_namespaces(config, local_config):
+def read_group_template(config):
+    """Read and compile the group template once for all groups
+    :return: the jinja template or None if the template file doesn't exist
+    """
+    if not os.path.exists(config.group_template):
+        logging.warning(f"Group template file '{config.group_template}' doesn't exist - skipping group auto creation")
+        return None
+
+    with open(config.group_template) as group_template_file:
+        return Template(group_template_file.read())
+
+
+def render_group(group: str, template: Template):
+    """Render the group template for a group
+    :return: the group config object or None if the rendered template isn't valid json
+    """
+    try:
+        return json.loads(template.render({'name': group}))
+    except JSONDecodeError as e:
+        logging.warning(f"Failed to render group template for '{group}': {e.msg}")
+        return None
+
+
+def read_namespace_definitions(config) -> list:
+    return [Namespace(ns) for ns in read_namespace_documents(config)]
+
+
+def read_namespace_documents(config) -> list:
+    """Read the namespaces file
+    :return: list of namespace definitions (dicts)
+    """
     logging.info(f"Reading namespace definitions from '{config.namespaces_file}'")
     with open(config.namespaces_file) as yaml_file:
-        namespace_definitions = yaml.safe_load(yaml_file) or {}
+        namespace_definitions = yaml.load(yaml_file, Loader=YAML_LOADER) or {}
 
-    if not os.path.exists(config.output_dir + 'permissions/'):
-        os.makedirs(config.output_dir + 'permissions/')
+    return namespace_definitions.get('namespaces') or []
+
+
+def generate_permission_targets(config, namespace_list: list) -> list:
+    """Create the permission targets for all namespaces and the global permission targets
+    :param config: the config class holding config settings
+    :param namespace_list: list of Namespace objects
+    :return: list of PermissionTarget objects (namespace targets first, global targets last)
+    """
+    return [permission_target for namespace in namespace_list
+            for permission_target in namespace_permission_targets(config, namespace)] + \
+        global_permission_targets(config, namespace_list)
+
+
+def namespace_permission_targets(config, namespace) -> list:
+    """Create the permission targets of a single namespace"""
+    permission_targets = [PermissionTarget(namespace, repositories=config.internal_repos),
+                          ThirdpartyPermissionTarget(namespace, repositories=config.thirdparty_repos)]
+    if config.archive_repos:
+        permission_targets.append(ArchivePermissionTarget(namespace, repositories=config.archive_repos))
+
+    return permission_targets
 
+
+def global_permission_targets(config, namespace_list: list) -> list:
+    """Create the global permission targets collecting the public and restricted patterns of all namespaces"""
     global_internal = PermissionTarget(name="global-internal", repositories=config.internal_repos,
                                        groups=config.internal_groups, users=config.internal_users)
     global_public = PermissionTarget(name="global-public", repositories=config.internal_repos,
@@ -67,63 +135,121 @@ def process_namespaces(config, local_config):
                                                     repositories=config.archive_repos,
                                                     groups=config.public_groups, users=config.public_users)
 
-    namespaces_markdown = [f"| Namespace | Patterns | Thirdparty-Patterns | Zugriffsberechtigung",
-                           f"| :--- | :--- | :--- | :--- |"]
-
-    for ns in namespace_definitions.get('namespaces'):
-        namespace = Namespace(ns)
-
-        # global permissions
+    for namespace in namespace_list:
         global_internal.exclude_patterns.extend(namespace.restricted_patterns)
         global_public.include_patterns.extend(namespace.public_patterns)
         global_internal_thirdparty.exclude_patterns.extend(namespace.thirdparty_restricted_patterns)
         global_public_thirdparty.include_patterns.extend(namespace.thirdparty_public_patterns)
 
-        write_permission_target(PermissionTarget(namespace, repositories=config.internal_repos), config)
-        write_permission_target(ThirdpartyPermissionTarget(namespace, repositories=config.thirdparty_repos), config)
-
         if config.archive_repos:
             global_internal_archive.exclude_patterns.extend(namespace.restricted_patterns)
             global_public_archive.include_patterns.extend(namespace.public_patterns)
             global_internal_archive.exclude_patterns.extend(namespace.thirdparty_restricted_patterns)
             global_public_archive.include_patterns.extend(namespace.thirdparty_public_patterns)
-            write_permission_target(ArchivePermissionTarget(namespace, repositories=config.archive_repos), config)
 
-        # Create markdown entries
-        add_markdown_row(namespace, namespaces_markdown)
+    global_targets = [global_public, global_internal, global_public_thirdparty, global_internal_thirdparty]
 
-        if os.path.exists(config.group_template):
-            # Check for missing groups and create them
+    if config.archive_repos:
+        global_targets.extend([global_internal_archive, global_public_archive])
+
+    # Global permissions collect the patterns of all namespaces - remove duplicates and covered patterns
+    for permission_target in global_targets:
+        permission_target.compact()
+
+    return global_targets
+
+
+def generated_permissions(config, namespace_list: list) -> dict:
+    """Generate the permission targets of the namespaces as config objects
+    Targets without any patterns (i.e. a namespace without patterns for a group of repos) aren't created, like
+    with the 'namespaces' command
+    :return: dict of permission target name -> permission config object
+    """
+    return {permission_target.name: permission_target.as_dict()
+            for permission_target in generate_permission_targets(config, namespace_list)
+            if permission_target.include_patterns or permission_target.exclude_patterns}
+
+
+@profiled("namespaces")
+def add_namespace_objects(config_objects: dict, config) -> dict:
+    """Generate permission targets and missing groups of the namespaces in memory and add them to the config objects,
+    instead of writing them with the 'namespaces' command and reading the written files again
+    Objects defined in config files take precedence over generated objects
+    :param config_objects: dict with the config objects read from config files or bundle
+    :param config: the config class of the command, namespace settings (repos, users, groups, group template) are
+    read from its config file
+    :return: the config objects including the generated objects
+    """
+    if not config.namespaces_file:
+        return config_objects
+
+    namespaces_config = NamespacesConfig()
+    if config.config_file:
+        namespaces_config.from_yaml(config.config_file)
+    namespaces_config.namespaces_file = config.namespaces_file
+    namespace_list = read_namespace_definitions(namespaces_config)
+
+    permissions = generated_permissions(namespaces_config, namespace_list)
+    for name in permissions.keys() & config_objects['permissions'].keys():
+        logging.warning(f"Permission target '{name}' is defined in config files and generated from namespaces - "
+                        f"using the config files")
+
+    groups = {}
+    template = read_group_template(namespaces_config)
+    if template is not None:
+        for namespace in namespace_list:
             for group in namespace.groups:
-                group_name, *b = group.split(":")
-                logging.info(f"Group in namespace found: {group_name}")
-                if not local_config.get('groups').get(group_name):
-                    write_group(group_name, config)
-        else:
-            logging.warning(
-                f"Group template file '{config.group_template}' doesn't exist - skipping group auto creation")
+                group_name = group.split(":")[0]
+                if group_name not in config_objects['groups'] and group_name not in groups:
+                    groups[group_name] = render_group(group_name, template)
 
-    # Write public permission
-    write_permission_target(global_public, config)
+    logging.info(f"Generated {len(permissions)} permission targets and {len(groups)} groups from "
+                 f"{len(namespace_list)} namespaces")
+    return {**config_objects,
+            'permissions': {**permissions, **config_objects['permissions']},
+            'groups': {**config_objects['groups'], **{name: group for name, group in groups.items() if group}}}
 
-    # Write internal permission
-    write_permission_target(global_internal, config)
 
-    # Write public thirdparty permission
-    write_permission_target(global_public_thirdparty, config)
+@profiled("namespaces")
+def process_namespaces(config, local_config):
+    namespace_definitions = read_namespace_documents(config)
+    namespace_list = [Namespace(ns) for ns in namespace_definitions]
 
-    # Write internal thirdparty permission
-    write_permission_target(global_internal_thirdparty, config)
+    if not os.path.exists(config.output_dir + 'permissions/'):
+        os.makedirs(config.output_dir + 'permissions/')
 
-    if config.archive_repos:
-        # Write internal archive permission
-        write_permission_target(global_internal_archive, config)
+    # In incremental mode all files are rendered in memory first and only written if their content changed
+    outputs = {} if config.incremental else None
 
-        # Write public archive permission
-        write_permission_target(global_public_archive, config)
+    rendered = render_namespace_targets(config, namespace_definitions)
+    rendered.extend(render_permission_targets(global_permission_targets(config, namespace_list),
+                                              config.output_format))
+    for name, content in rendered:
+        write_permission_target(name, content, config, outputs)
+
+    namespaces_markdown = [f"| Namespace | Patterns | Thirdparty-Patterns | Zugriffsberechtigung",
+                           f"| :--- | :--- | :--- | :--- |"]
+    template = read_group_template(config)
+    written_groups = set()
+
+    for namespace in namespace_list:
+        # Create markdown entries
+        add_markdown_row(namespace, namespaces_markdown)
+
+        if template is not None:
+            # Check for missing groups and create them
+            for group in namespace.groups:
+                group_name, *b = group.split(":")
+                logging.info(f"Group in namespace found: {group_name}")
+                if not local_config.get('groups').get(group_name) and group_name not in written_groups:
+                    write_group(group_name, config, template)
+                    written_groups.add(group_name)
 
     # Write markdown doc
-    write_markdown_doc(namespaces_markdown, config)
+    write_markdown_doc(namespaces_markdown, config, outputs)
+
+    if outputs is not None:
+        sync_output_files(outputs, config)
 
 
 def get_item_with_permissions(item: str):
@@ -145,11 +271,16 @@ def get_item_with_permissions(item: str):
     return user, permissions
 
 
-def write_markdown_doc(namespaces: list, config):
+def write_markdown_doc(namespaces: list, config, outputs: dict = None):
     file_name = config.output_dir + 'permissions/' + 'namespaces.md'
+    content = ''.join(f"{entry}\n" for entry in namespaces)
+
+    if outputs is not None:
+        outputs[file_name] = content
+        return
+
     with open(file_name, 'w+') as markdown_file:
-        for entry in namespaces:
-            markdown_file.write(f"{entry}\n")
+        markdown_file.write(content)
 
     logging.info(f"Writing markdown doc to '{file_name}'")
 
@@ -237,18 +368,26 @@ class PermissionTarget:
         elif str is not None:
             self.name = name
 
-    def as_dict(self) -> dict:
-        add_build_info = False
+    def compact(self):
+        """Compact include and exclude patterns (deduplicate, drop covered patterns, sort)"""
+        include_count = len(self.include_patterns)
+        exclude_count = len(self.exclude_patterns)
+        self.include_patterns = compact_patterns(self.include_patterns)
+        self.exclude_patterns = compact_patterns(self.exclude_patterns)
+
+        logging.info(f"Compacted patterns of permission target '{self.name}': "
+                     f"include {include_count} -> {len(self.include_patterns)}, "
+                     f"exclude {exclude_count} -> {len(self.exclude_patterns)}")
 
-        if 'artifactory-build-info' in self.repositories:
-            self.repositories.remove('artifactory-build-info')
-            add_build_info = True
+    def as_dict(self) -> dict:
+        add_build_info = 'artifactory-build-info' in self.repositories
+        repositories = [repo for repo in self.repositories if repo != 'artifactory-build-info']
 
         permission_target = {
             'name': self.name,
             'repo': {'include-patterns': self.include_patterns,
                      'exclude-patterns': self.exclude_patterns,
-                     'repositories': self.repositories,
+                     'repositories': repositories,
                      'actions': {'users': self.users, 'groups': self.groups}}
         }
 
@@ -288,21 +427,162 @@ class ArchivePermissionTarget(PermissionTarget):
                 self.users[user] = ['read']
 
 
-def write_permission_target(permission_target: PermissionTarget, config):
-    if not permission_target.include_patterns and not permission_target.exclude_patterns:
-        logging.info(f"Skipping permission target '{permission_target.name}'")
+def write_permission_target(name: str, content: str, config, outputs: dict = None):
+    """Write a rendered permission target to the output dir
+    :param name: name of the permission target
+    :param content: the rendered permission target (see render_permission_targets), None for targets without patterns
+    :param config: the config class holding config settings
+    :param outputs: optional dict (file name -> content) collecting rendered files instead of writing them
+    """
+    if content is None:
+        logging.info(f"Skipping permission target '{name}'")
+        return
+
+    extension = '.yaml' if config.output_format == "yaml" else '.json'
+    file_name = config.output_dir + 'permissions/' + name + extension
+
+    if outputs is not None:
+        outputs[file_name] = content
         return
 
-    if config.output_format == "yaml":
-        file_name = config.output_dir + 'permissions/' + permission_target.name + '.yaml'
-        with open(file_name, 'w+') as permission_file:
-            yaml.dump(permission_target.as_dict(), permission_file, default_flow_style=False)
+    with open(file_name, 'w+') as permission_file:
+        permission_file.write(content)
+
+    logging.info(f"Writing permission target '{name}' to '{file_name}'")
+
+
+def render_namespace_targets(config, namespace_definitions: list, max_workers: int = None) -> list:
+    """Build and render the permission targets of many namespaces, in parallel processes for many targets
+    The processes get the namespace definitions and return the rendered targets, so only the small definitions and
+    the rendered strings are transferred
+    :param config: the config class holding config settings (repos and output format)
+    :param namespace_definitions: list of namespace definitions (dicts) of the namespaces file
+    :param max_workers: max number of processes (default: number of cpus), only used for many targets
+    :return: list of (permission target name, rendered content or None if the target has no patterns)
+    """
+    chunks = [namespace_definitions[i:i + CHUNK_SIZE] for i in range(0, len(namespace_definitions), CHUNK_SIZE)]
+    targets_per_namespace = 3 if config.archive_repos else 2
+
+    if len(namespace_definitions) * targets_per_namespace < PARALLEL_THRESHOLD:
+        results = [_render_namespace_chunk(chunk, config) for chunk in chunks]
     else:
-        file_name = config.output_dir + 'permissions/' + permission_target.name + '.json'
-        with open(file_name, 'w+') as permission_file:
-            json.dump(permission_target.as_dict(), permission_file, indent=4, sort_keys=True)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_render_namespace_chunk, chunks, [config] * len(chunks)))
+
+    return [item for result in results for item in result]
+
+
+def _render_namespace_chunk(namespace_definitions: list, config) -> list:
+    return render_permission_targets([permission_target for ns in namespace_definitions
+                                      for permission_target in namespace_permission_targets(config, Namespace(ns))],
+                                     config.output_format)
 
-    logging.info(f"Writing permission target '{permission_target.name}' to '{file_name}'")
+
+def render_permission_targets(permission_targets: list, output_format: str) -> list:
+    """Render permission targets
+    :param permission_targets: list of PermissionTarget objects
+    :param output_format: 'json' or 'yaml'
+    :return: list of (permission target name, rendered content or None if the target has no patterns)
+    """
+    return [(permission_target.name,
+             render_permission_target(permission_target.as_dict(), output_format)
+             if permission_target.include_patterns or permission_target.exclude_patterns else None)
+            for permission_target in permission_targets]
+
+
+def render_permission_target(permission_target: dict, output_format: str) -> str:
+    if output_format == "yaml":
+        return yaml.dump(permission_target, Dumper=YAML_DUMPER, default_flow_style=False)
+
+    return json.dumps(permission_target, indent=4, sort_keys=True)
+
+
+def sync_output_files(outputs: dict, config) -> dict:
+    """Write rendered files only if their content differs from the file on disk and remove files written by the
+    previous run which are not part of the current rendering anymore (see find_stale_files)
+    :param outputs: dict of file name -> rendered content
+    :param config: the config class holding config settings
+    :return: a dict with the number of created, changed, unchanged and removed files
+    """
+    summary = {'created': 0, 'changed': 0, 'unchanged': 0, 'removed': 0}
+
+    for file_name, content in outputs.items():
+        data = content.encode()
+
+        if not os.path.exists(file_name):
+            state = 'created'
+        elif file_digest(file_name) == hashlib.sha256(data).hexdigest():
+            summary['unchanged'] += 1
+            continue
+        else:
+            state = 'changed'
+
+        write_atomic(file_name, data)
+        summary[state] += 1
+        logging.info(f"Writing '{file_name}' ({state})")
+
+    for file_name in find_stale_files(outputs, config):
+        os.remove(file_name)
+        summary['removed'] += 1
+        logging.info(f"Removing stale file '{file_name}'")
+    write_manifest(outputs, config)
+
+    logging.info(f"Namespace generation finished: {summary['created']} created, {summary['changed']} changed, "
+                 f"{summary['unchanged']} unchanged, {summary['removed']} removed")
+    return summary
+
+
+def find_stale_files(outputs: dict, config) -> list:
+    """Find files in the permissions output dir written by the previous run (listed in its manifest) which haven't
+    been rendered in the current run
+    Without manifest (i.e. the first incremental run) no files are stale
+    """
+    permissions_dir = config.output_dir + 'permissions/'
+
+    return [permissions_dir + entry for entry in read_manifest(permissions_dir)
+            if permissions_dir + entry not in outputs and os.path.isfile(permissions_dir + entry)]
+
+
+def read_manifest(permissions_dir: str) -> list:
+    try:
+        with open(permissions_dir + MANIFEST_FILE) as f:
+            return sorted(json.load(f))
+    except FileNotFoundError:
+        return []
+
+
+def write_manifest(outputs: dict, config):
+    permissions_dir = config.output_dir + 'permissions/'
+    entries = sorted(os.path.basename(file_name) for file_name in outputs
+                     if os.path.dirname(file_name) + '/' == permissions_dir)
+    write_atomic(permissions_dir + MANIFEST_FILE, json.dumps(entries, indent=4).encode())
+
+
+def file_digest(file_name: str) -> str:
+    with open(file_name, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def write_atomic(file_name: str, data: bytes):
+    """Write data to a temp file in the target folder and move it in place, so readers never see partial files
+    The file keeps the mode of the existing file, new files get the default mode (0666 minus umask)
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(file_name) or '.', prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(data)
+        os.chmod(tmp_name, file_mode(file_name))
+        os.replace(tmp_name, file_name)
+    except BaseException:
+        os.remove(tmp_name)
+        raise
+
+
+def file_mode(file_name: str) -> int:
+    try:
+        return stat.S_IMODE(os.stat(file_name).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~UMASK
 
 
 def add_markdown_row(namespace: Namespace, markdown_entries):
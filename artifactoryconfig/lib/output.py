@@ -0,0 +1,94 @@
+import json
+import logging
+import sys
+import time
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+TEXT_FORMAT = "[%(asctime)s] %(levelname)-7s %(name)-7s %(message)s"
+
+# Logger for messages per config object (processed, created, unmanaged, ...), disabled in summary mode
+object_log = logging.getLogger("objects")
+
+
+class Lazy:
+    """Defer an expensive formatting call (i.e. pformat of the whole configuration) until a message is emitted
+    Usage: logging.debug("Configuration %s", Lazy(pformat, config_objects))
+    """
+    __slots__ = ['func', 'args']
+
+    def __init__(self, func, *args):
+        self.func = func
+        self.args = args
+
+    def __str__(self):
+        return str(self.func(*self.args))
+
+
+class JsonFormatter(logging.Formatter):
+    """Format log records as one json object per line"""
+
+    def format(self, record) -> str:
+        entry = {'time': self.formatTime(record, DATE_FORMAT),
+                 'level': record.levelname,
+                 'logger': record.name,
+                 'message': record.getMessage()}
+        if getattr(record, 'target', None):
+            entry['target'] = record.target
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+
+        return json.dumps(entry)
+
+
+class TargetFilter(logging.Filter):
+    """Add the name of the Artifactory instance to all records of a worker process"""
+
+    def __init__(self, target: str):
+        super().__init__()
+        self.target = target
+
+    def filter(self, record) -> bool:
+        record.target = self.target
+        return True
+
+
+class Progress:
+    """Log the progress of a long loop at most once per interval instead of a line per item"""
+
+    def __init__(self, total: int, label: str, interval: float = 10):
+        self.total = total
+        self.label = label
+        self.interval = interval
+        self.done = 0
+        self.last = time.monotonic()
+
+    def advance(self, count: int = 1):
+        self.done += count
+        now = time.monotonic()
+
+        if now - self.last >= self.interval or self.done == self.total:
+            self.last = now
+            logging.info("%s: %d/%d (%d%%)", self.label, self.done, self.total, 100 * self.done // max(self.total, 1))
+
+
+def setup_logging(log_level: int, log_format: str = "text", summary: bool = False):
+    """Setup logging to stdout as text or json lines
+    In summary mode messages per config object are suppressed, only progress and summaries are logged
+    """
+    logging.basicConfig(level=log_level, stream=sys.stdout, format=TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+    if log_format == "json":
+        for handler in logging.getLogger().handlers:
+            handler.setFormatter(JsonFormatter())
+
+    if summary:
+        object_log.setLevel(max(log_level, logging.WARNING))
+
+
+def set_log_target(target: str):
+    """Mark all log messages of the current process with the name of an Artifactory instance"""
+    for handler in logging.getLogger().handlers:
+        if not isinstance(handler.formatter, JsonFormatter):
+            handler.setFormatter(logging.Formatter(f"[%(asctime)s] %(levelname)-7s [{target}] %(message)s",
+                                                   datefmt=DATE_FORMAT))
+        handler.addFilter(TargetFilter(target))
@@ -0,0 +1,150 @@
+import re
+from functools import lru_cache
+
+
+def ant_to_regex(pattern: str) -> str:
+    """Translate an Artifactory (Ant-style) path pattern into a regex string
+    '**' matches any number of folders, '*' any characters within a folder and '?' a single character.
+    A pattern ending with '/' is treated like a pattern ending with '/**'
+    :param pattern: the Ant-style pattern
+    :return: regex string which has to match the full path
+    """
+    regex = ''
+    segments = _segments(pattern)
+
+    for i, segment in enumerate(segments):
+        last = i == len(segments) - 1
+        if segment == '**':
+            if not last:
+                regex += '(?:.*/)?'
+            elif regex:
+                # drop trailing separator so 'a/**' matches 'a' as well as everything below
+                regex = regex[:-1] + '(?:/.*)?'
+            else:
+                regex = '.*'
+        else:
+            regex += ''.join('[^/]*' if c == '*' else '[^/]' if c == '?' else re.escape(c) for c in segment)
+            if not last:
+                regex += '/'
+
+    return regex
+
+
+def compile_patterns(patterns: list):
+    """Compile a list of Ant-style patterns into one regex matching a path if any of the patterns matches
+    :param patterns: list of Ant-style patterns
+    :return: compiled regex or None if the list contains no patterns
+    """
+    patterns = [p for p in patterns if p]
+    if not patterns:
+        return None
+
+    return re.compile('|'.join(f"(?:{ant_to_regex(p)})" for p in sorted(set(patterns))))
+
+
+class IgnoreMatcher:
+    """
+    Matches object names against the unmanaged_ignores patterns (regexes matched at the start of the name)
+    The patterns are combined into a single compiled regex once, without patterns nothing is ignored
+    """
+
+    def __init__(self, patterns: list):
+        self.patterns = list(patterns or [])
+        self.regex = re.compile("|".join(f"(?:{pattern})" for pattern in self.patterns)) if self.patterns else None
+
+    def is_ignored(self, name: str) -> bool:
+        return self.regex is not None and self.regex.match(name) is not None
+
+    def unmanaged(self, names) -> list:
+        """Return the names not matching any pattern"""
+        if self.regex is None:
+            return list(names)
+
+        match = self.regex.match
+        return [name for name in names if match(name) is None]
+
+
+def pattern_covers(broad: str, narrow: str) -> bool:
+    """Check if every path matched by pattern 'narrow' is also matched by pattern 'broad'
+    The check is conservative - False may be returned for exotic patterns that do overlap
+    """
+    return _covers(_segments(broad), _segments(narrow))
+
+
+def compact_patterns(patterns: list) -> list:
+    """Remove duplicates and patterns covered by broader patterns and return a sorted list
+    As include/exclude patterns are combined with 'or' the compacted list matches exactly the same paths
+    :param patterns: list of Ant-style patterns
+    :return: sorted list of remaining patterns
+    """
+    unique = sorted(set(patterns))
+
+    # a pattern can only cover patterns starting with its literal folders (the folders before the first wildcard),
+    # comparing each pattern only with patterns of its own literal prefixes keeps thousands of patterns fast
+    by_prefix = {}
+    for pattern in unique:
+        by_prefix.setdefault(literal_prefix(pattern), []).append(pattern)
+
+    compacted = []
+    for pattern in unique:
+        prefix = literal_prefix(pattern)
+        candidates = (other for i in range(len(prefix) + 1) for other in by_prefix.get(prefix[:i], []))
+        if not any(_shadows(other, pattern) for other in candidates):
+            compacted.append(pattern)
+
+    return compacted
+
+
+def _shadows(other: str, pattern: str) -> bool:
+    if other == pattern or not pattern_covers(other, pattern):
+        return False
+    # keep exactly one of two equivalent patterns
+    return not pattern_covers(pattern, other) or other < pattern
+
+
+@lru_cache(maxsize=None)
+def _segments(pattern: str) -> tuple:
+    if pattern.endswith('/'):
+        pattern += '**'
+
+    segments = []
+    for segment in pattern.split('/'):
+        # consecutive '**' are equivalent to a single one
+        if segment == '**' and segments and segments[-1] == '**':
+            continue
+        segments.append(segment)
+    return tuple(segments)
+
+
+def literal_prefix(pattern: str) -> tuple:
+    """The literal folders of a pattern before the first wildcard
+    A pattern can only cover patterns whose literal prefix starts with its own literal prefix
+    """
+    segments = _segments(pattern)
+    for i, segment in enumerate(segments):
+        if _has_wildcard(segment):
+            return segments[:i]
+    return segments
+
+
+def _has_wildcard(segment: str) -> bool:
+    return '*' in segment or '?' in segment
+
+
+# bounded, the number of compared pattern pairs may grow quadratically with the number of patterns
+@lru_cache(maxsize=2 ** 16)
+def _covers(broad: tuple, narrow: tuple) -> bool:
+    if not broad:
+        return not narrow
+    if broad[0] == '**':
+        return any(_covers(broad[1:], narrow[i:]) for i in range(len(narrow) + 1))
+    if not narrow or narrow[0] == '**':
+        return False
+    return _segment_regex(broad[0]).fullmatch(narrow[0]) is not None and _covers(broad[1:], narrow[1:])
+
+
+@lru_cache(maxsize=None)
+def _segment_regex(segment: str):
+    # '*' in the broad segment covers anything incl. wildcards of the narrow segment,
+    # '?' covers every single character except a '*' wildcard
+    return re.compile(''.join('.*' if c == '*' else '[^*]' if c == '?' else re.escape(c) for c in segment))
@@ -0,0 +1,248 @@
+import gzip
+import hashlib
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+
+import requests
+from pydantic import SecretStr
+from pydantic.json import pydantic_encoder
+
+from . import artifactory
+from . import asyncclient
+from .helper import ApplyConfig, PlanConfig
+from .model import config_hash
+from .output import object_log
+from .report import RunReport
+
+PLAN_VERSION = 1
+
+
+def create_plan(config_objects: dict, session: artifactory.Session) -> dict:
+    """Diff the local configuration with the server configuration and create a plan with all operations to perform
+    Existing objects are fetched from Artifactory and only included in the plan if they differ from the config.
+    Objects deleted since they were listed are planned as creates, if other objects can't be fetched no plan is
+    created.
+    :param config_objects: dict with all config objects
+    :param session: the session connected to Artifactory (or a SnapshotSession), holding the config settings
+    :return: the plan
+    """
+    logging.info("#####   Creating execution plan   #####")
+    config: PlanConfig = session.config
+    snapshot = session.snapshot()
+    operations = []
+    unchanged = 0
+
+    existing = [(config_type, key) for _, config_type, snapshot_type in artifactory.OBJECT_TYPES
+                for key in config_objects[config_type] if key in snapshot[snapshot_type]]
+    fetched = {}
+    errors = {}
+
+    # repos are fetched by the session with a single request from the system configuration descriptor
+    if config.async_requests and not config.snapshot_file:
+        fetched = asyncclient.fetch_objects(config, [item for item in existing
+                                                     if item[0] not in artifactory.REPO_TYPES])
+    fetched.update(session.fetch_objects([item for item in existing if item not in fetched], errors))
+
+    failed = [f"{config_type} '{key}'" for (config_type, key), error in errors.items()
+              if not isinstance(error, artifactory.NOT_FOUND_ERRORS)]
+    if failed:
+        logging.error(f"!!! Failed to fetch {', '.join(failed)} - plan not created !!!")
+        sys.exit(1)
+
+    for item_type, config_type, snapshot_type in artifactory.OBJECT_TYPES:
+        for key, value in config_objects[config_type].items():
+            # objects deleted since they were listed have to be created again
+            current = snapshot[snapshot_type].get(key) if (config_type, key) not in errors else None
+            model = artifactory.build_model(config_type, key, value, exists=current is not None)
+            definition = None
+
+            if current is not None:
+                definition = fetched[(config_type, key)]
+                if is_up_to_date(model, definition):
+                    object_log.debug("%s '%s' is up to date", item_type.capitalize(), key)
+                    unchanged += 1
+                    continue
+
+            operations.append({'type': config_type,
+                               'action': 'update' if current is not None else 'create',
+                               'key': key,
+                               'precondition': precondition(current, definition, desired_fields(model)),
+                               'payload': serialize_model(model)})
+            object_log.info("%s '%s' will be %sd", item_type.capitalize(), key, operations[-1]['action'])
+
+    logging.info(f"Plan contains {len(operations)} operations, {unchanged} objects are up to date")
+
+    return {'version': PLAN_VERSION,
+            'created': datetime.now(timezone.utc).isoformat(),
+            'artifactory_url': config.artifactory_url,
+            'config_hash': config_hash(config_objects),
+            'operations': operations}
+
+
+def apply_plan(session: artifactory.Session) -> RunReport:
+    """Verify the preconditions of a plan and execute its operations
+    :param session: the session connected to Artifactory, holding the config settings
+    :return: the report with the executed and failed operations
+    """
+    config: ApplyConfig = session.config
+    plan = read_plan(config.plan_file)
+    run_report = RunReport(config.artifactory_url)
+
+    if plan['artifactory_url'].rstrip('/') != config.artifactory_url.rstrip('/'):
+        logging.warning(f"Plan was created for '{plan['artifactory_url']}', applying to '{config.artifactory_url}'")
+
+    failures = verify_preconditions(plan, session)
+    if failures:
+        for failure in failures:
+            logging.error(failure)
+        logging.error("!!! Server configuration changed since plan was created - create a new plan !!!")
+        sys.exit(1)
+
+    if config.dry_run:
+        logging.info("Dry run enabled - no changes will be deployed")
+
+    item_types = {config_type: item_type for item_type, config_type, _ in artifactory.OBJECT_TYPES}
+
+    logging.info(f"#####   Applying {len(plan['operations'])} planned operations   #####")
+    if config.async_requests and not config.dry_run:
+        apply_operations_async(plan['operations'], item_types, config, run_report)
+        return run_report
+
+    for operation in plan['operations']:
+        item_type = item_types[operation['type']]
+        model = artifactory.build_model_from_payload(operation['type'], operation['action'], operation['payload'])
+        try:
+            if not config.dry_run:
+                session.execute_operation(operation['type'], operation['action'], model)
+            object_log.info("%s '%s' successfully %sd", item_type.capitalize(), operation['key'], operation['action'])
+            run_report.add(item_type, f"{operation['action']}d")
+        except requests.exceptions.HTTPError as e:
+            artifactory.log_api_error(e)
+            run_report.add_failure(item_type, operation['key'])
+
+    return run_report
+
+
+def apply_operations_async(operations: list, item_types: dict, config: ApplyConfig, run_report: RunReport):
+    """Execute the operations of a plan concurrently with the asyncio client"""
+    results = asyncclient.execute_operations(config, [(operation['type'], operation['action'],
+                                                       artifactory.build_model_from_payload(operation['type'],
+                                                                                            operation['action'],
+                                                                                            operation['payload']))
+                                                      for operation in operations])
+
+    for operation, error in zip(operations, results):
+        item_type = item_types[operation['type']]
+        if error is None:
+            object_log.info("%s '%s' successfully %sd", item_type.capitalize(), operation['key'], operation['action'])
+            run_report.add(item_type, f"{operation['action']}d")
+        else:
+            asyncclient.log_api_error(error)
+            run_report.add_failure(item_type, operation['key'])
+
+
+def verify_preconditions(plan: dict, session: artifactory.Session) -> list:
+    """Check that the objects of all planned operations are in the same state as when the plan was created
+    The existence and the listed data of all objects are checked with the list endpoints. For updates the fields
+    set by the operation are fetched again and compared with their state when the plan was created, so changes made
+    on the server in the meantime aren't overwritten.
+    :return: list of failure messages
+    """
+    snapshot = session.snapshot(refresh=True)
+    snapshot_types = {config_type: snapshot_type for _, config_type, snapshot_type in artifactory.OBJECT_TYPES}
+    failures = []
+
+    updated = [(operation['type'], operation['key']) for operation in plan['operations']
+               if 'content' in operation['precondition']
+               and operation['key'] in snapshot[snapshot_types[operation['type']]]]
+    fetched = session.fetch_objects(updated) if updated else {}
+
+    for operation in plan['operations']:
+        expected = operation['precondition']
+        current = snapshot[snapshot_types[operation['type']]].get(operation['key'])
+        definition = fetched.get((operation['type'], operation['key']))
+        if precondition(current, definition, expected.get('fields')) != expected:
+            failures.append(f"Precondition failed for {operation['action']} of {operation['type']} "
+                            f"'{operation['key']}'")
+
+    return failures
+
+
+def precondition(current, definition=None, fields: list = None) -> dict:
+    """Precondition of an operation - whether the object exists, the digest of its listed data and for existing
+    objects the digest of the fields set by the operation
+    :param current: the SnapshotEntry of the object or None
+    :param definition: the full definition (pyartifactory response model) of an existing object
+    :param fields: the fields set by the operation
+    """
+    if current is None:
+        return {'exists': False}
+    if definition is None:
+        return {'exists': True, 'hash': current.digest}
+
+    actual = json.loads(definition.json(by_alias=True, exclude_unset=True))
+    content = json.dumps({field: actual.get(field) for field in fields}, sort_keys=True)
+    return {'exists': True, 'hash': current.digest, 'fields': fields,
+            'content': hashlib.sha256(content.encode()).hexdigest()[:16]}
+
+
+def desired_fields(model) -> list:
+    """The fields set in the config, which are overwritten by an update"""
+    return sorted(json.loads(model.json(by_alias=True, exclude_unset=True, exclude={'password'})))
+
+
+def is_up_to_date(model, current) -> bool:
+    """Check if all fields set in the config are equal to the fields of the object in Artifactory
+    Fields not returned by Artifactory are treated as different, not as their default value
+    """
+    desired = json.loads(model.json(by_alias=True, exclude_unset=True, exclude={'password'}))
+    actual = json.loads(current.json(by_alias=True, exclude_unset=True))
+    return _is_subset(desired, actual)
+
+
+def _is_subset(desired, actual) -> bool:
+    if isinstance(desired, dict):
+        return isinstance(actual, dict) and all(_is_subset(v, actual.get(k)) for k, v in desired.items())
+    if isinstance(desired, list) and isinstance(actual, list):
+        return sorted(map(json.dumps, desired)) == sorted(map(json.dumps, actual))
+    return desired == actual
+
+
+def serialize_model(model) -> dict:
+    """Serialize a model including secrets, so it can be sent to Artifactory from the plan"""
+    return json.loads(model.json(by_alias=True, encoder=_reveal_secrets))
+
+
+def _reveal_secrets(value):
+    if isinstance(value, SecretStr):
+        return value.get_secret_value()
+    return pydantic_encoder(value)
+
+
+def write_plan(plan: dict, plan_file: str):
+    """Write a plan as compact json, files ending with '.gz' are compressed
+    The plan contains payloads with secrets (i.e. passwords) and has to be handled like the vault secret
+    """
+    content = json.dumps(plan, separators=(',', ':'), sort_keys=True).encode()
+    opener = gzip.open if plan_file.endswith('.gz') else open
+
+    with opener(plan_file, 'wb') as f:
+        f.write(content)
+
+    logging.info(f"Writing plan with {len(plan['operations'])} operations to '{plan_file}'")
+
+
+def read_plan(plan_file: str) -> dict:
+    opener = gzip.open if plan_file.endswith('.gz') else open
+
+    logging.info(f"Reading plan from '{plan_file}'")
+    with opener(plan_file, 'rb') as f:
+        plan = json.loads(f.read())
+
+    if plan.get('version') != PLAN_VERSION:
+        logging.error(f"Unsupported plan version '{plan.get('version')}' (expected {PLAN_VERSION})")
+        sys.exit(1)
+
+    return plan
@@ -0,0 +1,246 @@
+import contextlib
+import cProfile
+import functools
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import tracemalloc
+
+PROFILE_MODES = ['cpu', 'memory']
+# frames kept per allocation in memory mode
+TRACEBACK_DEPTH = 25
+# allocation sites logged per phase, more are written to the allocations file
+TOP_ALLOCATIONS = 10
+TOP_ALLOCATIONS_FILE = 50
+# limits for approximating collapsed stacks from the cProfile call graph
+MAX_STACK_DEPTH = 64
+MIN_STACK_TIME = 1e-6
+
+_profiler = None
+
+
+class Profiler:
+    """
+    Profiles the phases of a run (decrypting vault files, reading config files, fetching, applying, ...) with
+    cProfile (cpu) or tracemalloc (memory)
+    A phase may be entered many times (i.e. once per config file), its results are accumulated. A nested phase is
+    profiled on its own: in cpu mode the outer phase is paused meanwhile, in memory mode allocation sites are only
+    recorded for outermost phases (taking a snapshot per config file would be far too slow) while allocated and
+    peak memory are recorded for all phases. Only the main thread is profiled.
+    """
+
+    def __init__(self, mode: str, output_dir: str):
+        self.mode = mode
+        self.output_dir = output_dir
+        self.stack = []
+        # traced memory when the active phases were entered (memory mode)
+        self.starts = []
+        # phase -> cProfile.Profile (cpu) or [allocated bytes, peak bytes] (memory), in order of first use
+        self.phases = {}
+        # phase -> {traceback: allocated bytes}, outermost phases in memory mode only
+        self.allocations = {}
+
+        if mode == 'memory':
+            tracemalloc.start(TRACEBACK_DEPTH)
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        if name in self.stack or threading.current_thread() is not threading.main_thread():
+            yield
+        elif self.mode == 'cpu':
+            with self._cpu_phase(name):
+                yield
+        else:
+            with self._memory_phase(name):
+                yield
+
+    @contextlib.contextmanager
+    def _cpu_phase(self, name: str):
+        profile = self.phases.setdefault(name, cProfile.Profile())
+        if self.stack:
+            self.phases[self.stack[-1]].disable()
+        self.stack.append(name)
+        profile.enable()
+
+        try:
+            yield
+        finally:
+            profile.disable()
+            self.stack.pop()
+            if self.stack:
+                self.phases[self.stack[-1]].enable()
+
+    @contextlib.contextmanager
+    def _memory_phase(self, name: str):
+        totals = self.phases.setdefault(name, [0, 0])
+        before = _take_snapshot() if not self.stack else None
+        # peak since the last reset belongs to the active phases, record it before resetting it for this phase
+        self._update_peaks()
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        self.stack.append(name)
+        self.starts.append(start)
+
+        try:
+            yield
+        finally:
+            self._update_peaks()
+            self.stack.pop()
+            self.starts.pop()
+            totals[0] += tracemalloc.get_traced_memory()[0] - start
+
+            if before is not None:
+                allocations = self.allocations.setdefault(name, {})
+                for stat in _take_snapshot().compare_to(before, 'traceback'):
+                    allocations[stat.traceback] = allocations.get(stat.traceback, 0) + stat.size_diff
+
+    def _update_peaks(self):
+        peak = tracemalloc.get_traced_memory()[1]
+        for name, start in zip(self.stack, self.starts):
+            self.phases[name][1] = max(self.phases[name][1], peak - start)
+
+    def write(self):
+        """Write the profiles of all phases to the output folder and log a summary"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        logging.info(f"#####   {self.mode.capitalize()} profile (written to '{self.output_dir}')   #####")
+
+        for index, (name, result) in enumerate(self.phases.items()):
+            base_name = os.path.join(self.output_dir, f"{index + 1:02d}-" + re.sub(r'[^\w.-]+', '-', name))
+            if self.mode == 'cpu':
+                self._write_cpu_profile(name, result, base_name)
+            else:
+                self._write_memory_profile(name, result, base_name)
+
+    @staticmethod
+    def _write_cpu_profile(name: str, profile: cProfile.Profile, base_name: str):
+        stats = pstats.Stats(profile)
+        stats.dump_stats(f"{base_name}.pstats")
+        write_collapsed_stacks(f"{base_name}.folded", collapsed_cpu_stacks(stats))
+        logging.info(f"{name}: {stats.total_tt:.3f}s in {stats.total_calls} calls")
+
+    def _write_memory_profile(self, name: str, totals: list, base_name: str):
+        logging.info(f"{name}: {totals[0] / 1024:.1f} KiB allocated, peak {totals[1] / 1024:.1f} KiB")
+        if name not in self.allocations:
+            return
+
+        allocations = self.allocations[name]
+        write_collapsed_stacks(f"{base_name}.folded",
+                               {';'.join(_frame_label(frame) for frame in traceback): size
+                                for traceback, size in allocations.items() if size > 0})
+
+        sites = {}
+        for traceback, size in allocations.items():
+            sites[traceback[-1]] = sites.get(traceback[-1], 0) + size
+        top_sites = sorted([site for site in sites.items() if site[1] > 0], key=lambda site: site[1],
+                           reverse=True)[:TOP_ALLOCATIONS_FILE]
+
+        with open(f"{base_name}.allocations.txt", 'w') as f:
+            for frame, size in top_sites:
+                f.write(f"{size / 1024:12.1f} KiB  {frame.filename}:{frame.lineno}\n")
+        for frame, size in top_sites[:TOP_ALLOCATIONS]:
+            logging.info(f"  {size / 1024:10.1f} KiB  {frame.filename}:{frame.lineno}")
+
+
+def setup_profiling(mode: str, output_dir: str):
+    """Enable profiling of the phases of this run, no-op if mode is empty"""
+    global _profiler
+
+    if not mode:
+        return
+    if mode not in PROFILE_MODES:
+        logging.error(f"Unknown profile mode '{mode}' (expected one of {', '.join(PROFILE_MODES)})")
+        sys.exit(1)
+
+    logging.info(f"Profiling {mode} usage per phase")
+    _profiler = Profiler(mode, output_dir)
+
+
+def finish_profiling():
+    """Write the profiles if profiling is enabled"""
+    global _profiler
+
+    if _profiler is None:
+        return
+
+    profiler, _profiler = _profiler, None
+    profiler.write()
+    if profiler.mode == 'memory':
+        tracemalloc.stop()
+
+
+def phase(name: str):
+    """Context manager profiling a phase of the run, without overhead if profiling is disabled"""
+    if _profiler is None:
+        return contextlib.nullcontext()
+
+    return _profiler.phase(name)
+
+
+def profiled(name: str):
+    """Decorator profiling all calls of a function as phase"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def collapsed_cpu_stacks(stats: pstats.Stats) -> dict:
+    """Approximate collapsed stacks (flamegraph input) from the call graph of a cProfile run
+    cProfile only records caller -> callee edges, the time of a function is split between the stacks leading to
+    it in proportion to the time spent per edge
+    :return: dict of 'root;...;function' -> microseconds
+    """
+    entries = stats.stats
+    callees = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+
+    stacks = {}
+
+    def walk(func, path: tuple, share: float):
+        own_time, total_time = entries[func][2], entries[func][3]
+        path = path + (_func_label(func),)
+        stacks[';'.join(path)] = stacks.get(';'.join(path), 0) + own_time * share
+
+        if len(path) >= MAX_STACK_DEPTH:
+            return
+        for callee, edge_time in callees.get(func, []):
+            callee_time = share * edge_time
+            if callee_time >= MIN_STACK_TIME and _func_label(callee) not in path:
+                walk(callee, path, callee_time / entries[callee][3])
+
+    for func, entry in entries.items():
+        if not entry[4]:
+            walk(func, (), 1.0)
+
+    return {stack: round(seconds * 1e6) for stack, seconds in stacks.items() if round(seconds * 1e6) > 0}
+
+
+def write_collapsed_stacks(file_name: str, stacks: dict):
+    """Write collapsed stacks as input for flamegraph tools (i.e. flamegraph.pl or speedscope)"""
+    with open(file_name, 'w') as f:
+        for stack, value in sorted(stacks.items()):
+            f.write(f"{stack} {value}\n")
+
+
+def _take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__),
+                                                      tracemalloc.Filter(False, __file__)])
+
+
+def _func_label(func: tuple) -> str:
+    filename, lineno, name = func
+    if filename == '~':
+        return name.replace(';', ':')
+    return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+
+def _frame_label(frame) -> str:
+    return f"{os.path.basename(frame.filename)}:{frame.lineno}"
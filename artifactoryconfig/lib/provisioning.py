@@ -0,0 +1,237 @@
+import base64
+import binascii
+import csv
+import gzip
+import itertools
+import logging
+import re
+import sys
+
+from pydantic import ValidationError
+from pyartifactory.models import User
+
+from . import artifactory
+from .helper import ProvisionConfig
+from .output import object_log
+from .report import RunReport
+
+USER_FORMATS = ['csv', 'ldif']
+# multi-valued fields of the user model, all other fields take the first value of an ldif attribute
+LIST_FIELDS = ['groups']
+# fields of a user, the password is only used when the user is created
+USER_FIELDS = list(User.__fields__) + ['password']
+# used if no user_mapping is configured: columns/attributes named like the fields of the user model
+DEFAULT_MAPPING = {'fields': {field: field for field in USER_FIELDS}}
+
+
+class UserMapping:
+    """
+    Maps a row of a csv file or an ldif record to a user config object
+    Configured in the config file (user_mapping) with the columns/attributes per user field, static groups added to
+    every user, default values and an optional regex extracting group names (i.e. from ldif 'memberOf' dns)
+    Users without password in the export get a random one on creation and the internal password is disabled
+    (unless configured otherwise), they are expected to log in via LDAP/SSO
+    """
+
+    def __init__(self, mapping: dict = None):
+        mapping = mapping or DEFAULT_MAPPING
+        self.fields = mapping.get('fields') or {}
+        self.groups = list(mapping.get('groups') or [])
+        self.defaults = mapping.get('defaults') or {}
+        self.separator = mapping.get('separator', ';')
+        self.group_pattern = re.compile(mapping['group_pattern']) if mapping.get('group_pattern') else None
+
+        unknown = [field for field in list(self.fields) + list(self.defaults) if field not in USER_FIELDS]
+        if unknown:
+            logging.error(f"Unknown user fields in user mapping: {', '.join(unknown)}")
+            sys.exit(1)
+        if 'name' not in self.fields:
+            logging.error("User mapping needs a column/attribute for field 'name'")
+            sys.exit(1)
+
+    def map(self, row: dict) -> dict:
+        """Build the user config object from a row (column/attribute -> value or list of values)"""
+        user = dict(self.defaults)
+
+        for field, column in self.fields.items():
+            values = _values(row.get(column), self.separator if field in LIST_FIELDS else None)
+            if not values:
+                continue
+            if field == 'groups':
+                values = self._group_names(values)
+            user[field] = values if field in LIST_FIELDS else values[0]
+
+        if self.groups:
+            user['groups'] = list(dict.fromkeys(list(user.get('groups') or []) + self.groups))
+        user.setdefault('internalPasswordDisabled', 'password' not in user)
+
+        return user
+
+    def _group_names(self, values: list) -> list:
+        if self.group_pattern is None:
+            return values
+
+        names = []
+        for value in values:
+            match = self.group_pattern.search(value)
+            if match:
+                names.append(match.group(1) if match.groups() else match.group(0))
+        return names
+
+
+def provision_users(session: artifactory.Session) -> RunReport:
+    """Create and update the users of a large csv or ldif export (i.e. from HR or LDAP) in batches
+    The export is streamed, only one batch of users is held in memory and applied at a time. Users without name
+    or with invalid fields are reported as failed and skipped.
+    :param session: the session connected to Artifactory
+    :return: the merged report of all batches
+    """
+    config: ProvisionConfig = session.config
+    mapping = UserMapping(config.user_mapping)
+    run_report = RunReport(config.artifactory_url)
+    users_format = config.users_format or detect_format(config.users_file)
+
+    logging.info(f"#####   Provisioning users from '{config.users_file}' in batches of {config.batch_size}   #####")
+    rows = read_rows(config.users_file, users_format, set(mapping.fields.values()))
+    for number, batch in enumerate(batched(rows, config.batch_size), start=1):
+        users = {}
+        for line, row in batch:
+            user = mapping.map(row)
+            if not user.get('name'):
+                logging.warning(f"No user name in {users_format} record at line {line}")
+                run_report.add_failure('user', f"line {line}")
+                continue
+            if _is_valid(user):
+                users[user['name']] = user
+            else:
+                run_report.add_failure('user', user['name'])
+
+        if not users:
+            continue
+
+        logging.info(f"Applying batch {number} with {len(users)} users")
+        batch_report = session.apply(_user_objects(users), log_unmanaged=False)
+        run_report.merge(batch_report)
+
+    return run_report
+
+
+def detect_format(users_file: str) -> str:
+    extension = users_file[:-3] if users_file.endswith('.gz') else users_file
+    extension = extension.rsplit('.', 1)[-1].lower()
+    if extension not in USER_FORMATS:
+        logging.error(f"Unknown format of users file '{users_file}' (expected one of {', '.join(USER_FORMATS)})")
+        sys.exit(1)
+
+    return extension
+
+
+def read_rows(users_file: str, users_format: str, attributes: set = None):
+    """Stream the records of a users file (compressed if ending with '.gz')
+    :param attributes: ldif attributes to read (i.e. the mapped ones), all if None
+    :return: generator of (line number, dict of column/attribute -> value or list of values)
+    """
+    opener = gzip.open if users_file.endswith('.gz') else open
+
+    with opener(users_file, 'rt', encoding='utf-8', newline='') as f:
+        reader = read_ldif(f, attributes) if users_format == 'ldif' else read_csv(f)
+        yield from reader
+
+
+def read_csv(lines):
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_ldif(lines, attributes: set = None):
+    """Parse ldif records line by line, attributes of a record are collected into lists of values
+    Folded lines (continuation starting with a space), base64 values ('::') and comments are supported
+    :param attributes: attributes to read, others (i.e. binary 'jpegPhoto') are skipped, all if None
+    """
+    record = {}
+    start = None
+    # line number, attribute name, base64 encoded and value of the current line, folded lines are appended
+    pending = None
+
+    for number, line in enumerate(lines, start=1):
+        line = line.rstrip('\r\n')
+        if line.startswith(' ') and pending is not None:
+            pending[3] += line[1:]
+            continue
+        if pending is not None:
+            _add_value(record, attributes, *pending)
+            pending = None
+
+        if not line:
+            if start is not None:
+                yield start, record
+            record = {}
+            start = None
+            continue
+        if line.startswith('#') or (start is None and line.startswith('version:')):
+            continue
+
+        name, separator, value = line.partition(':')
+        if not separator:
+            logging.warning(f"Invalid ldif line {number} ignored")
+            continue
+        if start is None:
+            start = number
+        pending = [number, name, value.startswith(':'), value[1:] if value.startswith(':') else value]
+
+    if pending is not None:
+        _add_value(record, attributes, *pending)
+    if start is not None:
+        yield start, record
+
+
+def _add_value(record: dict, attributes: set, number: int, name: str, encoded: bool, value: str):
+    if attributes is not None and name not in attributes:
+        return
+
+    value = value.strip()
+    if encoded:
+        try:
+            value = base64.b64decode(value, validate=True).decode('utf-8')
+        except (binascii.Error, UnicodeDecodeError):
+            logging.warning(f"Value of attribute '{name}' at ldif line {number} isn't base64 encoded text - ignored")
+            return
+    record.setdefault(name, []).append(value)
+
+
+def batched(iterable, size: int):
+    """Split an iterable into lists of at most size items without reading it completely"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _values(value, separator: str = None) -> list:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [v for v in value if v]
+
+    value = value.strip()
+    if separator and value:
+        return [v.strip() for v in value.split(separator) if v.strip()]
+    return [value] if value else []
+
+
+def _is_valid(user: dict) -> bool:
+    try:
+        artifactory.build_model('users', user['name'], user)
+    except ValidationError as e:
+        for error in e.errors():
+            object_log.warning("User '%s': %s - %s", user['name'], '.'.join(map(str, error['loc'])), error['msg'])
+        return False
+
+    return True
+
+
+def _user_objects(users: dict) -> dict:
+    return {config_type: users if config_type == 'users' else {} for _, config_type, _ in artifactory.OBJECT_TYPES}
@@ -0,0 +1,100 @@
+import json
+import logging
+
+
+class RunReport:
+    """
+    Collects the results of a deploy run - number of objects per type and action, failed objects and unmanaged items
+    """
+
+    def __init__(self, target: str = ""):
+        self.target = target
+        self.counts = {}
+        self.failed = {}
+        self.unmanaged = {}
+        # stats of the adaptive concurrency limiter per Artifactory instance
+        self.concurrency = {}
+
+    def add(self, item_type: str, action: str, count: int = 1):
+        actions = self.counts.setdefault(item_type, {})
+        actions[action] = actions.get(action, 0) + count
+
+    def add_failure(self, item_type: str, key: str):
+        self.failed.setdefault(item_type, []).append(key)
+
+    def add_unmanaged(self, item_type: str, key: str):
+        self.unmanaged.setdefault(item_type, []).append(key)
+
+    def has_failures(self) -> bool:
+        return any(self.failed.values())
+
+    def merge(self, other):
+        """Add counts, failures and unmanaged items of another report to this report"""
+        for item_type, actions in other.counts.items():
+            for action, count in actions.items():
+                self.add(item_type, action, count)
+        for item_type, keys in other.failed.items():
+            self.failed.setdefault(item_type, []).extend(keys)
+        for item_type, keys in other.unmanaged.items():
+            self.unmanaged.setdefault(item_type, []).extend(keys)
+        self.concurrency.update(other.concurrency)
+
+    def log_summary(self):
+        prefix = f"[{self.target}] " if self.target else ""
+        for item_type, actions in sorted(self.counts.items()):
+            logging.info(f"{prefix}{item_type}: " + ", ".join(f"{count} {action}"
+                                                               for action, count in sorted(actions.items())))
+        for item_type, keys in sorted(self.failed.items()):
+            logging.error(f"{prefix}{item_type}: {len(keys)} failed ({', '.join(keys)})")
+        for item_type, keys in sorted(self.unmanaged.items()):
+            logging.info(f"{prefix}{item_type}: {len(keys)} unmanaged")
+        for target, stats in sorted(self.concurrency.items()):
+            logging.info(f"{prefix}concurrency limit for '{target}': {stats['limit']} (min {stats['min_limit']}, "
+                         f"max {stats['max_limit']}), {stats['throttled']} of {stats['requests']} requests throttled")
+
+    def as_dict(self) -> dict:
+        return {'target': self.target, 'counts': self.counts, 'failed': self.failed, 'unmanaged': self.unmanaged,
+                'concurrency': self.concurrency}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        report = cls(data.get('target', ''))
+        report.counts = data.get('counts', {})
+        report.failed = data.get('failed', {})
+        report.unmanaged = data.get('unmanaged', {})
+        report.concurrency = data.get('concurrency', {})
+        return report
+
+    def write(self, report_file: str):
+        with open(report_file, 'w') as f:
+            json.dump(self.as_dict(), f, indent=4, sort_keys=True)
+
+        logging.info(f"Writing run report to '{report_file}'")
+
+    @classmethod
+    def read(cls, report_file: str):
+        with open(report_file) as f:
+            return cls.from_dict(json.load(f))
+
+
+def merge_report_files(report_files: list, output_file: str = "") -> RunReport:
+    """Merge the run reports of several (sharded) runs into one report
+    :param report_files: list of report files to merge
+    :param output_file: optional file to write the merged report to
+    :return: the merged report
+    """
+    merged = RunReport("merged")
+
+    for report_file in report_files:
+        logging.info(f"Reading run report '{report_file}'")
+        merged.merge(RunReport.read(report_file))
+
+    for item_type in merged.unmanaged:
+        merged.unmanaged[item_type] = sorted(set(merged.unmanaged[item_type]))
+
+    merged.log_summary()
+
+    if output_file:
+        merged.write(output_file)
+
+    return merged
@@ -0,0 +1,213 @@
+import logging
+
+from .access import ANY_REPOS, PERMISSION_SECTIONS
+from .patterns import literal_prefix, pattern_covers
+
+
+class MatrixPermission:
+    """A single section (repo, build) of a permission as row of the access matrix
+    The repositories are a bitset over all repos, the actions per principal a bitset over all actions
+    """
+    __slots__ = ['name', 'section', 'repos', 'include_patterns', 'exclude_patterns', 'grants']
+
+    def __init__(self, name: str, section: str, repos: int, permission_section: dict, grants: dict):
+        self.name = name
+        self.section = section
+        self.repos = repos
+        # Artifactory treats missing or empty include patterns as '**'
+        self.include_patterns = tuple(sorted({p for p in permission_section.get('include-patterns') or [] if p}
+                                             or {'**'}))
+        self.exclude_patterns = tuple(sorted({p for p in permission_section.get('exclude-patterns') or [] if p}))
+        self.grants = grants
+
+
+class AccessMatrix:
+    """
+    Compact principal x repository x action matrix of all permissions
+    Repositories and actions are bit positions, so checking if a set of grants covers another one is a couple of
+    integer operations. Only granted cells are stored: per (section, principal, action) the permissions granting
+    it, memory grows with the number of grants - not with principals x repos.
+    """
+
+    def __init__(self, local_config: dict):
+        permissions = local_config.get('permissions', {})
+        self.principals = {}
+        self.actions = {}
+        self.repos = {}
+        self.rows = []
+        # (section, principal, action bit) -> literal prefix of an include pattern -> indices of rows granting the
+        # action to the principal, a row can only be covered by rows with the literal prefix of one of their patterns
+        self.columns = {}
+
+        repo_types = {}
+        for repo_type in filter(None, ANY_REPOS.values()):
+            for key in local_config.get(repo_type, {}):
+                repo_types[key] = repo_type
+        for repo in sorted(set(repo_types) | {repo for permission in permissions.values()
+                                              for section in PERMISSION_SECTIONS if permission.get(section)
+                                              for repo in permission[section].get('repositories') or []}):
+            self.repos[repo] = 1 << len(self.repos)
+
+        # pseudo repositories cover their own bit (repos added later) and all matching repos
+        any_masks = {'ANY': sum(self.repos.values())}
+        for any_repo, repo_type in ANY_REPOS.items():
+            if repo_type:
+                any_masks[any_repo] = self.repos[any_repo] if any_repo in self.repos else 0
+                any_masks[any_repo] |= sum(bit for key, bit in self.repos.items() if repo_types.get(key) == repo_type)
+
+        for name, permission in sorted(permissions.items()):
+            for section in PERMISSION_SECTIONS:
+                if permission.get(section):
+                    self.add_row(permission.get('name', name), section, permission[section], any_masks)
+
+        # groups of users, a user is granted everything granted to one of its groups
+        self.memberships = {}
+        for name, user in local_config.get('users', {}).items():
+            if ('users', name) in self.principals:
+                self.memberships[self.principals[('users', name)]] = \
+                    [self.principals[('groups', group)] for group in user.get('groups') or []
+                     if ('groups', group) in self.principals]
+
+    def add_row(self, name: str, section: str, permission_section: dict, any_masks: dict):
+        repos = 0
+        for repo in permission_section.get('repositories') or []:
+            repos |= any_masks.get(repo, self.repos[repo])
+
+        grants = {}
+        actions = permission_section.get('actions') or {}
+        for principal_type in ['users', 'groups']:
+            for principal, principal_actions in (actions.get(principal_type) or {}).items():
+                principal_index = self.principals.setdefault((principal_type, principal), len(self.principals))
+                action_mask = 0
+                for action in principal_actions or []:
+                    action_mask |= 1 << self.actions.setdefault(action, len(self.actions))
+                if action_mask:
+                    grants[principal_index] = grants.get(principal_index, 0) | action_mask
+
+        if not repos or not grants:
+            return
+
+        index = len(self.rows)
+        row = MatrixPermission(name, section, repos, permission_section, grants)
+        self.rows.append(row)
+        prefixes = {literal_prefix(pattern) for pattern in row.include_patterns}
+        for principal_index, action_mask in grants.items():
+            for action_bit in _bits(action_mask):
+                column = self.columns.setdefault((section, principal_index, action_bit), {})
+                for prefix in prefixes:
+                    column.setdefault(prefix, []).append(index)
+
+    def candidates(self, section: str, principal_index: int, action_bit: int, prefix: tuple) -> list:
+        """Rows granting the action to the principal which might cover a pattern with the given literal prefix
+        (rows with an include pattern whose literal prefix starts the given one)"""
+        column = self.columns.get((section, principal_index, action_bit), {})
+        return list(dict.fromkeys(other for i in range(len(prefix) + 1) for other in column.get(prefix[:i], [])))
+
+
+def find_redundant_grants(matrix: AccessMatrix) -> dict:
+    """Find grants which are also granted by other permissions (to the principal itself or a group of a user)
+    for all repos and at least for all paths of the grant
+    A grant to a user may also be covered by a grant to one of its groups in the same permission. Of two
+    permissions granting exactly the same, the first by name is kept. Removing all redundant grants at once
+    doesn't change any access.
+    :return: dict of row index -> {principal index: (redundant action mask, names of the covering permissions)}
+    """
+    redundant = {}
+
+    for index, row in enumerate(matrix.rows):
+        # only rows covering the include pattern with the longest literal prefix can cover the whole row, the cache
+        # of path checks is per row so memory doesn't grow with the number of compared pairs
+        prefix = max((literal_prefix(pattern) for pattern in row.include_patterns), key=len)
+        covers_cache = {}
+        for principal_index, action_mask in row.grants.items():
+            sources = [principal_index] + matrix.memberships.get(principal_index, [])
+            redundant_mask = 0
+            covering = set()
+
+            for action_bit in _bits(action_mask):
+                candidates = [(other, source) for source in sources
+                              for other in matrix.candidates(row.section, source, action_bit, prefix)
+                              if (other != index or source != principal_index) and matrix.rows[other].repos & row.repos]
+                # cheap check on the bitsets first, the pattern containment is only checked if it might succeed
+                if _union(matrix, candidates) & row.repos != row.repos:
+                    continue
+
+                usable = [(other, source) for other, source in candidates
+                          if _can_cover(matrix, covers_cache, other, index, source == principal_index)]
+                if _union(matrix, usable) & row.repos == row.repos:
+                    redundant_mask |= 1 << action_bit
+                    covering.update(matrix.rows[other].name for other, _ in usable)
+
+            if redundant_mask:
+                redundant.setdefault(index, {})[principal_index] = (redundant_mask, sorted(covering))
+
+    return redundant
+
+
+def analyze_permissions(local_config: dict) -> tuple:
+    """Report permissions which are fully shadowed by others and redundant grants of other permissions
+    :param local_config: dict with all config objects
+    :return: tuple of messages for shadowed permissions and for redundant grants
+    """
+    matrix = AccessMatrix(local_config)
+    redundant = find_redundant_grants(matrix)
+    principal_names = {index: principal for principal, index in matrix.principals.items()}
+    action_names = {bit: action for action, bit in matrix.actions.items()}
+    shadowed_messages = []
+    redundant_messages = []
+
+    for index, grants in sorted(redundant.items()):
+        row = matrix.rows[index]
+        if all(grants.get(principal_index, (0,))[0] == action_mask
+               for principal_index, action_mask in row.grants.items()):
+            others = sorted({name for _, names in grants.values() for name in names})
+            shadowed_messages.append(f"Permission '{row.name}' ({row.section}) is fully shadowed by "
+                                     f"{', '.join(others)}")
+            continue
+
+        for principal_index, (action_mask, others) in sorted(grants.items()):
+            principal_type, principal = principal_names[principal_index]
+            actions = ', '.join(sorted(action_names[bit] for bit in _bits(action_mask)))
+            redundant_messages.append(f"Permission '{row.name}' ({row.section}) grants [{actions}] to "
+                                      f"{principal_type[:-1]} '{principal}' also granted by {', '.join(others)}")
+
+    logging.debug(f"Access matrix with {len(matrix.rows)} permissions, {len(matrix.principals)} principals, "
+                  f"{len(matrix.repos)} repos and {len(matrix.actions)} actions")
+    return shadowed_messages, redundant_messages
+
+
+def _can_cover(matrix: AccessMatrix, cache: dict, other: int, index: int, same_principal: bool) -> bool:
+    if (other, index) not in cache:
+        cache[(other, index)] = _paths_covered(matrix.rows[other], matrix.rows[index])
+    if not cache[(other, index)]:
+        return False
+    if not same_principal:
+        # grants of groups never rely on grants of users, so the tie break below isn't needed
+        return True
+
+    # of two permissions covering each other only the first by name covers the other one
+    if (index, other) not in cache:
+        cache[(index, other)] = _paths_covered(matrix.rows[index], matrix.rows[other])
+    return not cache[(index, other)] or (matrix.rows[other].name, other) < (matrix.rows[index].name, index)
+
+
+def _paths_covered(broad: MatrixPermission, narrow: MatrixPermission) -> bool:
+    # every included path of 'narrow' is included by 'broad' and 'broad' excludes only paths excluded by 'narrow'
+    return all(any(pattern_covers(b, n) for b in broad.include_patterns) for n in narrow.include_patterns) and \
+        all(any(pattern_covers(n, b) for n in narrow.exclude_patterns) for b in broad.exclude_patterns)
+
+
+def _union(matrix: AccessMatrix, candidates: list) -> int:
+    repos = 0
+    for other, _ in candidates:
+        repos |= matrix.rows[other].repos
+    return repos
+
+
+def _bits(mask: int):
+    bit = 0
+    while mask:
+        if mask & 1:
+            yield bit
+        mask >>= 1
+        bit += 1
@@ -0,0 +1,100 @@
+import hashlib
+import logging
+import math
+
+
+def parse_shard(shard: str) -> tuple:
+    """Parse a shard definition 'i/N' (i starting with 1) and return the zero based index and the shard count"""
+    try:
+        index, count = (int(x) for x in shard.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{shard}' - expected format 'i/N'")
+
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{shard}' - index has to be between 1 and {count}")
+
+    return index - 1, count
+
+
+def shard_of(config_type: str, key: str, count: int) -> int:
+    """Stable shard of a single object (independent of Python's hash randomization)"""
+    digest = hashlib.sha1(f"{config_type}:{key}".encode()).digest()
+    return int.from_bytes(digest[:8], 'big') % count
+
+
+def partition(config_objects: dict, count: int) -> dict:
+    """Assign all config objects to shards
+    Virtual repos are kept together with their member repos and permissions with their groups, as long as the
+    combined group doesn't get bigger than an even share of all objects
+    :return: dict of (config_type, key) -> shard index
+    """
+    nodes = [(config_type, key) for config_type, objects in config_objects.items() for key in objects]
+    parent = {node: node for node in nodes}
+    size = {node: 1 for node in nodes}
+    max_size = max(1, math.ceil(len(nodes) / count))
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for node, dependency in _dependencies(config_objects):
+        root, other = find(node), find(dependency)
+        if root == other or size[root] + size[other] > max_size:
+            continue
+        # the smaller node becomes the root, so the result doesn't depend on the order of the edges
+        root, other = min(root, other), max(root, other)
+        parent[other] = root
+        size[root] += size[other]
+
+    return {node: shard_of(*find(node), count) for node in nodes}
+
+
+def _dependencies(config_objects: dict):
+    repo_types = {key: config_type for config_type in ['localRepositories', 'remoteRepositories',
+                                                       'virtualRepositories']
+                  for key in config_objects.get(config_type, {})}
+
+    for key, repo in sorted(config_objects.get('virtualRepositories', {}).items()):
+        for member in repo.get('repositories') or []:
+            if member in repo_types:
+                yield ('virtualRepositories', key), (repo_types[member], member)
+
+    for key, permission in sorted(config_objects.get('permissions', {}).items()):
+        for section in ['repo', 'build']:
+            groups = ((permission.get(section) or {}).get('actions') or {}).get('groups') or {}
+            for group in groups:
+                if group in config_objects.get('groups', {}):
+                    yield ('permissions', key), ('groups', group)
+
+
+def shard_config(config_objects: dict, index: int, count: int) -> dict:
+    """Return the config objects belonging to a shard"""
+    assignment = partition(config_objects, count)
+    sharded = {config_type: {key: value for key, value in objects.items()
+                             if assignment[(config_type, key)] == index}
+               for config_type, objects in config_objects.items()}
+
+    logging.info(f"Shard {index + 1}/{count} contains {sum(len(objects) for objects in sharded.values())} of "
+                 f"{len(assignment)} config objects")
+    return sharded
+
+
+def shard_snapshot(snapshot: dict, config_objects: dict, sharded_objects: dict, index: int, count: int,
+                   object_types: list) -> dict:
+    """Restrict an indexed server configuration to the objects of a shard
+    Objects managed by other shards are removed, unmanaged objects are distributed by their own key, so every
+    unmanaged object is reported by exactly one shard
+    :param object_types: list of (item type, config type, snapshot type)
+    """
+    sharded_snapshot = dict(snapshot)
+
+    for _, config_type, snapshot_type in object_types:
+        managed = config_objects.get(config_type, {})
+        in_shard = sharded_objects.get(config_type, {})
+        sharded_snapshot[snapshot_type] = {key: item for key, item in snapshot[snapshot_type].items()
+                                           if key in in_shard or
+                                           (key not in managed and shard_of(config_type, key, count) == index)}
+
+    return sharded_snapshot
@@ -0,0 +1,118 @@
+import gzip
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+
+from pyartifactory.models import Group, PermissionV2, UserResponse, LocalRepositoryResponse, \
+    RemoteRepositoryResponse, VirtualRepositoryResponse
+
+from . import artifactory
+from .helper import PlanConfig
+from .model import SnapshotEntry
+
+SNAPSHOT_VERSION = 1
+# models returned by Artifactory for the full definition of an object
+RESPONSE_MODELS = {'users': UserResponse,
+                   'groups': Group,
+                   'permissions': PermissionV2,
+                   'localRepositories': LocalRepositoryResponse,
+                   'remoteRepositories': RemoteRepositoryResponse,
+                   'virtualRepositories': VirtualRepositoryResponse}
+
+
+class SnapshotSession:
+    """
+    Read only stand-in for artifactory.Session serving the server configuration from a snapshot file
+    Used to create plans without any network access
+    """
+
+    def __init__(self, config: PlanConfig):
+        data = read_snapshot(config.snapshot_file)
+        self.config = config
+        self.objects = data['objects']
+        self._snapshot = {snapshot_type: {name: SnapshotEntry(name, item_type, digest)
+                                          for name, item_type, digest in entries}
+                          for snapshot_type, entries in data['entries'].items()}
+
+        if not config.artifactory_url:
+            config.artifactory_url = data['artifactory_url']
+        logging.info(f"Using snapshot of '{data['artifactory_url']}' created {data['created']}")
+
+    def snapshot(self, refresh: bool = False) -> dict:
+        return {snapshot_type: dict(items) for snapshot_type, items in self._snapshot.items()}
+
+    def fetch_object(self, config_type: str, key: str):
+        return RESPONSE_MODELS[config_type](**self.objects[config_type][key])
+
+    def fetch_objects(self, keys: list, errors: dict = None) -> dict:
+        return {item: self.fetch_object(*item) for item in keys}
+
+    def fetch_repository_definitions(self) -> dict:
+        # definitions are built on demand by fetch_object
+        return {}
+
+
+def export_snapshot(session: artifactory.Session, snapshot_file: str):
+    """Write the server configuration with the full definitions of all objects into a snapshot file
+    Plans can be created against the snapshot without connecting to Artifactory (plan --snapshot)
+    :param session: the session connected to Artifactory
+    :param snapshot_file: path of the snapshot file (compressed if ending with '.gz')
+    """
+    logging.info("#####   Exporting server configuration   #####")
+    snapshot = session.snapshot()
+    config_types = {snapshot_type: config_type for _, config_type, snapshot_type in artifactory.OBJECT_TYPES}
+    objects = {config_type: {} for config_type in config_types.values()}
+
+    keys = [(config_types[snapshot_type], key) for snapshot_type, items in snapshot.items() for key in items]
+    errors = {}
+    for (config_type, key), model in session.fetch_objects(keys, errors).items():
+        objects[config_type][key] = _definition(model)
+
+    failed = [f"{config_type} '{key}'" for (config_type, key), error in errors.items()
+              if not isinstance(error, artifactory.NOT_FOUND_ERRORS)]
+    if failed:
+        logging.error(f"!!! Failed to fetch {', '.join(failed)} - snapshot not written !!!")
+        sys.exit(1)
+
+    # objects deleted since they were listed aren't part of the snapshot
+    snapshot_types = {config_type: snapshot_type for snapshot_type, config_type in config_types.items()}
+    for config_type, key in errors:
+        snapshot[snapshot_types[config_type]].pop(key)
+
+    write_snapshot({'version': SNAPSHOT_VERSION,
+                    'created': datetime.now(timezone.utc).isoformat(),
+                    'artifactory_url': session.config.artifactory_url,
+                    'entries': {snapshot_type: [[entry.name, entry.type, entry.digest] for entry in items.values()]
+                                for snapshot_type, items in snapshot.items()},
+                    'objects': objects}, snapshot_file)
+
+
+def _definition(model) -> dict:
+    # only the fields returned by Artifactory, so plans compare like against the live server (see is_up_to_date)
+    return json.loads(model.json(by_alias=True, exclude_unset=True))
+
+
+def write_snapshot(data: dict, snapshot_file: str):
+    content = json.dumps(data, separators=(',', ':'), sort_keys=True).encode()
+    opener = gzip.open if snapshot_file.endswith('.gz') else open
+
+    with opener(snapshot_file, 'wb') as f:
+        f.write(content)
+
+    logging.info(f"Writing snapshot with {sum(len(items) for items in data['objects'].values())} objects to "
+                 f"'{snapshot_file}'")
+
+
+def read_snapshot(snapshot_file: str) -> dict:
+    opener = gzip.open if snapshot_file.endswith('.gz') else open
+
+    logging.info(f"Reading snapshot from '{snapshot_file}'")
+    with opener(snapshot_file, 'rb') as f:
+        data = json.loads(f.read())
+
+    if data.get('version') != SNAPSHOT_VERSION:
+        logging.error(f"Unsupported snapshot version '{data.get('version')}' (expected {SNAPSHOT_VERSION})")
+        sys.exit(1)
+
+    return data
@@ -0,0 +1,64 @@
+import logging
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from pydantic import ValidationError
+
+from . import artifactory
+
+# Validating is CPU bound - large configurations are split in chunks validated in separate processes
+PARALLEL_THRESHOLD = 2000
+CHUNK_SIZE = 500
+
+
+def validate_configuration(config_objects: dict, max_workers: int = None) -> list:
+    """Build and validate the pyartifactory models of all config objects without connecting to Artifactory
+    :param config_objects: dict with all config objects
+    :param max_workers: max number of processes (default: number of cpus), only used for large configurations
+    :return: list of error messages for all invalid objects
+    """
+    chunks = [(config_type, items[i:i + CHUNK_SIZE])
+              for _, config_type, _ in artifactory.OBJECT_TYPES
+              for items in [list(config_objects.get(config_type, {}).items())]
+              for i in range(0, len(items), CHUNK_SIZE)]
+    count = sum(len(items) for _, items in chunks)
+
+    if count < PARALLEL_THRESHOLD:
+        results = [_validate_chunk(config_type, items) for config_type, items in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_validate_chunk, *zip(*chunks)))
+
+    errors = [error for result in results for error in result]
+    logging.info(f"Validated {count} config objects, {len(errors)} invalid")
+    return errors
+
+
+def check_configuration(config_objects: dict):
+    """Validate all config objects and exit if any of them is invalid, to be called before any changes are made"""
+    errors = validate_configuration(config_objects)
+
+    if errors:
+        for error in errors:
+            logging.error(error)
+        logging.error(f"!!! {len(errors)} invalid config objects - nothing deployed !!!")
+        sys.exit(1)
+
+
+def _validate_chunk(config_type: str, items: list) -> list:
+    item_types = {config_type: item_type for item_type, config_type, _ in artifactory.OBJECT_TYPES}
+    errors = []
+
+    for key, value in items:
+        try:
+            artifactory.build_model(config_type, key, value)
+        except ValidationError as e:
+            for error in e.errors():
+                errors.append(f"{item_types[config_type].capitalize()} '{key}': "
+                              f"{'.'.join(map(str, error['loc']))} - {error['msg']}")
+        except KeyError as e:
+            errors.append(f"{item_types[config_type].capitalize()} '{key}': {e.args[0]} - field required")
+        except (TypeError, ValueError) as e:
+            errors.append(f"{item_types[config_type].capitalize()} '{key}': {e}")
+
+    return errors
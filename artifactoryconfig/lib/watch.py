@@ -0,0 +1,154 @@
+import copy
+import logging
+import os
+import time
+
+from . import artifactory
+from . import configreader
+from . import namespaces
+from . import validation
+from .helper import WatchConfig
+
+
+def watch_configuration(config: WatchConfig):
+    """Deploy the configuration and keep watching the config folders, changed objects are deployed again
+    Parsed config files and the server configuration are kept in memory, so only modified files are parsed
+    and only changed objects are applied
+    :param config: the config class holding config settings
+    """
+    cache = configreader.ConfigCache()
+    local_config = read_configuration(config, cache)
+    cache.pop_parsed_files()
+    validation.check_configuration(local_config)
+
+    session = artifactory.Session(config)
+    run_report = session.apply(copy.deepcopy(local_config))
+    # objects which failed are treated as not applied yet, so they are applied again with the next change
+    local_config = keep_failed_objects({}, local_config, run_report)
+
+    file_states = scan_files(config)
+    logging.info(f"Watching {len(file_states)} files for changes")
+
+    while True:
+        file_states = wait_for_changes(config, file_states)
+        try:
+            local_config = apply_changes(session, cache, local_config)
+        except Exception as e:
+            # keep the last applied config and the watcher running, the changes are applied with the next change
+            logging.error(f"!!! Failed to apply changes: {e} !!!")
+            logging.debug("Failure applying changes", exc_info=True)
+            session.reset_snapshot()
+
+
+def apply_changes(session: artifactory.Session, cache: configreader.ConfigCache, local_config: dict) -> dict:
+    """Read the modified config files and apply the changed config objects
+    :return: the applied config, the last applied config if the changed objects are invalid. Objects which failed
+    to apply keep their last applied state, so they are applied again with the next change.
+    """
+    new_config = read_configuration(session.config, cache)
+    logging.info(f"Parsed {len(cache.pop_parsed_files())} modified files")
+
+    changed_objects = diff_config_objects(local_config, new_config)
+    count = sum(len(objects) for objects in changed_objects.values())
+    errors = validation.validate_configuration(changed_objects)
+
+    if errors:
+        # keep the last applied config, so the changes are applied once the config is fixed
+        for error in errors:
+            logging.error(error)
+        logging.error(f"!!! {len(errors)} invalid config objects - changes not applied !!!")
+        return local_config
+    elif count:
+        logging.info(f"Applying {count} changed objects")
+        run_report = session.apply(copy.deepcopy(changed_objects), log_unmanaged=False)
+        return keep_failed_objects(local_config, new_config, run_report)
+    else:
+        logging.info("No config objects changed")
+
+    return new_config
+
+
+def keep_failed_objects(old_config: dict, new_config: dict, run_report) -> dict:
+    """Replace the objects which failed to apply with their state in old_config (remove them if they are new)
+    :param run_report: the report of the apply, failed objects are listed per item type
+    :return: new_config with the failed objects reverted
+    """
+    item_types = {item_type: config_type for item_type, config_type, _ in artifactory.OBJECT_TYPES}
+    config = dict(new_config)
+
+    for item_type, keys in run_report.failed.items():
+        if item_type not in item_types:
+            continue
+        config_type = item_types[item_type]
+        objects = config[config_type] = dict(config.get(config_type, {}))
+        for key in keys:
+            if key in old_config.get(config_type, {}):
+                objects[key] = old_config[config_type][key]
+            else:
+                objects.pop(key, None)
+
+    return config
+
+
+def read_configuration(config: WatchConfig, cache: configreader.ConfigCache) -> dict:
+    """Read the config files and add the objects generated from the namespaces file (like 'deploy')"""
+    return namespaces.add_namespace_objects(configreader.read_configuration(config, cache), config)
+
+
+def scan_files(config: WatchConfig) -> dict:
+    """Return modification time and size of all files in the config folders, of the vault files and of the
+    namespaces file"""
+    file_states = {}
+
+    for folder in config.config_folder:
+        for root, dirs, files in os.walk(folder):
+            for f_name in files:
+                path = os.path.join(root, f_name)
+                file_states[path] = configreader.file_state(path)
+
+    watched_files = list(config.vault_file_list or [])
+    if config.namespaces_file:
+        watched_files.append(config.namespaces_file)
+    for f_name in watched_files:
+        file_states[f_name] = configreader.file_state(f_name)
+
+    return file_states
+
+
+def wait_for_changes(config: WatchConfig, file_states: dict) -> dict:
+    """Poll config folders until changes are detected and no further changes happen within the debounce time
+    Multiple changes (i.e. a git checkout) are coalesced this way into one re-apply
+    :return: the new file states
+    """
+    while True:
+        time.sleep(config.watch_interval)
+        new_states = scan_files(config)
+        if new_states != file_states:
+            break
+
+    logging.info("Changes in config folders detected")
+
+    while True:
+        time.sleep(config.watch_debounce)
+        file_states, new_states = new_states, scan_files(config)
+        if new_states == file_states:
+            return new_states
+
+
+def diff_config_objects(old_config: dict, new_config: dict) -> dict:
+    """Return config objects which have been added or modified in new_config
+    Removed objects are only logged as they are not deleted from Artifactory
+    :return: dict with the same structure as the config objects holding only changed objects
+    """
+    changed_objects = {}
+
+    for config_type in new_config.keys() | old_config.keys():
+        old_objects = old_config.get(config_type, {})
+        new_objects = new_config.get(config_type, {})
+        changed_objects[config_type] = {key: value for key, value in new_objects.items()
+                                        if old_objects.get(key) != value}
+
+        for key in old_objects.keys() - new_objects.keys():
+            logging.info(f"Object '{key}' of type '{config_type}' removed from config - not removed from Artifactory")
+
+    return changed_objects
@@ -3,9 +3,20 @@ import logging
 
 import lib.helper as helper
 import lib.artifactory as artifactory
-import lib.configreader as configreader
+import lib.audit as audit
+import lib.bundle as bundle
+import lib.drift as drift
 import lib.namespaces as namespaces
 import lib.linting as linting
+import lib.access as access
+import lib.watch as watch
+import lib.plan as plan
+import lib.profiling as profiling
+import lib.provisioning as provisioning
+import lib.report as report
+import lib.sharding as sharding
+import lib.snapshot as snapshot
+import lib.validation as validation
 
 __author__ = "Klaus Wening"
 __copyright__ = "Klaus Wening"
@@ -19,21 +30,99 @@ def main(args):
     """Wrapper allowing :func:`command` to be called with string arguments in a CLI fashion
     """
     config = helper.parse_args(args)
+    profiling.setup_profiling(config.profile, config.profile_dir)
 
+    try:
+        run_command(config)
+    finally:
+        profiling.finish_profiling()
+
+
+def run_command(config):
     if config.command == 'deploy':
         logging.info("Deploying configuration to an Artifactory server")
-        local_config: dict = configreader.read_configuration(config)
-        artifactory.init_connection(config.artifactory_url, config.artifactory_user, config.artifactory_token)
-        artifactory.apply_configuration(local_config, config)
+        local_config: dict = namespaces.add_namespace_objects(bundle.load_configuration(config), config)
+        validation.check_configuration(local_config)
+        if config.targets:
+            run_report = artifactory.apply_to_targets(local_config, config)
+        else:
+            run_report = artifactory.Session(config).apply(local_config)
+            run_report.log_summary()
+
+        if config.report_file:
+            run_report.write(config.report_file)
+        if config.targets and run_report.has_failures():
+            sys.exit(1)
+    elif config.command == 'watch':
+        logging.info("Watching configuration for changes to deploy to an Artifactory server")
+        watch.watch_configuration(config)
+    elif config.command == 'plan':
+        logging.info("Creating plan to deploy configuration to an Artifactory server")
+        local_config: dict = namespaces.add_namespace_objects(bundle.load_configuration(config), config)
+        validation.check_configuration(local_config)
+        if config.shard:
+            local_config = sharding.shard_config(local_config, *config.get_shard())
+        session = snapshot.SnapshotSession(config) if config.snapshot_file else artifactory.Session(config)
+        plan.write_plan(plan.create_plan(local_config, session), config.plan_file)
+    elif config.command == 'apply':
+        logging.info("Applying plan to an Artifactory server")
+        run_report = plan.apply_plan(artifactory.Session(config))
+        run_report.log_summary()
+        if run_report.has_failures():
+            sys.exit(1)
+    elif config.command == 'audit':
+        logging.info("Auditing unmanaged objects in an Artifactory server")
+        local_config: dict = namespaces.add_namespace_objects(bundle.load_configuration(config, resolve_secrets=False),
+                                                              config)
+        run_report = audit.audit_configuration(local_config, artifactory.Session(config))
+        run_report.log_summary()
+        run_report.write(config.report_file)
+        if run_report.has_failures():
+            sys.exit(1)
+    elif config.command == 'drift':
+        logging.info("Checking configuration of an Artifactory server for drift")
+        local_config: dict = namespaces.add_namespace_objects(bundle.load_configuration(config), config)
+        validation.check_configuration(local_config)
+        summary = drift.detect_drift(local_config, artifactory.Session(config))
+        if config.output_file:
+            drift.write_summary(summary, config.output_file)
+        if config.metrics_file:
+            drift.write_metrics(summary, config.metrics_file)
+        if summary['failed']:
+            sys.exit(1)
+        if summary['drift']:
+            sys.exit(drift.DRIFT_EXIT_CODE)
+    elif config.command == 'provision':
+        logging.info("Provisioning users to an Artifactory server")
+        run_report = provisioning.provision_users(artifactory.Session(config))
+        run_report.log_summary()
+        if config.report_file:
+            run_report.write(config.report_file)
+        if run_report.has_failures():
+            sys.exit(1)
+    elif config.command == 'snapshot':
+        logging.info("Exporting configuration of an Artifactory server")
+        snapshot.export_snapshot(artifactory.Session(config), config.snapshot_file)
     elif config.command == 'namespaces':
         logging.info("Creating namespace configurations")
-        local_config: dict = configreader.read_configuration(config)
+        local_config: dict = bundle.load_configuration(config, resolve_secrets=False)
         namespaces.process_namespaces(config, local_config)
     elif config.command == 'lint':
         logging.info("Linting artifactory config")
-        local_config: dict = configreader.read_configuration(config)
+        local_config: dict = namespaces.add_namespace_objects(bundle.load_configuration(config, resolve_secrets=False),
+                                                              config)
         logging.debug(local_config)
         linting.lint_config(local_config, config)
+    elif config.command == 'access':
+        logging.info("Querying effective access")
+        local_config: dict = bundle.load_configuration(config, resolve_secrets=False)
+        access.query_access(config, local_config)
+    elif config.command == 'compile':
+        logging.info("Compiling configuration into a bundle")
+        bundle.compile_configuration(config)
+    elif config.command == 'merge-reports':
+        logging.info("Merging run reports")
+        report.merge_report_files(config.report_files, config.report_file)
 
 
 def run():
@@ -0,0 +1,71 @@
+import artifactoryconfig.lib.helper as helper
+import artifactoryconfig.lib.access as access
+
+
+def __get_config():
+    return {
+        'localRepositories': {'libs-release': {}},
+        'permissions': {
+            'team-a': {
+                'name': 'team-a',
+                'repo': {'include-patterns': ['com/acme/a/**'],
+                         'exclude-patterns': ['com/acme/a/secret/**'],
+                         'repositories': ['libs-release'],
+                         'actions': {'users': {'alice': ['read']}, 'groups': {'team-a': ['read', 'write']}}}
+            },
+            'readers': {
+                'name': 'readers',
+                'repo': {'include-patterns': [],
+                         'exclude-patterns': [''],
+                         'repositories': ['ANY LOCAL'],
+                         'actions': {'groups': {'readers': ['read']}}}
+            }
+        }
+    }
+
+
+def test_query_access():
+    access_index = access.build_index(__get_config())
+
+    result = access_index.query('libs-release', 'com/acme/a/lib/1.0/lib.jar')
+    assert result['groups'] == {'team-a': {'read', 'write'}, 'readers': {'read'}}
+    assert result['users'] == {'alice': {'read'}}
+
+    result = access_index.query('libs-release', 'com/acme/a/secret/key.txt')
+    assert result['groups'] == {'readers': {'read'}}
+
+    assert access_index.query('unknown-remote', 'com/acme/a/lib.jar') == {'users': {}, 'groups': {}}
+
+
+def test_grants_for_principal():
+    access_index = access.build_index(__get_config())
+
+    grants = access_index.grants_for('groups', 'team-a')
+
+    assert [(g.permission, g.repo, g.include_patterns, g.exclude_patterns) for g in grants] == \
+           [('team-a', 'libs-release', ['com/acme/a/**'], ['com/acme/a/secret/**'])]
+    assert access.split_path('/libs-release/com/acme/lib.jar') == ('libs-release', 'com/acme/lib.jar')
+
+
+def test_index_with_namespaces(tmp_path):
+    (tmp_path / "namespaces.yaml").write_text(
+        "namespaces:\n"
+        "  - name: team-a\n    groups: [team-a:rw]\n    publicPattern: com/acme/a/**\n")
+    (tmp_path / "config.yaml").write_text("repos:\n  internal: [libs-release]\n  thirdparty: [thirdparty-release]\n")
+    config = helper.AccessConfig({'namespaces_file': str(tmp_path / "namespaces.yaml")})
+    config.from_yaml(str(tmp_path / "config.yaml"))
+    local_config = __get_config()
+    local_config['permissions']['global-public'] = {'name': 'global-public',
+                                                    'repo': {'include-patterns': ['org/**'],
+                                                             'repositories': ['libs-release'],
+                                                             'actions': {'groups': {'everyone': ['read']}}}}
+
+    access_index = access.build_index(local_config, config)
+
+    # the namespace has no thirdparty patterns, so there is no thirdparty permission target granting '**'
+    assert [access.format_grant(grant) for grant in access_index.grants_for('groups', 'team-a')] == \
+           ["ns-team-a (repo) libs-release: com/acme/a/** [read, write]",
+            "team-a (repo) libs-release: com/acme/a/** excluding com/acme/a/secret/** [read, write]"]
+    assert access_index.query('thirdparty-release', 'com/acme/a/lib.jar')['groups'] == {}
+    # permissions of config files take precedence over generated ones
+    assert [grant.include_patterns for grant in access_index.grants_for('groups', 'everyone')] == [['org/**']]
@@ -1,21 +1,28 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from pyartifactory.exception import UserNotFoundException
 
 import artifactoryconfig.lib.artifactory as artifactory
 import artifactoryconfig.lib.helper as helper
+from artifactoryconfig.lib.model import SnapshotEntry
+from artifactoryconfig.lib.patterns import IgnoreMatcher
+from artifactoryconfig.lib.report import RunReport
 
 
 def test_log_unmanaged_items(caplog):
-    artifactory.app_config = helper.DeployConfig()
-    artifactory.app_config.unmanaged_ignores = ["abcd", "exclude.*"]
     caplog.set_level(logging.INFO)
     items = ["test", "abcd", "valid", "exclude1", "exclude2"]
+    run_report = RunReport()
 
-    artifactory.__log_unmanaged_items("testitem", items)
+    artifactory.__log_unmanaged_items("testitem", items, IgnoreMatcher(["abcd", "exclude.*"]), run_report)
 
     assert "testitem" in caplog.text
     assert "valid" in caplog.text
     assert "abcd" not in caplog.text
     assert "exclude1" not in caplog.text
+    assert run_report.unmanaged == {'testitem': ["test", "valid"]}
 
 
 def test_check_group_config(caplog):
@@ -33,6 +40,64 @@ def test_check_group_config(caplog):
     assert "Group 'My-Group-With-Uppercase' has uppercase characters" in caplog.text
 
 
+def test_session_concurrent_applies(monkeypatch):
+    current_config = {'users': [SnapshotEntry("existing")], 'groups': [], 'permissions': [],
+                      'localRepos': [], 'remoteRepos': [], 'virtualRepos': []}
+    fetches = []
+    monkeypatch.setattr(artifactory, "get_configuration", lambda art: fetches.append(art) or current_config)
+    session = artifactory.Session(helper.DeployConfig({'artifactory_url': "http://localhost", 'unmanaged_ignores': []}))
+    session.art = mock.MagicMock()
+    empty = {config_type: {} for _, config_type, _ in artifactory.OBJECT_TYPES}
+
+    def apply_user(name):
+        user = {'name': name, 'email': f"{name}@example.com"}
+        return session.apply({**empty, 'users': {name: user, "existing": user}}, log_unmanaged=False)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        reports = list(executor.map(apply_user, [f"user{i}" for i in range(8)]))
+
+    assert len(fetches) == 1
+    assert all(run_report.counts == {'user': {'created': 1, 'updated': 1}} for run_report in reports)
+    assert len(session.snapshot()['users']) == 9
+
+
+def test_get_configuration_from_list_endpoints():
+    responses = {"http://localhost/artifactory/api/security/users": [{"name": "alice", "uri": "u"}],
+                 "http://localhost/artifactory/api/security/groups": [{"name": "devs", "uri": "g"}],
+                 "http://localhost/artifactory/api/v2/security/permissions": [],
+                 "http://localhost/artifactory/api/repositories": [{"key": "libs", "type": "LOCAL"},
+                                                                   {"key": "all", "type": "VIRTUAL"}]}
+    http = mock.MagicMock()
+    http.get.side_effect = lambda url, auth: mock.MagicMock(json=lambda: responses[url])
+    api = artifactory.ApiClient("http://localhost/artifactory/", "admin", "token", http)
+
+    current_config = artifactory.get_configuration(api)
+
+    assert [user.name for user in current_config['users']] == ["alice"]
+    assert [repo.key for repo in current_config['virtualRepos']] == ["all"]
+    assert all(call.kwargs['auth'] == ("admin", "token") for call in http.get.call_args_list)
+
+
+def test_fetch_objects_collects_errors():
+    session = artifactory.Session(helper.DeployConfig({'artifactory_url': "http://localhost", 'unmanaged_ignores': [],
+                                                       'max_requests': 2}))
+    session.art = mock.MagicMock()
+
+    def get_user(name):
+        # deleted after the users were listed
+        if name == "gone":
+            raise UserNotFoundException(f"{name} does not exist")
+        return name
+
+    session.art.users.get.side_effect = get_user
+    errors = {}
+
+    fetched = session.fetch_objects([('users', "alice"), ('users', "gone")], errors)
+
+    assert fetched == {('users', "alice"): "alice"}
+    assert isinstance(errors[('users', "gone")], artifactory.NOT_FOUND_ERRORS)
+
+
 class Group:
     def __init__(self, name):
         self.name = name
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+from pyartifactory.models import UserResponse
+
+import artifactoryconfig.lib.helper as helper
+from artifactoryconfig.lib import artifactory, asyncclient
+
+httpx = pytest.importorskip("httpx")
+
+
+def test_execute_operations():
+    requests = []
+
+    def handler(request):
+        requests.append((request.method, request.url.path, json.loads(request.content)))
+        return httpx.Response(404 if request.url.path.endswith('/broken') else 200)
+
+    config = helper.ApplyConfig({'artifactory_url': 'https://art.example.com/artifactory', 'max_requests': 2})
+    operations = [('localRepositories', 'create',
+                   artifactory.build_model('localRepositories', 'libs-local',
+                                           {'type': 'maven', 'repoLayout': 'maven-2-default'})),
+                  ('users', 'create', artifactory.build_model('users', 'jdoe', {'name': 'jdoe',
+                                                                                'email': 'jdoe@example.com'},
+                                                              exists=False)),
+                  ('groups', 'create', artifactory.build_model('groups', 'devs', {'name': 'devs'})),
+                  ('groups', 'update', artifactory.build_model('groups', 'broken', {'name': 'broken'}))]
+
+    results = asyncclient.execute_operations(config, operations, transport=httpx.MockTransport(handler))
+
+    assert results[:3] == [None, None, None]
+    assert isinstance(results[3], httpx.HTTPStatusError)
+    assert requests[0][:2] == ('PUT', '/artifactory/api/repositories/libs-local')
+    assert requests[0][2]['packageType'] == 'maven'
+    assert requests[1][2]['password'] == operations[1][2].password.get_secret_value()
+    assert sorted(request[:2] for request in requests[2:]) == [('POST', '/artifactory/api/security/groups/broken'),
+                                                               ('POST', '/artifactory/api/security/groups/devs'),
+                                                               ('PUT', '/artifactory/api/security/groups/devs')]
+
+
+def test_fetch_objects_skips_failed_requests():
+    def handler(request):
+        if request.url.path.endswith('/deleted'):
+            return httpx.Response(404)
+        return httpx.Response(200, json={'name': request.url.path.rsplit('/', 1)[-1]})
+
+    config = helper.PlanConfig({'artifactory_url': 'https://art.example.com/artifactory', 'max_requests': 2})
+
+    fetched = asyncclient.fetch_objects(config, [('groups', 'devs'), ('groups', 'deleted')],
+                                        transport=httpx.MockTransport(handler))
+
+    assert list(fetched) == [('groups', 'devs')]
+    assert fetched[('groups', 'devs')].name == 'devs'
+
+
+def test_user_update_payload():
+    user = UserResponse(name='jdoe', email='jdoe@example.com', realm='ldap', lastLoggedIn='2024-01-01T10:00:00Z')
+
+    # like pyartifactory's update, read only fields aren't sent
+    assert asyncclient.AsyncArtifactory._payload('users', user, exclude_unset=True, update=True) == \
+        {'name': 'jdoe', 'email': 'jdoe@example.com', 'admin': False, 'profileUpdatable': True,
+         'disableUIAccess': False, 'internalPasswordDisabled': False, 'groups': None, 'offlineMode': False}
+    assert 'realm' in asyncclient.AsyncArtifactory._payload('users', user, exclude_unset=False)
@@ -0,0 +1,72 @@
+from unittest import mock
+
+import requests
+
+import artifactoryconfig.lib.audit as audit
+import artifactoryconfig.lib.helper as helper
+from artifactoryconfig.lib.model import SnapshotEntry
+from artifactoryconfig.lib.patterns import IgnoreMatcher
+from artifactoryconfig.lib.report import RunReport
+
+
+def _snapshot(**names):
+    snapshot = {'users': {}, 'groups': {}, 'permissions': {}, 'localRepos': {}, 'remoteRepos': {}, 'virtualRepos': {}}
+    for snapshot_type, keys in names.items():
+        snapshot[snapshot_type] = {key: SnapshotEntry(key) for key in keys}
+    return snapshot
+
+
+def test_find_unmanaged():
+    config_objects = {'users': {'alice': {}}, 'groups': {}, 'permissions': {}, 'localRepositories': {'libs': {}},
+                      'remoteRepositories': {}, 'virtualRepositories': {}}
+    snapshot = _snapshot(users=['alice', 'bob', 'admin', 'anonymous'], localRepos=['libs', 'old-libs'])
+
+    unmanaged = audit.find_unmanaged(config_objects, snapshot, IgnoreMatcher(['admin', 'anon.*']))
+
+    assert unmanaged['users'] == ['bob']
+    assert unmanaged['localRepositories'] == ['old-libs']
+    # without patterns nothing is ignored (the combined regex used to be '()', matching every name)
+    assert audit.find_unmanaged(config_objects, snapshot, IgnoreMatcher([]))['users'] == ['admin', 'anonymous', 'bob']
+
+
+def test_prune_objects():
+    session = mock.MagicMock()
+    session.config = helper.AuditConfig({'artifactory_url': "http://localhost", 'artifactory_user': "deployer",
+                                         'max_requests': 4})
+    unmanaged = {'users': ['bob', 'deployer'], 'groups': ['old'], 'permissions': ['old-perm'],
+                 'localRepositories': [], 'remoteRepositories': [], 'virtualRepositories': ['old-virtual']}
+
+    results = {'old': False, 'bob': requests.exceptions.ConnectionError("connection reset")}
+
+    def delete_object(config_type, key):
+        if isinstance(results.get(key), Exception):
+            raise results[key]
+        return results.get(key, True)
+
+    session.delete_object.side_effect = delete_object
+
+    dry_run_report = RunReport()
+    audit.prune_objects(session, unmanaged, dry_run_report, dry_run=True)
+    run_report = RunReport()
+    audit.prune_objects(session, unmanaged, run_report, dry_run=False)
+
+    assert dry_run_report.counts['user'] == {'deleted (dry run)': 1}
+    assert [call.args for call in session.delete_object.call_args_list] == [
+        ('permissions', 'old-perm'), ('virtualRepositories', 'old-virtual'), ('groups', 'old'), ('users', 'bob')]
+    assert run_report.counts == {'permission': {'deleted': 1}, 'virtual repo': {'deleted': 1},
+                                 'group': {'already deleted': 1}}
+    assert run_report.failed == {'user': ['bob']}
+
+
+def test_check_prune_guards():
+    config_objects = {'users': {'alice': {}}, 'groups': {}, 'permissions': {'perm': {}}, 'localRepositories': {},
+                      'remoteRepositories': {}, 'virtualRepositories': {}}
+    unmanaged = {'users': ['bob', 'carol'], 'groups': ['devs'], 'permissions': ['old-perm'], 'localRepositories': [],
+                 'remoteRepositories': [], 'virtualRepositories': []}
+
+    # no groups configured - i.e. a wrong config folder, groups are not pruned
+    assert audit.check_prune_guards(config_objects, unmanaged, 3) == {
+        'users': ['bob', 'carol'], 'permissions': ['old-perm'], 'localRepositories': [], 'remoteRepositories': [],
+        'virtualRepositories': []}
+    assert audit.check_prune_guards(config_objects, unmanaged, 2) == {}
+    assert audit.check_prune_guards(config_objects, unmanaged, 0)['users'] == ['bob', 'carol']
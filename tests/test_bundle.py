@@ -0,0 +1,68 @@
+import pytest
+from jinja2 import UndefinedError
+
+from artifactoryconfig.lib import bundle, configreader
+
+
+def test_bundle_roundtrip(tmp_path):
+    bundle_file = str(tmp_path / "config.bundle")
+    config_objects = {'users': {'jdoe': {'name': 'jdoe', 'email': 'jdoe@example.com'}},
+                      'remoteRepositories': {'npm-remote': {'type': 'npm', 'username': 'npm-__vault__npm.user__',
+                                                            'password': '__vault__npm_password__',
+                                                            'maxUniqueSnapshots': '__vault__snapshots__'}}}
+    secret_paths = bundle.find_secret_paths(config_objects)
+
+    digest = bundle.write_bundle(config_objects, secret_paths, bundle_file)
+    loaded, loaded_paths, loaded_digest = bundle.read_bundle(bundle_file)
+
+    assert loaded == config_objects
+    assert loaded_digest == digest
+    assert sorted(loaded_paths) == [['remoteRepositories', 'npm-remote', 'maxUniqueSnapshots'],
+                                    ['remoteRepositories', 'npm-remote', 'password'],
+                                    ['remoteRepositories', 'npm-remote', 'username']]
+
+    bundle.resolve_secret_refs(loaded, loaded_paths, {'npm': {'user': 'reader'}, 'npm_password': 1234,
+                                                      'snapshots': 5})
+    assert loaded['remoteRepositories']['npm-remote'] == {'type': 'npm', 'username': 'npm-reader',
+                                                          'password': 1234, 'maxUniqueSnapshots': 5}
+
+    with open(bundle_file, 'r+b') as f:
+        f.seek(bundle.HEADER.size - 1)
+        last = f.read(1)
+        f.seek(bundle.HEADER.size - 1)
+        f.write(bytes([last[0] ^ 0xff]))
+    with pytest.raises(SystemExit):
+        bundle.read_bundle(bundle_file)
+
+
+def test_truncated_bundle(tmp_path):
+    bundle_file = str(tmp_path / "config.bundle")
+    bundle.write_bundle({'users': {'jdoe': {'name': 'jdoe'}}}, [], bundle_file)
+    with open(bundle_file, 'rb') as f:
+        content = f.read()
+
+    for truncated in (b"", content[:bundle.HEADER.size - 1], content[:-4]):
+        with open(bundle_file, 'wb') as f:
+            f.write(truncated)
+        with pytest.raises(SystemExit):
+            bundle.read_bundle(bundle_file)
+
+
+def test_secrets_used_in_template_logic(tmp_path):
+    secret_refs = bundle._secret_refs({'token': 'x', 'npm': {'user': 'reader', 'enabled': True}, 'port': 8081})
+    config_file = tmp_path / "config.yaml"
+
+    config_file.write_text("users:\n  npm:\n    password: '{{ token }}'\n    name: npm-{{ npm.user }}\n"
+                           "    url: 'localhost:{{ port }}'\n")
+    assert configreader.read_yaml_file(str(config_file), secret_refs) == \
+        {'users': {'npm': {'password': '__vault__token__', 'name': 'npm-__vault__npm.user__',
+                           'url': 'localhost:__vault__port__'}}}
+    rendered = list(configreader.stream_yaml_objects(str(config_file), secret_refs))
+    assert rendered == [('users', 'npm', {'password': '__vault__token__', 'name': 'npm-__vault__npm.user__',
+                                          'url': 'localhost:__vault__port__'})]
+
+    for logic, secret in (("{% if npm.enabled %}x{% endif %}", 'npm.enabled'), ("{{ token | upper }}", 'token'),
+                          ("{{ port | int + 1 }}", 'port'), ("{{ 'localhost:' ~ port }}", 'port')):
+        config_file.write_text(f"users:\n  npm:\n    name: '{logic}'\n")
+        with pytest.raises(UndefinedError, match=f"Secret '{secret}' is used in template logic"):
+            configreader.read_yaml_file(str(config_file), secret_refs)
@@ -13,3 +13,48 @@ def test_read_vault_files(caplog):
 
     assert secrets['plain_chars'] == 'abcd1234'
     assert secrets['special_chars'] == 'abc-12\\3!e?".\''
+
+
+def test_config_cache(tmp_path):
+    config_file = tmp_path / "users.yaml"
+    config_file.write_text("users:\n  alice:\n    name: alice\n")
+    cache = configreader.ConfigCache()
+
+    data = cache.get(str(config_file), configreader.read_yaml_file, {})
+    assert data == {'users': {'alice': {'name': 'alice'}}}
+    assert cache.get(str(config_file), configreader.read_yaml_file, {}) is data
+    assert cache.pop_parsed_files() == [str(config_file)]
+
+    config_file.write_text("users:\n  bob:\n    name: bob\n")
+    assert cache.get(str(config_file), configreader.read_yaml_file, {}) == {'users': {'bob': {'name': 'bob'}}}
+
+
+def test_stream_yaml_objects_like_read_yaml_file(tmp_path, monkeypatch):
+    config_file = tmp_path / "users.yaml"
+    config_file.write_text('{% set realm = "ldap" %}\n'
+                           'defaults: &defaults\n  admin: false\n'
+                           'users:\n'
+                           '  alice:\n    name: alice\n    email: {{ user }}@acme.com\n    password: "{{ secret }}"\n'
+                           '    realm: {{ realm }}\n    <<: *defaults\n'
+                           '{% for i in range(2) %}\n  user-{{ i }}:\n    name: user-{{ i }}\n{% endfor %}\n'
+                           '  bob: {name: bob, email: {{\n    user | upper }}}\n'
+                           '  alice:\n    name: alice\n'
+                           'groups:\n')
+    secrets = {'user': "x", 'secret': "s3cr:et"}
+
+    streamed = list(configreader.stream_yaml_objects(str(config_file), secrets))
+    expected = configreader.read_yaml_file(str(config_file), secrets)
+    assert [(config_type, key) for config_type, key, _ in streamed] == \
+           [('defaults', 'admin'), ('users', 'alice'), ('users', 'user-0'), ('users', 'user-1'), ('users', 'bob'),
+            ('users', 'alice')]
+
+    # streamed objects are merged one at a time: files read before take precedence, the last definition in a file wins
+    monkeypatch.setattr(configreader, "STREAMING_THRESHOLD", 0)
+    config = helper.DeployConfig({'config_folder': str(tmp_path)})
+    config_objects = {'users': {'user-0': {'name': "user-0", 'email': "first@acme.com"}}}
+    config_objects = configreader.read_yaml_configs(str(tmp_path), config, config_objects, secrets)
+
+    assert config_objects['users']['alice'] == expected['users']['alice'] == {'name': "alice"}
+    assert config_objects['users']['bob'] == expected['users']['bob'] == {'name': "bob", 'email': "X"}
+    assert config_objects['users']['user-0'] == {'name': "user-0", 'email': "first@acme.com"}
+    assert config_objects['users']['user-1'] == expected['users']['user-1']
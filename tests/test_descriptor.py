@@ -0,0 +1,54 @@
+import io
+
+from artifactoryconfig.lib import descriptor
+
+DESCRIPTOR = b"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<config xmlns="http://artifactory.jfrog.org/xsd/3.1.x">
+    <localRepositories>
+        <localRepository>
+            <key>libs-local</key>
+            <type>maven</type>
+            <excludesPattern/>
+            <repoLayoutRef>maven-2-default</repoLayoutRef>
+            <maxUniqueSnapshots>5</maxUniqueSnapshots>
+            <localRepoChecksumPolicyType>server-generated-checksums</localRepoChecksumPolicyType>
+            <propertySets><propertySetRef>artifactory</propertySetRef></propertySets>
+            <xray><enabled>true</enabled></xray>
+        </localRepository>
+    </localRepositories>
+    <remoteRepositories>
+        <remoteRepository>
+            <key>npm-remote</key>
+            <type>npm</type>
+            <url>https://registry.npmjs.org</url>
+            <password>AM.encrypted</password>
+            <bypassHeadRequests>false</bypassHeadRequests>
+        </remoteRepository>
+    </remoteRepositories>
+    <virtualRepositories>
+        <virtualRepository>
+            <key>npm</key>
+            <type>npm</type>
+            <description>2024</description>
+            <repositories><repositoryRef>npm-remote</repositoryRef></repositories>
+        </virtualRepository>
+    </virtualRepositories>
+</config>
+"""
+
+
+def test_parse_repositories():
+    repos = descriptor.parse_repositories(io.BytesIO(DESCRIPTOR))
+
+    assert sorted(repos) == ['libs-local', 'npm', 'npm-remote']
+    assert repos['libs-local'].rclass == 'local'
+    assert repos['libs-local'].packageType == 'maven'
+    assert repos['libs-local'].maxUniqueSnapshots == 5
+    assert repos['libs-local'].checksumPolicyType == 'server-generated-checksums'
+    assert repos['libs-local'].propertySets == ['artifactory']
+    assert repos['libs-local'].xrayIndex is True
+    assert repos['npm-remote'].url == 'https://registry.npmjs.org'
+    assert repos['npm-remote'].password is None
+    assert repos['npm-remote'].bypassHeadRequests is False
+    assert repos['npm'].repositories == ['npm-remote']
+    assert repos['npm'].description == '2024'
@@ -0,0 +1,54 @@
+from unittest import mock
+
+from pyartifactory.exception import ArtifactoryException, GroupNotFoundException
+from pyartifactory.models import Group, PermissionV2
+
+import artifactoryconfig.lib.drift as drift
+import artifactoryconfig.lib.helper as helper
+from artifactoryconfig.lib.model import SnapshotEntry
+from artifactoryconfig.lib.patterns import IgnoreMatcher
+
+
+def test_detect_drift(tmp_path):
+    server = {('groups', 'devs'): Group(name="devs", description="Developers", autoJoin=False),
+              ('groups', 'ops'): Group(name="ops", description="changed by hand"),
+              ('permissions', 'perm'): PermissionV2(name="perm", repo={
+                  'include-patterns': ['**'], 'exclude-patterns': [], 'repositories': ['b', 'a'],
+                  'actions': {'groups': {'devs': ['write', 'read']}}})}
+    session = mock.MagicMock()
+    session.config = helper.DriftConfig({'artifactory_url': "http://localhost"})
+    session.ignores = IgnoreMatcher(["admin"])
+    session.snapshot.return_value = {'users': {'admin': SnapshotEntry("admin"), 'bob': SnapshotEntry("bob")},
+                                     'groups': {'devs': SnapshotEntry("devs"), 'ops': SnapshotEntry("ops")},
+                                     'permissions': {'perm': SnapshotEntry("perm")},
+                                     'localRepos': {}, 'remoteRepos': {}, 'virtualRepos': {}}
+    server_errors = {('groups', 'deleted'): GroupNotFoundException("deleted"),
+                     ('groups', 'broken'): ArtifactoryException("status 500")}
+
+    def fetch_objects(keys, errors):
+        errors.update({key: server_errors[key] for key in keys if key in server_errors})
+        return {key: server[key] for key in keys if key in server}
+
+    session.fetch_objects.side_effect = fetch_objects
+    session.snapshot.return_value['groups'].update({'deleted': SnapshotEntry("deleted"),
+                                                    'broken': SnapshotEntry("broken")})
+    config_objects = {'users': {}, 'localRepositories': {}, 'remoteRepositories': {}, 'virtualRepositories': {},
+                      'groups': {'devs': {'name': "devs", 'description': "Developers"},
+                                 'ops': {'name': "ops", 'description': "Operations"},
+                                 'qa': {'name': "qa"}, 'deleted': {'name': "deleted"}, 'broken': {'name': "broken"}},
+                      'permissions': {'perm': {'name': "perm", 'repo': {
+                          'repositories': ['a', 'b'], 'actions': {'groups': {'devs': ['read', 'write']}}}}}}
+
+    summary = drift.detect_drift(config_objects, session)
+    drift.write_metrics(summary, str(tmp_path / "drift.prom"))
+
+    assert summary['drift']
+    assert summary['failed']
+    assert summary['types']['groups'] == {'in_sync': 1, 'changed': ['ops'], 'missing': ['qa', 'deleted'],
+                                          'unmanaged': [], 'failed': ['broken']}
+    assert summary['types']['permissions'] == {'in_sync': 1, 'changed': [], 'missing': [], 'unmanaged': [],
+                                               'failed': []}
+    assert summary['types']['users']['unmanaged'] == ['bob']
+    metrics = (tmp_path / "drift.prom").read_text()
+    assert "artifactory_config_drift 1\n" in metrics
+    assert 'artifactory_config_drift_objects{type="groups",state="changed"} 1\n' in metrics
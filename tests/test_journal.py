@@ -0,0 +1,27 @@
+from artifactoryconfig.lib.journal import Journal
+
+
+def test_resume_journal(tmp_path):
+    journal = Journal.open(str(tmp_path), "https://art.example.com", "abc")
+    journal.begin("users", "jdoe")
+    journal.done("users", "jdoe", "created")
+    journal.begin("groups", "devs")
+    journal.file.write('{"event":"done","type":"gro')
+    journal.close()
+
+    resumed = Journal.open(str(tmp_path), "https://art.example.com/", "abc", resume=True)
+    assert resumed.is_done("users", "jdoe")
+    assert not resumed.is_done("groups", "devs")
+    resumed.close()
+
+    other = Journal.open(str(tmp_path), "https://art.example.com", "other", resume=True)
+    assert not other.is_done("users", "jdoe")
+    other.close()
+
+    restarted = Journal.open(str(tmp_path), "https://art.example.com", "abc")
+    assert not restarted.is_done("users", "jdoe")
+    restarted.close()
+
+    resumed = Journal.open(str(tmp_path), "https://art.example.com", "abc", resume=True)
+    assert not resumed.is_done("users", "jdoe")
+    resumed.close()
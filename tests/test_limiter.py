@@ -0,0 +1,24 @@
+from artifactoryconfig.lib.limiter import AdaptiveLimiter, parse_retry_after
+
+
+def test_adaptive_limit():
+    limiter = AdaptiveLimiter(ceiling=8, initial=2)
+
+    for _ in range(100):
+        limiter.acquire()
+        limiter.release(0.01, 200)
+    assert limiter.limit == 8
+
+    # only the first of several throttled responses of one round trip reduces the limit
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release(1, 429)
+    assert limiter.limit == 4
+
+    stats = limiter.stats()
+    assert stats['min_limit'] == 2
+    assert stats['max_limit'] == 8
+    assert stats['throttled'] == 3
+    assert stats['requests'] == 103
+    assert parse_retry_after("2") == 2
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
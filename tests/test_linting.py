@@ -1,7 +1,7 @@
 import logging
 
 import artifactoryconfig.lib.linting as linting
-# import artifactoryconfig.lib.helper as helper
+import artifactoryconfig.lib.helper as helper
 
 
 def __get_valid_config():
@@ -68,3 +68,18 @@ def test_lint_unused_group_rule(caplog):
 
     assert rule.has_failed(0) is True
     assert rule.has_failed(21) is False
+
+
+def test_redundant_grants_dont_fail_lint(caplog):
+    caplog.set_level(logging.INFO)
+    local_config = {'localRepositories': {}, 'remoteRepositories': {}, 'virtualRepositories': {}, 'users': {},
+                    'groups': {'devs': {'name': 'devs'}}, 'permissions': {}}
+    for name, patterns in [('global-read', ['**']), ('ns-team-a', ['com/acme/a/**'])]:
+        local_config['permissions'][name] = {'name': name,
+                                             'repo': {'include-patterns': patterns, 'repositories': ['libs-release'],
+                                                      'actions': {'groups': {'devs': ['read']}}}}
+
+    # reported, but below the default fail level - no SystemExit
+    linting.lint_rules(local_config, helper.LintingConfig())
+
+    assert "[sec.002] Permission 'ns-team-a' (repo) is fully shadowed by global-read" in caplog.text
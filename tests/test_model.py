@@ -0,0 +1,19 @@
+import artifactoryconfig.lib.model as model
+
+
+def test_intern_strings():
+    group_name = "".join(["dev", "elopers"])
+    config = model.intern_strings({"users": {"alice": {"groups": [group_name]}, "bob": {"groups": ["developers"]}}})
+
+    assert config == {"users": {"alice": {"groups": ["developers"]}, "bob": {"groups": ["developers"]}}}
+    assert config["users"]["alice"]["groups"][0] is config["users"]["bob"]["groups"][0]
+
+
+def test_snapshot_entry():
+    entry = model.SnapshotEntry.from_dict({"key": "libs-release", "type": "LOCAL", "url": "https://example.com"}, "key")
+
+    assert entry.key == entry.name == "libs-release"
+    assert entry.type == "LOCAL"
+    assert entry.digest == model.SnapshotEntry.from_dict({"url": "https://example.com", "type": "LOCAL",
+                                                          "key": "libs-release"}, "key").digest
+    assert not hasattr(entry, "__dict__")
@@ -1,5 +1,10 @@
+import json
 import logging
+import os
 
+import yaml
+
+import artifactoryconfig.lib.helper as helper
 import artifactoryconfig.lib.namespaces as namespaces
 
 
@@ -21,3 +26,80 @@ def test_add_markdown_unique_patterns(caplog):
 
     assert ("| namespace1 | duplicate-pattern.\\* | thirdparty-pattern.\\* |  |" in namespaces_markdown)
     assert ("| namespace2 | unique-internal-pattern.\\*, unique-public-pattern.\\* |  |  |" in namespaces_markdown)
+
+
+def test_sync_output_files(tmp_path):
+    config = helper.NamespacesConfig({"output_dir": str(tmp_path)})
+    os.makedirs(config.output_dir + "permissions/")
+    stale_file = config.output_dir + "permissions/ns-removed.json"
+    manual_file = config.output_dir + "permissions/ns-manual.json"
+    with open(manual_file, "w") as f:
+        f.write("{}")
+
+    outputs = {config.output_dir + "permissions/ns-a.json": "{}",
+               stale_file: "{}",
+               config.output_dir + "permissions/namespaces.md": "| a |\n"}
+
+    summary = namespaces.sync_output_files(outputs, config)
+    assert summary == {'created': 3, 'changed': 0, 'unchanged': 0, 'removed': 0}
+    assert os.stat(config.output_dir + "permissions/ns-a.json").st_mode & 0o777 == 0o666 & ~namespaces.UMASK
+
+    # only files written by the previous run are stale, hand-written files are kept
+    del outputs[stale_file]
+    os.chmod(config.output_dir + "permissions/namespaces.md", 0o640)
+    outputs[config.output_dir + "permissions/namespaces.md"] = "| b |\n"
+    summary = namespaces.sync_output_files(outputs, config)
+    assert summary == {'created': 0, 'changed': 1, 'unchanged': 1, 'removed': 1}
+    assert not os.path.exists(stale_file)
+    assert os.path.exists(manual_file)
+    assert os.stat(config.output_dir + "permissions/namespaces.md").st_mode & 0o777 == 0o640
+
+
+def test_add_namespace_objects_like_written_files(tmp_path):
+    (tmp_path / "group.json.j2").write_text('{"name": "{{ name }}", "description": "generated"}')
+    (tmp_path / "namespaces.yaml").write_text(
+        "namespaces:\n"
+        "  - name: team-a\n    groups: [team-a-devs, existing:r]\n    publicPattern: com/a/**\n")
+    (tmp_path / "config.yaml").write_text(
+        f"repos:\n  internal: [libs-release]\n  thirdparty: [thirdparty]\n"
+        f"groups:\n  internal: [employees]\n  public: [everyone]\n"
+        f"group_template: {tmp_path / 'group.json.j2'}\noutput_dir: {tmp_path / 'out'}\n")
+    config = helper.DeployConfig({'config_file': str(tmp_path / "config.yaml"),
+                                  'namespaces_file': str(tmp_path / "namespaces.yaml")})
+    config_objects = {'users': {}, 'groups': {'existing': {'name': "existing"}},
+                      'permissions': {'global-public': {'name': "global-public"}}}
+
+    config_objects = namespaces.add_namespace_objects(config_objects, config)
+
+    namespaces_config = helper.NamespacesConfig()
+    namespaces_config.from_yaml(str(tmp_path / "config.yaml"))
+    namespaces_config.namespaces_file = config.namespaces_file
+    namespaces.process_namespaces(namespaces_config, {'groups': {'existing': {}}})
+    with open(tmp_path / "out/permissions/ns-team-a.json") as f:
+        assert config_objects['permissions']['ns-team-a'] == json.load(f)
+    assert config_objects['permissions']['global-public'] == {'name': "global-public"}
+    assert config_objects['groups'] == {'existing': {'name': "existing"},
+                                        'team-a-devs': {'name': "team-a-devs", 'description': "generated"}}
+
+
+def test_render_permission_targets_in_processes(monkeypatch):
+    definitions = [{'name': f"team-{i}", 'groups': [f"team-{i}:rw"], 'publicPattern': f"com/acme/{i}/**"}
+                   for i in range(5)]
+    config = helper.NamespacesConfig()
+    config.internal_repos = ["libs-release", "artifactory-build-info"]
+    config.thirdparty_repos = ["thirdparty"]
+    target = namespaces.PermissionTarget(namespaces.Namespace(definitions[3]), repositories=config.internal_repos)
+    monkeypatch.setattr(namespaces, "PARALLEL_THRESHOLD", 0)
+    monkeypatch.setattr(namespaces, "CHUNK_SIZE", 2)
+
+    for output_format in ["json", "yaml"]:
+        config.output_format = output_format
+        rendered = namespaces.render_namespace_targets(config, definitions, max_workers=2)
+
+        # built and rendered in the processes, in order, the same bytes as the pure python serializers
+        assert [name for name, _ in rendered] == [name for i in range(5)
+                                                  for name in (f"ns-team-{i}", f"ns-team-{i}-thirdparty")]
+        assert rendered[6] == ("ns-team-3", yaml.dump(target.as_dict(), default_flow_style=False)
+                               if output_format == "yaml" else json.dumps(target.as_dict(), indent=4, sort_keys=True))
+        # no thirdparty patterns
+        assert rendered[7] == ("ns-team-3-thirdparty", None)
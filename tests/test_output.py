@@ -0,0 +1,28 @@
+import json
+import logging
+
+from artifactoryconfig.lib import output
+
+
+def test_json_formatter():
+    record = logging.LogRecord("objects", logging.INFO, __file__, 1, "User '%s' successfully %s",
+                               ("jdoe", "created"), None)
+    record.target = "eu"
+
+    entry = json.loads(output.JsonFormatter().format(record))
+
+    assert entry['level'] == "INFO"
+    assert entry['logger'] == "objects"
+    assert entry['message'] == "User 'jdoe' successfully created"
+    assert entry['target'] == "eu"
+
+
+def test_lazy_formatting(caplog):
+    calls = []
+    caplog.set_level(logging.INFO)
+
+    logging.debug("Configuration %s", output.Lazy(calls.append, "config"))
+    assert calls == []
+
+    logging.info("Configuration %s", output.Lazy(calls.append, "config"))
+    assert calls and set(calls) == {"config"}
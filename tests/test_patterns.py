@@ -0,0 +1,21 @@
+import re
+
+import artifactoryconfig.lib.patterns as patterns
+
+
+def test_ant_to_regex():
+    assert re.fullmatch(patterns.ant_to_regex("com/acme/**"), "com/acme")
+    assert re.fullmatch(patterns.ant_to_regex("com/acme/**"), "com/acme/lib/1.0/lib.jar")
+    assert not re.fullmatch(patterns.ant_to_regex("com/acme/**"), "com/acmex")
+    assert re.fullmatch(patterns.ant_to_regex("**/*.pom"), "com/acme/lib.pom")
+    assert not re.fullmatch(patterns.ant_to_regex("com/*/lib"), "com/acme/x/lib")
+    assert re.fullmatch(patterns.ant_to_regex("com/"), "com/acme/lib")
+
+
+def test_compact_patterns():
+    compacted = patterns.compact_patterns(["com/acme/lib/**", "com/acme/**", "com/acme/**", "org/*.jar",
+                                           "org/lib.jar", "**/tmp/**", "net/tmp/x", "net/?.txt", "net/ab.txt"])
+
+    assert compacted == ["**/tmp/**", "com/acme/**", "net/?.txt", "net/ab.txt", "org/*.jar"]
+    assert patterns.pattern_covers("com/**", "com/*")
+    assert not patterns.pattern_covers("com/*", "com/**")
@@ -0,0 +1,104 @@
+from unittest import mock
+
+import pytest
+import requests
+from pyartifactory.exception import ArtifactoryException, GroupNotFoundException
+from pyartifactory.models import Group, PermissionV2
+
+import artifactoryconfig.lib.helper as helper
+import artifactoryconfig.lib.plan as plan
+from artifactoryconfig.lib.model import SnapshotEntry
+
+
+def test_is_up_to_date():
+    current = PermissionV2(name="perm", repo={'include-patterns': ['**'], 'exclude-patterns': [],
+                                              'repositories': ['libs-release'],
+                                              'actions': {'groups': {'devs': ['write', 'read']}}})
+
+    same = PermissionV2(name="perm", repo={'repositories': ['libs-release'],
+                                           'actions': {'groups': {'devs': ['read', 'write']}}})
+    changed = PermissionV2(name="perm", repo={'repositories': ['libs-release'],
+                                              'actions': {'groups': {'devs': ['read']}}})
+
+    assert plan.is_up_to_date(same, current)
+    assert not plan.is_up_to_date(changed, current)
+    assert plan.is_up_to_date(Group(name="devs"), Group(name="devs", description="set on server"))
+
+
+def test_write_and_read_plan(tmp_path):
+    user = SnapshotEntry.from_dict({"name": "alice", "uri": "https://artifactory.example.com/api/security/users/alice"})
+    operations = [{'type': 'users', 'action': 'update', 'key': 'alice', 'precondition': plan.precondition(user),
+                   'payload': {'name': 'alice'}}]
+    plan_file = str(tmp_path / "plan.json.gz")
+
+    plan.write_plan({'version': plan.PLAN_VERSION, 'operations': operations}, plan_file)
+
+    assert plan.read_plan(plan_file)['operations'] == operations
+    assert plan.precondition(None) == {'exists': False}
+    assert plan.precondition(user)['hash'] != plan.precondition(SnapshotEntry.from_dict({"name": "alice"}))['hash']
+
+
+def test_precondition_detects_changed_content():
+    entry = SnapshotEntry.from_dict({"name": "devs"})
+    planned = plan.precondition(entry, Group(name="devs", description="old"), ['description', 'name'])
+
+    assert plan.desired_fields(Group(name="devs", description="new")) == ['description', 'name']
+    assert plan.precondition(entry, Group(name="devs", description="old", realm="ldap"), planned['fields']) == planned
+    assert plan.precondition(entry, Group(name="devs", description="changed"), planned['fields']) != planned
+
+
+def __plan_session(error):
+    session = mock.MagicMock()
+    session.config = helper.PlanConfig({'artifactory_url': "https://artifactory.example.com"})
+    session.snapshot.return_value = {'users': {}, 'permissions': {}, 'localRepos': {}, 'remoteRepos': {},
+                                     'virtualRepos': {}, 'groups': {'devs': SnapshotEntry("devs", digest="1"),
+                                                                    'ops': SnapshotEntry("ops", digest="2")}}
+
+    def fetch_objects(keys, errors):
+        errors[('groups', 'ops')] = error
+        return {('groups', 'devs'): Group(name="devs")}
+
+    session.fetch_objects.side_effect = fetch_objects
+    return session
+
+
+def test_create_plan_with_deleted_and_failed_objects():
+    config_objects = {'users': {}, 'permissions': {}, 'localRepositories': {}, 'remoteRepositories': {},
+                      'virtualRepositories': {}, 'groups': {'devs': {'name': "devs"}, 'ops': {'name': "ops"}}}
+
+    # deleted since listed - created again
+    operations = plan.create_plan(config_objects, __plan_session(GroupNotFoundException("ops")))['operations']
+    assert [(operation['key'], operation['action'], operation['precondition']) for operation in operations] == \
+           [('ops', 'create', {'exists': False})]
+
+    with pytest.raises(SystemExit) as e:
+        plan.create_plan(config_objects, __plan_session(ArtifactoryException("timeout")))
+    assert e.value.code == 1
+
+
+def test_apply_plan_reports_failures(tmp_path):
+    plan_file = str(tmp_path / "plan.json")
+    plan.write_plan({'version': plan.PLAN_VERSION, 'artifactory_url': "https://artifactory.example.com",
+                     'operations': [{'type': 'groups', 'action': 'create', 'key': key,
+                                     'precondition': {'exists': False}, 'payload': {'name': key}}
+                                    for key in ['devs', 'ops']]}, plan_file)
+    session = mock.MagicMock()
+    session.config = helper.ApplyConfig({'artifactory_url': "https://artifactory.example.com",
+                                         'plan_file': plan_file})
+    session.snapshot.return_value = {'users': {}, 'groups': {}, 'permissions': {}, 'localRepos': {},
+                                     'remoteRepos': {}, 'virtualRepos': {}}
+
+    def execute_operation(config_type, action, model):
+        if model.name == 'ops':
+            response = requests.Response()
+            response.status_code = 400
+            response.url = "https://artifactory.example.com/api/security/groups/ops"
+            request = requests.Request('PUT', response.url, json={'name': 'ops'}).prepare()
+            raise requests.exceptions.HTTPError(response=response, request=request)
+
+    session.execute_operation.side_effect = execute_operation
+
+    run_report = plan.apply_plan(session)
+
+    assert run_report.counts == {'group': {'created': 1}}
+    assert run_report.failed == {'group': ['ops']}
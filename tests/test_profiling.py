@@ -0,0 +1,41 @@
+import os
+import pstats
+
+import artifactoryconfig.lib.profiling as profiling
+
+
+def _work():
+    return sorted(str(i) for i in range(2000))
+
+
+@profiling.profiled("outer")
+def _outer():
+    _work()
+    with profiling.phase("inner"):
+        _work()
+
+
+def test_cpu_profile_per_phase(tmp_path):
+    profiling.setup_profiling("cpu", str(tmp_path))
+    _outer()
+    _outer()
+    profiling.finish_profiling()
+
+    assert sorted(os.listdir(tmp_path)) == ["01-outer.folded", "01-outer.pstats", "02-inner.folded", "02-inner.pstats"]
+    assert "_outer (test_profiling.py:11);_work (test_profiling.py:7)" in (tmp_path / "01-outer.folded").read_text()
+    # the inner phase is not part of the outer profile
+    for file_name in ["01-outer.pstats", "02-inner.pstats"]:
+        calls = {func[2]: entry[1] for func, entry in pstats.Stats(str(tmp_path / file_name)).stats.items()}
+        assert calls["_work"] == 2
+
+
+def test_memory_profile_lists_allocations(tmp_path, caplog):
+    caplog.set_level("INFO")
+    profiling.setup_profiling("memory", str(tmp_path))
+    with profiling.phase("allocate"):
+        data = [str(i) * 10 for i in range(10000)]
+    profiling.finish_profiling()
+
+    assert len(data) == 10000
+    assert "allocate: " in caplog.text
+    assert "test_profiling.py" in (tmp_path / "01-allocate.allocations.txt").read_text().splitlines()[0]
@@ -0,0 +1,90 @@
+from unittest import mock
+
+import artifactoryconfig.lib.helper as helper
+import artifactoryconfig.lib.provisioning as provisioning
+from artifactoryconfig.lib import artifactory
+from artifactoryconfig.lib.report import RunReport
+
+
+def test_provision_users_from_csv_in_batches(tmp_path):
+    users_file = tmp_path / "users.csv"
+    users_file.write_text("uid,mail,teams,admin\n"
+                          "alice,alice@acme.com,devs;ops,false\n"
+                          "bob,bob@acme.com,,\n"
+                          ",nobody@acme.com,devs,\n"
+                          "carol,carol@acme.com,ops,maybe\n")
+    config = helper.ProvisionConfig({'artifactory_url': "http://localhost", 'users_file': str(users_file),
+                                     'batch_size': 2,
+                                     'user_mapping': {'fields': {'name': 'uid', 'email': 'mail', 'groups': 'teams',
+                                                                 'admin': 'admin'},
+                                                      'groups': ['readers'],
+                                                      'defaults': {'disableUIAccess': True}}})
+    session = mock.MagicMock()
+    session.config = config
+    session.apply.return_value = RunReport()
+
+    run_report = provisioning.provision_users(session)
+
+    # the second batch has no valid users
+    assert session.apply.call_count == 1
+    first_batch = session.apply.call_args_list[0][0][0]
+    assert first_batch['groups'] == {}
+    assert first_batch['users'] == {
+        'alice': {'name': 'alice', 'email': 'alice@acme.com', 'groups': ['devs', 'ops', 'readers'], 'admin': 'false',
+                  'disableUIAccess': True, 'internalPasswordDisabled': True},
+        'bob': {'name': 'bob', 'email': 'bob@acme.com', 'groups': ['readers'], 'disableUIAccess': True,
+                'internalPasswordDisabled': True}}
+    assert run_report.failed == {'user': ['line 4', 'carol']}
+
+
+def test_read_ldif():
+    lines = ["version: 1\n",
+             "# exported users\n",
+             "dn: uid=alice,ou=people,dc=acme\n",
+             "uid: alice\n",
+             "cn:: QWxpY2Ugw5xiZXI=\n",
+             "memberOf: cn=devs,ou=groups,dc=acme\n",
+             "memberOf: cn=ops,ou=groups,\n",
+             " dc=acme\n",
+             "jpegPhoto:: /9j/4AAQ\n",
+             "\n",
+             "dn: uid=bob,ou=people,dc=acme\n",
+             "uid: bob\n",
+             "cn:: not base64!\n",
+             "userPassword: s3cret\n"]
+
+    records = list(provisioning.read_ldif(lines))
+    mapping = provisioning.UserMapping({'fields': {'name': 'uid', 'groups': 'memberOf', 'password': 'userPassword'},
+                                        'group_pattern': '^cn=([^,]+)'})
+
+    assert [line for line, _ in records] == [3, 11]
+    assert records[0][1]['cn'] == ['Alice Über']
+    assert records[0][1]['memberOf'] == ['cn=devs,ou=groups,dc=acme', 'cn=ops,ou=groups,dc=acme']
+    # binary and invalid base64 values are ignored
+    assert 'jpegPhoto' not in records[0][1] and 'cn' not in records[1][1]
+    assert mapping.map(records[0][1]) == {'name': 'alice', 'groups': ['devs', 'ops'], 'internalPasswordDisabled': True}
+    assert mapping.map(records[1][1]) == {'name': 'bob', 'password': 's3cret', 'internalPasswordDisabled': False}
+
+
+def test_read_ldif_mapped_attributes():
+    lines = ["dn: uid=alice,ou=people,dc=acme\n",
+             "uid: alice\n",
+             "jpegPhoto:: /9j/4AAQSkZJRgABAQ\n",
+             " EASABIAAD\n",
+             "\n",
+             "dn: ou=people,dc=acme\n"]
+
+    records = list(provisioning.read_ldif(lines, {'uid'}))
+
+    assert records == [(1, {'uid': ['alice']}), (6, {})]
+
+
+def test_generated_passwords():
+    first = artifactory.build_model('users', 'alice', {'name': 'alice', 'email': 'alice@acme.com'}, exists=False)
+    second = artifactory.build_model('users', 'alice', {'name': 'alice', 'email': 'alice@acme.com'}, exists=False)
+    mapped = artifactory.build_model('users', 'alice', {'name': 'alice', 'email': 'alice@acme.com',
+                                                        'password': 's3cret'}, exists=False)
+
+    assert first.password.get_secret_value() != second.password.get_secret_value()
+    assert len(first.password.get_secret_value()) >= 32
+    assert mapped.password.get_secret_value() == 's3cret'
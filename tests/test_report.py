@@ -0,0 +1,35 @@
+import artifactoryconfig.lib.helper as helper
+from artifactoryconfig.lib.report import RunReport
+
+
+def test_merge_reports():
+    first = RunReport("eu")
+    first.add("user", "created")
+    first.add("user", "updated")
+    first.add_failure("group", "devs")
+    second = RunReport("us")
+    second.add("user", "created")
+    second.add_unmanaged("user", "admin")
+
+    overall = RunReport("overall")
+    overall.merge(first)
+    overall.merge(second)
+
+    assert overall.counts == {"user": {"created": 2, "updated": 1}}
+    assert overall.failed == {"group": ["devs"]}
+    assert overall.unmanaged == {"user": ["admin"]}
+    assert overall.has_failures()
+    assert not second.has_failures()
+
+
+def test_deploy_targets():
+    config = helper.DeployConfig({"artifactory_user": "deployer", "artifactory_token": "token",
+                                  "targets": [{"url": "https://eu.example.com"},
+                                              {"name": "dr", "url": "https://dr.example.com", "token": "dr-token"}]})
+
+    targets = config.get_targets()
+
+    assert config.is_valid()
+    assert [t["name"] for t in targets] == ["https://eu.example.com", "dr"]
+    assert config.for_target(targets[1]).artifactory_token == "dr-token"
+    assert config.for_target(targets[0]).artifactory_user == "deployer"
@@ -0,0 +1,61 @@
+import artifactoryconfig.lib.shadowing as shadowing
+
+
+def __permission(name: str, repos: list, include: list, actions: dict, exclude: list = None):
+    return {'name': name, 'repo': {'include-patterns': include, 'exclude-patterns': exclude or [],
+                                   'repositories': repos, 'actions': actions}}
+
+
+def __get_config():
+    permissions = [
+        __permission('global-read', ['ANY LOCAL'], [], {'groups': {'readers': ['read'], 'devs': ['read']}}),
+        __permission('ns-team-a', ['libs-release', 'libs-snapshot'], ['com/acme/a/**'],
+                     {'groups': {'devs': ['read', 'write']}, 'users': {'alice': ['write', 'delete']}}),
+        __permission('ns-team-a-copy', ['libs-release'], ['com/acme/a/lib/**'], {'groups': {'devs': ['read']}}),
+        __permission('same-a', ['libs-release'], ['org/**'], {'groups': {'ops': ['read']}}),
+        __permission('same-b', ['libs-release'], ['org/**'], {'groups': {'ops': ['read']}}),
+        __permission('excluding', ['libs-release'], ['**'], {'groups': {'ops': ['manage']}},
+                     exclude=['secret/**']),
+        __permission('narrow', ['libs-release'], ['secret/**'], {'groups': {'ops': ['manage']}}),
+    ]
+    return {
+        'localRepositories': {'libs-release': {}, 'libs-snapshot': {}},
+        'remoteRepositories': {'maven-proxy': {}},
+        'users': {'alice': {'name': 'alice', 'groups': ['devs']}},
+        'permissions': {permission['name']: permission for permission in permissions}
+    }
+
+
+def test_analyze_permissions():
+    shadowed, redundant = shadowing.analyze_permissions(__get_config())
+
+    assert shadowed == ["Permission 'ns-team-a-copy' (repo) is fully shadowed by global-read, ns-team-a",
+                        "Permission 'same-b' (repo) is fully shadowed by same-a"]
+    assert redundant == ["Permission 'ns-team-a' (repo) grants [read] to group 'devs' also granted by global-read",
+                         "Permission 'ns-team-a' (repo) grants [write] to user 'alice' also granted by ns-team-a"]
+
+
+def test_access_matrix_bitsets():
+    matrix = shadowing.AccessMatrix(__get_config())
+
+    global_read = next(row for row in matrix.rows if row.name == 'global-read')
+    assert global_read.repos == matrix.repos['libs-release'] | matrix.repos['libs-snapshot'] | \
+        matrix.repos['ANY LOCAL']
+    assert global_read.repos & matrix.repos['maven-proxy'] == 0
+    assert matrix.memberships == {matrix.principals[('users', 'alice')]: [matrix.principals[('groups', 'devs')]]}
+
+
+def test_candidates_by_literal_prefix():
+    config = __get_config()
+    config['permissions']['multi'] = __permission('multi', ['libs-release'], ['com/acme/a/lib/**', 'org/*/x/**'],
+                                                  {'groups': {'ops': ['read']}})
+    matrix = shadowing.AccessMatrix(config)
+    names = {row.name: index for index, row in enumerate(matrix.rows)}
+    ops, read = matrix.principals[('groups', 'ops')], matrix.actions['read']
+
+    # rows with a pattern starting with a literal prefix of the pattern are candidates, others are never compared
+    assert sorted(matrix.candidates('repo', ops, read, ('org', 'acme'))) == \
+        sorted([names['multi'], names['same-a'], names['same-b']])
+    assert matrix.candidates('repo', ops, read, ('com',)) == []
+    assert matrix.candidates('repo', ops, read, ('net',)) == []
+    assert matrix.candidates('repo', ops, read, ('com', 'acme', 'a', 'lib')) == [names['multi']]
@@ -0,0 +1,30 @@
+import pytest
+
+from artifactoryconfig.lib import sharding
+
+
+def test_shard_config():
+    config_objects = {'localRepositories': {f"local-{i}": {} for i in range(10)},
+                      'remoteRepositories': {'remote': {}},
+                      'virtualRepositories': {'virtual': {'repositories': ['local-1', 'remote']}},
+                      'users': {f"user-{i}": {} for i in range(10)},
+                      'groups': {'devs': {}},
+                      'permissions': {'devs': {'repo': {'actions': {'groups': {'devs': ['read']}}}}}}
+
+    shards = [sharding.shard_config(config_objects, index, 3) for index in range(3)]
+
+    for config_type, objects in config_objects.items():
+        keys = [key for shard in shards for key in shard[config_type]]
+        assert sorted(keys) == sorted(objects)
+
+    virtual_shard = next(shard for shard in shards if 'virtual' in shard['virtualRepositories'])
+    assert 'local-1' in virtual_shard['localRepositories']
+    assert 'remote' in virtual_shard['remoteRepositories']
+    assert next(shard for shard in shards if 'devs' in shard['permissions'])['groups'] == {'devs': {}}
+
+
+def test_parse_shard():
+    assert sharding.parse_shard("2/4") == (1, 4)
+    for shard in ["0/4", "5/4", "1", "a/b"]:
+        with pytest.raises(ValueError):
+            sharding.parse_shard(shard)
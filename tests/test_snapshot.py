@@ -0,0 +1,47 @@
+from unittest import mock
+
+from pyartifactory.exception import GroupNotFoundException
+from pyartifactory.models import Group, LocalRepositoryResponse
+
+import artifactoryconfig.lib.helper as helper
+import artifactoryconfig.lib.plan as plan
+import artifactoryconfig.lib.snapshot as snapshot
+from artifactoryconfig.lib.model import SnapshotEntry
+
+
+def test_plan_against_exported_snapshot(tmp_path):
+    snapshot_file = str(tmp_path / "snapshot.json.gz")
+    definitions = {'devs': Group(name="devs", description="Developers"),
+                   'libs-local': LocalRepositoryResponse(key="libs-local", packageType="maven", rclass="local")}
+    session = mock.MagicMock()
+    session.config = helper.SnapshotConfig({'artifactory_url': "https://artifactory.example.com", 'max_requests': 4})
+    session.snapshot.return_value = {'users': {}, 'groups': {'devs': SnapshotEntry("devs", digest="1"),
+                                                             'deleted': SnapshotEntry("deleted", digest="3")},
+                                     'permissions': {}, 'localRepos': {'libs-local': SnapshotEntry("libs-local",
+                                                                                                   "LOCAL", "2")},
+                                     'remoteRepos': {}, 'virtualRepos': {}}
+
+    def fetch_objects(keys, errors):
+        # 'deleted' was deleted after listing the groups
+        errors[('groups', 'deleted')] = GroupNotFoundException("deleted")
+        return {(config_type, key): definitions[key] for config_type, key in keys if key in definitions}
+
+    session.fetch_objects.side_effect = fetch_objects
+
+    snapshot.export_snapshot(session, snapshot_file)
+
+    offline = snapshot.SnapshotSession(helper.PlanConfig({'snapshot_file': snapshot_file}))
+    config_objects = {'users': {}, 'permissions': {}, 'remoteRepositories': {}, 'virtualRepositories': {},
+                      'groups': {'devs': {'name': "devs", 'description': "Developers"},
+                                 'ops': {'name': "ops"}},
+                      'localRepositories': {'libs-local': {'key': "libs-local", 'type': "maven", 'rclass': "local",
+                                                           'repoLayout': "maven-2-default"}}}
+    operations = plan.create_plan(config_objects, offline)['operations']
+
+    assert offline.config.artifactory_url == "https://artifactory.example.com"
+    assert list(offline.snapshot()['groups']) == ['devs']
+    assert [(op['action'], op['key']) for op in operations] == [('update', 'libs-local'), ('create', 'ops')]
+    assert operations[0]['precondition']['hash'] == "2"
+    assert operations[0]['precondition'] == plan.precondition(SnapshotEntry("libs-local", "LOCAL", "2"),
+                                                              definitions['libs-local'],
+                                                              operations[0]['precondition']['fields'])
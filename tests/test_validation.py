@@ -0,0 +1,16 @@
+from artifactoryconfig.lib import validation
+
+
+def test_validate_configuration():
+    config_objects = {'users': {'jdoe': {'name': 'jdoe', 'email': 'jdoe@example.com'}},
+                      'groups': {'devs': {'name': 'devs', 'autoJoin': 'maybe'}},
+                      'permissions': {},
+                      'localRepositories': {'libs-local': {'type': 'maven'},
+                                            'docker-local': {'type': 'docker', 'repoLayout': 'simple-default'}},
+                      'remoteRepositories': {},
+                      'virtualRepositories': {}}
+
+    errors = validation.validate_configuration(config_objects)
+
+    assert errors == ["Local repo 'libs-local': repoLayout - field required",
+                      "Group 'devs': autoJoin - value could not be parsed to a boolean"]
@@ -0,0 +1,101 @@
+import logging
+from unittest import mock
+
+import artifactoryconfig.lib.helper as helper
+import artifactoryconfig.lib.watch as watch
+from artifactoryconfig.lib.report import RunReport
+
+
+def test_diff_config_objects(caplog):
+    caplog.set_level(logging.INFO)
+    old_config = {'users': {'alice': {'name': 'alice', 'admin': False}, 'bob': {'name': 'bob'}},
+                  'groups': {'devs': {'name': 'devs'}}}
+    new_config = {'users': {'alice': {'name': 'alice', 'admin': True}, 'carol': {'name': 'carol'}},
+                  'groups': {'devs': {'name': 'devs'}}}
+
+    changed = watch.diff_config_objects(old_config, new_config)
+
+    assert changed == {'users': {'alice': {'name': 'alice', 'admin': True}, 'carol': {'name': 'carol'}},
+                       'groups': {}}
+    assert "Object 'bob' of type 'users' removed" in caplog.text
+
+
+def test_watch_keeps_running_on_errors(monkeypatch):
+    class StopWatching(BaseException):
+        pass
+
+    class Session:
+        def __init__(self, config):
+            self.config = config
+            self.applied = []
+            sessions.append(self)
+
+        def apply(self, config_objects, log_unmanaged=True):
+            if config_objects['users'] == {'bob': {'name': 'bob'}}:
+                raise ConnectionError("connection refused")
+            self.applied.append(config_objects)
+            return RunReport()
+
+        def reset_snapshot(self):
+            pass
+
+    sessions = []
+    configs = [{'users': {}}, ValueError("invalid yaml"), {'users': {'bob': {'name': 'bob'}}},
+               {'users': {'bob': {'name': 'bob'}, 'alice': {'name': 'alice'}}}]
+
+    def read_configuration(config, cache):
+        if not configs:
+            raise StopWatching()
+        result = configs.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(watch.configreader, 'read_configuration', read_configuration)
+    monkeypatch.setattr(watch.validation, 'check_configuration', lambda local_config: None)
+    monkeypatch.setattr(watch.artifactory, 'Session', Session)
+    monkeypatch.setattr(watch, 'scan_files', lambda config: {})
+    monkeypatch.setattr(watch, 'wait_for_changes', lambda config, file_states: file_states)
+
+    try:
+        watch.watch_configuration(helper.WatchConfig())
+    except StopWatching:
+        pass
+
+    # the failed apply of bob is retried with the next change
+    assert sessions[0].applied == [{'users': {}}, {'users': {'bob': {'name': 'bob'}, 'alice': {'name': 'alice'}}}]
+
+
+def test_read_configuration_with_namespaces(tmp_path, monkeypatch):
+    (tmp_path / "namespaces.yaml").write_text("namespaces:\n  - name: team-a\n    publicPattern: com/a/**\n")
+    (tmp_path / "config.yaml").write_text("repos:\n  internal: [libs-release]\n")
+    config = helper.WatchConfig({'config_file': str(tmp_path / "config.yaml"),
+                                 'namespaces_file': str(tmp_path / "namespaces.yaml"),
+                                 'config_folder': [str(tmp_path / "config")], 'vault_file_list': []})
+    monkeypatch.setattr(watch.configreader, 'read_configuration',
+                        lambda config, cache: {'users': {}, 'groups': {}, 'permissions': {}})
+
+    local_config = watch.read_configuration(config, None)
+
+    # the same objects as deployed by 'deploy --namespaces-file', changes of the namespaces file are detected
+    assert sorted(local_config['permissions']) == ['global-public', 'ns-team-a']
+    assert str(tmp_path / "namespaces.yaml") in watch.scan_files(config)
+
+
+def test_failed_objects_are_applied_again(monkeypatch):
+    old_config = {'users': {'alice': {'name': 'alice'}}, 'groups': {}}
+    new_config = {'users': {'alice': {'name': 'alice', 'admin': True}, 'bob': {'name': 'bob'}},
+                  'groups': {'devs': {'name': 'devs'}}}
+    run_report = RunReport()
+    run_report.add_failure('user', 'alice')
+    run_report.add_failure('user', 'bob')
+    session = mock.MagicMock()
+    session.apply.return_value = run_report
+    monkeypatch.setattr(watch, 'read_configuration', lambda config, cache: new_config)
+    monkeypatch.setattr(watch.validation, 'validate_configuration', lambda config_objects: [])
+
+    applied = watch.apply_changes(session, mock.MagicMock(), old_config)
+
+    # the failed objects keep their last applied state and differ from the config again with the next change
+    assert applied == {'users': {'alice': {'name': 'alice'}}, 'groups': {'devs': {'name': 'devs'}}}
+    assert watch.diff_config_objects(applied, new_config)['users'] == new_config['users']